@@ -2,6 +2,7 @@
 Application factory for the CV Analyzer application.
 """
 import os
+import click
 from flask import Flask
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
@@ -12,6 +13,16 @@ from appopvibe.config import DevelopmentConfig, ProductionConfig, TestingConfig
 csrf = CSRFProtect()
 limiter = Limiter(key_func=get_remote_address)
 
+def _serving() -> bool:
+    """Whether the app is created to serve requests rather than for a CLI command.
+
+    ``flask run`` loads the app inside its own command; every other command
+    (``flask run-jobs``, ``flask sweep-retention``, ``flask shell``, ...) runs
+    without the background threads of a web worker.
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is None or ctx.command.name == 'run'
+
 def create_app(config_class=None):
     """Create and configure the Flask application."""
     # Create Flask app with correct template and static folder paths
@@ -37,16 +48,57 @@ def create_app(config_class=None):
     csrf.init_app(app)
     limiter.init_app(app)
     
+    # Configure the per-worker LLM connection pool (and warm it up if enabled)
+    from appopvibe.services.llm.http_pool import http_pool
+    http_pool.init_app(app)
+    
     # Register blueprints
     from appopvibe.routes.main import main_bp
     from appopvibe.routes.report import report_bp
     from appopvibe.routes.feedback import feedback_bp
     from appopvibe.routes.health import health_bp
+    from appopvibe.routes.jobs import jobs_bp
+    from appopvibe.routes.batch import batch_bp
+    from appopvibe.routes.api import api_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(report_bp)
     app.register_blueprint(feedback_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(api_bp)
+    
+    # Load and precompile the prompt templates up front so a broken
+    # template fails at startup rather than on the first submission
+    from appopvibe.services.container import get_template_registry
+    with app.app_context():
+        get_template_registry()
+    
+    # Register CLI commands
+    from appopvibe.cli import register_commands
+    register_commands(app)
+    
+    # Run queued analysis jobs in this worker when submit-then-poll mode is on
+    # (not in CLI commands: `flask run-jobs` has its own runner)
+    if app.config.get('ANALYZE_ASYNC') and app.config.get('JOB_EXECUTORS', 0) > 0 and _serving():
+        from appopvibe.services.container import get_job_queue
+        from appopvibe.services.jobs.job_runner import JobRunner
+        with app.app_context():
+            runner = JobRunner(
+                app, get_job_queue(),
+                concurrency=app.config['JOB_EXECUTORS'],
+                poll_interval=app.config['JOB_POLL_INTERVAL'],
+                lease_seconds=app.config['JOB_LEASE_SECONDS']
+            )
+        app.extensions['appopvibe.job_runner'] = runner
+        runner.start()
+    
+    # Delete expired reports and feedback in the background (in web workers only)
+    if app.config.get('RETENTION_SWEEP_ENABLED') and _serving():
+        from appopvibe.services.container import get_retention_sweeper
+        with app.app_context():
+            get_retention_sweeper().start()
     
     # Print startup message
     port = app.config.get('PORT', 5000)
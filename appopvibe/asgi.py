@@ -0,0 +1,297 @@
+"""
+Native ASGI serving mode for the CV Analyzer application.
+
+Under a WSGI server Flask runs every async view in a throwaway event loop on
+a worker thread that stays blocked until the LLM answers, so a worker holds
+one analysis at a time. ``ASGIApp`` serves the same Flask app from the ASGI
+server's event loop instead: async views (the form and API analyses) are
+awaited on that loop, so an analysis waiting on the LLM costs a coroutine
+rather than a worker, and the loop, the LLM connection pool and the caches
+live as long as the worker process. Sync views (pages, event streams, batch
+NDJSON) keep running as plain WSGI on a thread pool.
+"""
+import sys
+import asyncio
+import inspect
+import logging
+import threading
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask
+from flask.signals import request_started
+from werkzeug.exceptions import HTTPException
+
+# Set while a request is dispatched on the server loop, where async views
+# must be handed back as coroutines instead of run in a loop of their own
+_on_server_loop: ContextVar[bool] = ContextVar('on_server_loop', default=False)
+
+# Request bodies above this size are spooled to a temporary file
+SPOOL_MAX_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class ASGIApp:
+    """ASGI application serving a Flask app, awaiting its async views natively."""
+
+    def __init__(self, app: Flask, threads: Optional[int] = None):
+        """Wrap the Flask app.
+
+        Args:
+            app: Flask application to serve
+            threads: Size of the thread pool running sync views (defaults to ASGI_THREADS)
+        """
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or app.config.get('ASGI_THREADS', 32),
+            thread_name_prefix='asgi-sync'
+        )
+        # Largest accepted request body; Flask applies the per-route limits
+        self.max_body = max(app.config.get('MAX_CONTENT_LENGTH') or 0,
+                            app.config.get('BATCH_MAX_CONTENT_KB', 2048) * 1024)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._native_endpoints: Dict[str, bool] = {}
+
+        # Flask-Limiter and require_api_token call ensure_sync on the view they
+        # wrap, so handing back coroutine functions unchanged on the server
+        # loop makes the whole decorator chain return an awaitable
+        ensure_sync = app.ensure_sync
+
+        def ensure_sync_on_loop(func: Callable) -> Callable:
+            if _on_server_loop.get() and inspect.iscoroutinefunction(func):
+                return func
+            return ensure_sync(func)
+
+        app.ensure_sync = ensure_sync_on_loop
+        app.extensions['appopvibe.asgi'] = self
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    def stats(self) -> Dict[str, int]:
+        """Requests being served by this worker right now, and the most seen at once."""
+        return {'in_flight': self.in_flight, 'peak_in_flight': self.peak_in_flight}
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        """Answer startup and shut the pools down with the worker."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.to_thread(self.close)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self):
+        """Stop background job polling, the LLM connection pool and the thread pool."""
+        from appopvibe.services.llm.http_pool import http_pool
+
+        runner = self.app.extensions.get('appopvibe.job_runner')
+        if runner is not None:
+            runner.stop()
+        http_pool.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _http(self, scope: dict, receive: Callable, send: Callable):
+        body = await self._read_body(receive)
+        if body is None:
+            await self._send_simple(send, 413, b"Request Entity Too Large")
+            return
+
+        # Notice disconnects so streamed responses stop producing
+        disconnected = threading.Event()
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch())
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        loop = asyncio.get_running_loop()
+        try:
+            environ = self._environ(scope, body)
+            if self._is_native(environ):
+                response = await self._dispatch(environ)
+                app_iter, status, headers = response.get_wsgi_response(environ)
+                if response.is_sequence:
+                    await send(self._start_message(status, headers))
+                    await send({'type': 'http.response.body', 'body': b''.join(app_iter)})
+                    return
+                produce = lambda: (app_iter, status, headers)
+            else:
+                produce = lambda: self._call_wsgi(environ)
+            # Sync views, and any streamed body, run on one thread from start to end
+            await loop.run_in_executor(
+                self.executor, self._respond, loop, send, disconnected, produce)
+        finally:
+            self.in_flight -= 1
+            watcher.cancel()
+            body.close()
+
+    async def _read_body(self, receive: Callable) -> Optional[SpooledTemporaryFile]:
+        """Buffer the request body, or return None if it exceeds the size limit."""
+        body = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                body.close()
+                return None
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    @staticmethod
+    def _environ(scope: dict, body) -> Dict[str, Any]:
+        """Build the WSGI environ for an ASGI HTTP scope."""
+        script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+        path_info = scope['path'].encode('utf8').decode('latin1')
+        if script_name and path_info.startswith(script_name):
+            path_info = path_info[len(script_name):]
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name,
+            'PATH_INFO': path_info,
+            'QUERY_STRING': scope.get('query_string', b'').decode('ascii'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'asgi.scope': scope,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1')
+            if name == 'content-length':
+                key = 'CONTENT_LENGTH'
+            elif name == 'content-type':
+                key = 'CONTENT_TYPE'
+            else:
+                key = 'HTTP_' + name.upper().replace('-', '_')
+            value = value.decode('latin1')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        # The body is fully buffered, so its length is known even when chunked
+        if 'CONTENT_LENGTH' not in environ:
+            body.seek(0, 2)
+            environ['CONTENT_LENGTH'] = str(body.tell())
+            body.seek(0)
+        return environ
+
+    def _is_native(self, environ: Dict[str, Any]) -> bool:
+        """Whether the request is routed to an async view, to be awaited on the server loop."""
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        if endpoint not in self._native_endpoints:
+            view = self.app.view_functions.get(endpoint)
+            self._native_endpoints[endpoint] = view is not None and \
+                inspect.iscoroutinefunction(inspect.unwrap(view))
+        return self._native_endpoints[endpoint]
+
+    async def _dispatch(self, environ: Dict[str, Any]):
+        """Handle a request the way ``Flask.wsgi_app`` does, awaiting the view."""
+        app = self.app
+        ctx = app.request_context(environ)
+        token = _on_server_loop.set(True)
+        error: Optional[BaseException] = None
+        try:
+            try:
+                ctx.push()
+                return await self._full_dispatch()
+            except Exception as e:
+                error = e
+                return app.handle_exception(e)
+            except BaseException:
+                error = sys.exc_info()[1]
+                raise
+        finally:
+            if error is not None and app.should_ignore_error(error):
+                error = None
+            ctx.pop(error)
+            _on_server_loop.reset(token)
+
+    async def _full_dispatch(self):
+        """``Flask.full_dispatch_request`` with the view awaited."""
+        app = self.app
+        try:
+            request_started.send(app, _async_wrapper=app.ensure_sync)
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = app.dispatch_request()
+                if inspect.isawaitable(rv):
+                    rv = await rv
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        return app.finalize_request(rv)
+
+    def _call_wsgi(self, environ: Dict[str, Any]) -> Tuple[Iterable[bytes], str, List[Tuple[str, str]]]:
+        """Run the Flask app as plain WSGI; must run on an executor thread."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = status, headers
+            return lambda data: None  # the legacy write() callable is not supported
+
+        app_iter = self.app.wsgi_app(environ, start_response)
+        return app_iter, started['status'], started['headers']
+
+    def _respond(self, loop: asyncio.AbstractEventLoop, send: Callable,
+                 disconnected: threading.Event, produce: Callable):
+        """Produce a response and send it chunk by chunk; runs on an executor thread."""
+        def call(message: dict):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        app_iter, status, headers = produce()
+        try:
+            call(self._start_message(status, headers))
+            for chunk in app_iter:
+                if disconnected.is_set():
+                    return
+                if chunk:
+                    call({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            call({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    @staticmethod
+    def _start_message(status: str, headers: List[Tuple[str, str]]) -> dict:
+        return {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                        for name, value in headers],
+        }
+
+    async def _send_simple(self, send: Callable, status: int, body: bytes):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
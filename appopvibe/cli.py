@@ -0,0 +1,53 @@
+"""
+Command line tools for the CV Analyzer application.
+"""
+import click
+
+from appopvibe.services.container import get_job_queue, get_report_service, get_retention_sweeper
+from appopvibe.services.jobs.job_runner import JobRunner
+
+
+def register_commands(app):
+    """Register the application's CLI commands (``flask <command>``)."""
+
+    @app.cli.command('run-jobs')
+    @click.option('--concurrency', type=int, default=None,
+                  help='Jobs to run at once (defaults to JOB_EXECUTORS).')
+    def run_jobs(concurrency):
+        """Run queued analysis jobs in the foreground."""
+        runner = JobRunner(
+            app, get_job_queue(),
+            concurrency=concurrency or app.config.get('JOB_EXECUTORS') or 4,
+            poll_interval=app.config['JOB_POLL_INTERVAL'],
+            lease_seconds=app.config['JOB_LEASE_SECONDS']
+        )
+        click.echo(f"Running analysis jobs with concurrency {runner.concurrency} (Ctrl+C to stop)")
+        runner.run_forever()
+
+    @app.cli.command('rebuild-report-index')
+    def rebuild_report_index():
+        """Recreate the report index from the report files."""
+        counts = get_report_service().rebuild_index()
+        click.echo(f"Indexed {counts['indexed']} reports, removed {counts['removed']} stale entries")
+
+    @app.cli.command('migrate-reports')
+    def migrate_reports():
+        """Move reports from the top of the reports folder into date shards."""
+        counts = get_report_service().migrate_reports()
+        click.echo(f"Moved {counts['moved']} reports, left {counts['skipped']} in place")
+
+    @app.cli.command('sweep-retention')
+    @click.option('--once', is_flag=True, help='Run a single sweep and exit.')
+    def sweep_retention(once):
+        """Delete expired reports and feedback in the foreground."""
+        sweeper = get_retention_sweeper()
+        if not once:
+            click.echo(f"Sweeping every {sweeper.interval:.0f}s (Ctrl+C to stop)")
+            sweeper.run_forever()
+            return
+        result = sweeper.sweep()
+        if result is None:
+            click.echo("Another process is sweeping")
+            return
+        click.echo(f"Removed {result['reports']} reports ({result['report_bytes']} bytes) and "
+                   f"{result['feedback']} feedback files in {result['duration']}s")
@@ -3,6 +3,7 @@ Configuration settings for the CV Analyzer application.
 Uses environment variables with sensible defaults.
 """
 import os
+import json
 import logging
 from pathlib import Path
 
@@ -10,10 +11,12 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 REPORTS_DIR = BASE_DIR / 'reports'
 FEEDBACK_DIR = BASE_DIR / 'feedback'
+DATA_DIR = BASE_DIR / 'data'
 
 # Ensure directories exist
 REPORTS_DIR.mkdir(exist_ok=True)
 FEEDBACK_DIR.mkdir(exist_ok=True)
+DATA_DIR.mkdir(exist_ok=True)
 
 class Config:
     """Base configuration class with common settings."""
@@ -27,6 +30,38 @@ class Config:
     MAX_CONTENT_SIZE_KB = int(os.getenv('MAX_CONTENT_SIZE_KB', 30))
     MAX_CONTENT_LENGTH = MAX_CONTENT_SIZE_KB * 1024
     REPORT_RETENTION_DAYS = int(os.getenv('REPORT_RETENTION_DAYS', 30))
+    # Report metadata for listing and retention (`flask rebuild-report-index` recreates it)
+    REPORT_INDEX_PATH = os.getenv('REPORT_INDEX_PATH', str(DATA_DIR / 'reports.sqlite3'))
+    # Store report sections (CV, JD, analysis, rewrite) once each as compressed
+    # blobs shared by all reports, with a small manifest per report
+    REPORT_BLOBS_ENABLED = os.getenv('REPORT_BLOBS_ENABLED', 'true').lower() == 'true'
+    # Reports are written atomically; 'file' fsyncs each report before it
+    # appears, 'full' also its directory, 'none' leaves it to the OS
+    REPORT_FSYNC = os.getenv('REPORT_FSYNC', 'file')
+    # Threads per worker writing reports for async views, off the event loop
+    REPORT_IO_THREADS = int(os.getenv('REPORT_IO_THREADS', 4))
+    FEEDBACK_RETENTION_DAYS = int(os.getenv('FEEDBACK_RETENTION_DAYS', 90))
+    # Expired reports and feedback are deleted by a background sweeper in each
+    # worker (one at a time across workers) or by `flask sweep-retention`
+    RETENTION_SWEEP_ENABLED = os.getenv('RETENTION_SWEEP_ENABLED', 'true').lower() == 'true'
+    RETENTION_PATH = os.getenv('RETENTION_PATH', str(DATA_DIR / 'retention.sqlite3'))
+    RETENTION_SWEEP_INTERVAL = float(os.getenv('RETENTION_SWEEP_INTERVAL', 3600))
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 200))
+    RETENTION_MAX_DELETES_PER_SECOND = float(os.getenv('RETENTION_MAX_DELETES_PER_SECOND', 50))
+    RETENTION_MAX_SWEEP_SECONDS = float(os.getenv('RETENTION_MAX_SWEEP_SECONDS', 300))
+    # Per-part limit for analysis/rewrite; keep below the gunicorn worker timeout
+    ANALYSIS_TASK_TIMEOUT = float(os.getenv('ANALYSIS_TASK_TIMEOUT', 110))
+    # Package holding the prompts_<language> template modules
+    PROMPTS_PACKAGE = os.getenv('PROMPTS_PACKAGE', 'prompts')
+    # 'system_prefix' sends the static template instructions as the system
+    # message ahead of the CV/JD so providers can reuse their prompt cache;
+    # 'inline' sends the whole filled-in template as the user message
+    PROMPT_LAYOUT = os.getenv('PROMPT_LAYOUT', 'system_prefix')
+    # Normalize/deduplicate CV and JD text and trim it to the model's input budget
+    INPUT_COMPACTION_ENABLED = os.getenv('INPUT_COMPACTION_ENABLED', 'true').lower() == 'true'
+    # Extract each JD's requirements once (cached by JD) and match CVs against
+    # them, instead of sending the full JD with every analysis
+    TWO_STAGE_ANALYSIS = os.getenv('TWO_STAGE_ANALYSIS', 'true').lower() == 'true'
     
     # LLM API settings
     OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY', '')
@@ -34,6 +69,107 @@ class Config:
     DEFAULT_MODEL = os.getenv('DEFAULT_MODEL', 'deepseek/deepseek-chat-v3-0324')
     BACKUP_MODEL = os.getenv('BACKUP_MODEL', 'mistralai/mistral-7b-instruct')
     
+    # Hedging: if the primary model is slower than its usual latency
+    # percentile, also send the prompt to BACKUP_MODEL on OpenRouter
+    LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+    LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', 95))
+    LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', 30))  # until enough latencies are observed
+    LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', 2))
+    
+    # Retries of timeouts, 429s and 5xx responses (attempts include the first call)
+    LLM_RETRY_ATTEMPTS = int(os.getenv('LLM_RETRY_ATTEMPTS', 3))
+    LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+    LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 8))
+    LLM_RETRY_MAX_RETRY_AFTER = float(os.getenv('LLM_RETRY_MAX_RETRY_AFTER', 30))
+    
+    # Per-provider circuit breakers, shared by all workers on the host
+    LLM_BREAKER_ENABLED = os.getenv('LLM_BREAKER_ENABLED', 'true').lower() == 'true'
+    LLM_BREAKER_PATH = os.getenv('LLM_BREAKER_PATH', str(DATA_DIR / 'llm_breakers.sqlite3'))
+    LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 5))
+    LLM_BREAKER_RESET_TIMEOUT = float(os.getenv('LLM_BREAKER_RESET_TIMEOUT', 30))
+    
+    # Token limits per model name ("default" applies to unlisted models):
+    # CV plus JD tokens sent, and completion tokens requested
+    LLM_INPUT_TOKEN_BUDGETS = json.loads(os.getenv('LLM_INPUT_TOKEN_BUDGETS', 'null')) or {
+        'default': 8000,
+    }
+    LLM_MAX_OUTPUT_TOKENS = json.loads(os.getenv('LLM_MAX_OUTPUT_TOKENS', 'null')) or {
+        'default': 2048,
+    }
+    
+    # Client-side rate limiting against provider quotas, shared by all workers.
+    # Keys are "provider" or "provider:model"; rpm/tpm are requests/tokens per minute.
+    LLM_THROTTLE_ENABLED = os.getenv('LLM_THROTTLE_ENABLED', 'true').lower() == 'true'
+    LLM_THROTTLE_PATH = os.getenv('LLM_THROTTLE_PATH', str(DATA_DIR / 'llm_throttle.sqlite3'))
+    LLM_THROTTLE_MAX_WAIT = float(os.getenv('LLM_THROTTLE_MAX_WAIT', 20))
+    # Furthest ahead background work (batches) may reserve quota, keeping the rest for interactive calls
+    LLM_THROTTLE_BACKGROUND_HORIZON = float(os.getenv('LLM_THROTTLE_BACKGROUND_HORIZON', 5))
+    LLM_RATE_LIMITS = json.loads(os.getenv('LLM_RATE_LIMITS', 'null')) or {
+        'groq': {'rpm': 30, 'tpm': 12000},
+        'openrouter': {'rpm': 20},
+    }
+    
+    # LLM connection pool settings (one pool per worker process)
+    LLM_POOL_MAX_CONNECTIONS = int(os.getenv('LLM_POOL_MAX_CONNECTIONS', 20))
+    LLM_POOL_MAX_KEEPALIVE = int(os.getenv('LLM_POOL_MAX_KEEPALIVE', 10))
+    LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv('LLM_POOL_KEEPALIVE_EXPIRY', 60))
+    LLM_HTTP2 = os.getenv('LLM_HTTP2', 'true').lower() == 'true'
+    LLM_POOL_WARMUP = os.getenv('LLM_POOL_WARMUP', 'false').lower() == 'true'
+    
+    # LLM response cache (SQLite, shared by all workers on the host)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', str(DATA_DIR / 'llm_cache.sqlite3'))
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 3600))
+    LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', 256))
+    
+    # Submissions parked between the form POST and their event stream
+    PENDING_SUBMISSIONS_PATH = os.getenv('PENDING_SUBMISSIONS_PATH', str(DATA_DIR / 'pending.sqlite3'))
+    PENDING_SUBMISSION_TTL = int(os.getenv('PENDING_SUBMISSION_TTL', 600))
+    
+    # Submit-then-poll mode: /analyze enqueues a job instead of waiting on the LLM
+    ANALYZE_ASYNC = os.getenv('ANALYZE_ASYNC', 'false').lower() == 'true'
+    JOBS_PATH = os.getenv('JOBS_PATH', str(DATA_DIR / 'jobs.sqlite3'))
+    # Jobs run concurrently per web worker process; 0 leaves them to `flask run-jobs`
+    JOB_EXECUTORS = int(os.getenv('JOB_EXECUTORS', 4))
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 300))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_STATUS_POLL_SECONDS = int(os.getenv('JOB_STATUS_POLL_SECONDS', 2))
+    
+    # Admission control of interactive analyses (form, stream and API): caps on
+    # analyses in flight per host and per worker, with a short wait queue.
+    # Near the cap the rewrite is skipped (and ADMISSION_DEGRADED_MODEL used if
+    # set); past it requests get a 503 with Retry-After.
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_PATH = os.getenv('ADMISSION_PATH', str(DATA_DIR / 'admission.sqlite3'))
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 64))
+    ADMISSION_WORKER_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_WORKER_MAX_IN_FLIGHT', 32))
+    ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 16))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 5))
+    ADMISSION_DEGRADE_AT = float(os.getenv('ADMISSION_DEGRADE_AT', 0.75))
+    ADMISSION_DEGRADED_MODEL = os.getenv('ADMISSION_DEGRADED_MODEL', '')
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 30))
+    # Leases of crashed workers are reclaimed after this long
+    ADMISSION_LEASE_SECONDS = float(os.getenv('ADMISSION_LEASE_SECONDS', 300))
+    # A streamed submission's slot is freed this soon if its event stream never connects
+    ADMISSION_HANDOVER_SECONDS = float(os.getenv('ADMISSION_HANDOVER_SECONDS', 30))
+    
+    # Batch analysis (every CV against every JD, streamed back as NDJSON)
+    BATCH_MAX_PAIRS = int(os.getenv('BATCH_MAX_PAIRS', 200))
+    BATCH_MAX_CONTENT_KB = int(os.getenv('BATCH_MAX_CONTENT_KB', 2048))
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+    # Batch LLM calls queue this long for rate limit quota instead of failing
+    BATCH_QUEUE_PATIENCE = float(os.getenv('BATCH_QUEUE_PATIENCE', 600))
+    BATCH_RATE_LIMIT = os.getenv('BATCH_RATE_LIMIT', '10 per hour')
+    
+    # JSON API (/api/v1): comma-separated bearer tokens, none disables it
+    API_TOKENS = [token.strip() for token in os.getenv('API_TOKENS', '').split(',') if token.strip()]
+    API_RATE_LIMIT = os.getenv('API_RATE_LIMIT', '60 per hour')
+    
+    # Threads running sync views per worker in ASGI mode (asgi.py); async
+    # views are awaited on the server's event loop and need none
+    ASGI_THREADS = int(os.getenv('ASGI_THREADS', 32))
+    
     # Supported languages
     SUPPORTED_LANGUAGES = {
         'en': 'English',
@@ -67,6 +203,7 @@ class TestingConfig(Config):
     TESTING = True
     SESSION_COOKIE_SECURE = False
     WTF_CSRF_ENABLED = False  # Disable CSRF for testing
+    RETENTION_SWEEP_ENABLED = False
 
 
 class ProductionConfig(Config):
@@ -76,6 +213,7 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour in seconds
+    LLM_POOL_WARMUP = os.getenv('LLM_POOL_WARMUP', 'true').lower() == 'true'
 
 
 # Set default config based on environment
@@ -5,5 +5,8 @@ from appopvibe.routes.main import main_bp
 from appopvibe.routes.report import report_bp
 from appopvibe.routes.feedback import feedback_bp
 from appopvibe.routes.health import health_bp
+from appopvibe.routes.jobs import jobs_bp
+from appopvibe.routes.batch import batch_bp
+from appopvibe.routes.api import api_bp
 
-__all__ = ['main_bp', 'report_bp', 'feedback_bp', 'health_bp']
+__all__ = ['main_bp', 'report_bp', 'feedback_bp', 'health_bp', 'jobs_bp', 'batch_bp', 'api_bp']
@@ -0,0 +1,136 @@
+"""
+Versioned JSON API for programmatic analysis.
+
+Clients authenticate with a bearer token from API_TOKENS instead of the
+session cookie and CSRF token the HTML form needs, and get the analysis,
+the report id and timing/usage metadata in a single response.
+"""
+import hmac
+import time
+import hashlib
+import logging
+from functools import wraps
+from flask import Blueprint, request, current_app, jsonify
+from flask_limiter.util import get_remote_address
+
+from appopvibe import csrf, limiter
+from appopvibe.services.container import get_analyzer_service, get_report_service, get_admission
+from appopvibe.services.llm.admission import OverloadedError
+from appopvibe.services.report.report_service import ReportSaveError
+from appopvibe.services.llm.usage import collect_usage, usage_totals
+
+# Create blueprint
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+csrf.exempt(api_bp)  # Token authenticated, no cookies to protect
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+def _error(message: str, status: int):
+    return jsonify({'error': message}), status
+
+def _bearer_token() -> str:
+    """Get the bearer token of the request ('' if none)."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else ''
+
+def _rate_limit_key() -> str:
+    """Rate limit API clients by token, anonymous callers by address."""
+    token = _bearer_token()
+    if token:
+        return "api:" + hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+    return get_remote_address()
+
+def require_api_token(view):
+    """Reject requests without one of the configured API tokens."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _bearer_token()
+        valid = current_app.config.get('API_TOKENS', [])
+        # Compare against every token so timing does not reveal a match
+        if not token or not any([hmac.compare_digest(token, t) for t in valid]):
+            response, status = _error("A valid API token is required.", 401)
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response, status
+        return current_app.ensure_sync(view)(*args, **kwargs)
+    return wrapper
+
+@api_bp.errorhandler(413)
+def too_large(error):
+    return _error("The request body is too large.", 413)
+
+@api_bp.errorhandler(429)
+def rate_limited(error):
+    return _error(f"Rate limit exceeded ({error.description}).", 429)
+
+@api_bp.route('/analyze', methods=['POST'])
+@limiter.limit(lambda: current_app.config.get('API_RATE_LIMIT', '60 per hour'),
+               key_func=_rate_limit_key)
+@require_api_token
+async def analyze():
+    """Analyze a CV against a job description.
+
+    Expects ``{"cv": "...", "jd": "...", "language": "en", "rewrite": false}``
+    and returns the analysis (and rewrite), the id of the saved report and
+    how long the request took and how many tokens it used. Under load the
+    rewrite may be skipped (``meta.degraded``); when saturated the response
+    is a 503 with ``Retry-After``.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return _error("The request body must be a JSON object.", 400)
+    cv_text, jd_text = payload.get('cv'), payload.get('jd')
+    if not (isinstance(cv_text, str) and cv_text.strip() and isinstance(jd_text, str) and jd_text.strip()):
+        return _error("'cv' and 'jd' must be non-empty texts.", 400)
+    language = payload.get('language', 'en')
+    if language not in current_app.config.get('SUPPORTED_LANGUAGES', {'en': 'English'}):
+        return _error(f"Unsupported language: {language}", 400)
+    rewrite = bool(payload.get('rewrite', False))
+
+    started = time.monotonic()
+    admission = get_admission()
+    try:
+        ticket = await admission.admit() if admission else None
+    except OverloadedError as e:
+        response, status = _error("The service is saturated. Retry later.", 503)
+        response.headers['Retry-After'] = str(int(e.retry_after))
+        return response, status
+    degraded = bool(ticket and ticket.degraded)
+    try:
+        with collect_usage() as calls:
+            result = await get_analyzer_service().process_submission(
+                cv_text, jd_text, language, rewrite and not degraded,
+                model=ticket.model if ticket else None
+            )
+        try:
+            report_id = await get_report_service().save_report_async(
+                cv_text, jd_text, result['analysis'], result.get('rewritten_cv'), language,
+                compaction=result.get('compaction')
+            )
+        except ReportSaveError:
+            report_id = None
+    except Exception as e:
+        logger.exception(f"Error processing API submission: {e}")
+        return _error("An error occurred while analyzing the CV.", 500)
+    finally:
+        if ticket:
+            await ticket.release_async()
+
+    errors = dict(result.get('errors', {}))
+    if rewrite and degraded:
+        errors['rewritten_cv'] = "skipped under load"
+    if not report_id:
+        errors['report'] = "not saved"
+    return jsonify({
+        'report_id': report_id or None,
+        'analysis': result['analysis'],
+        'rewritten_cv': result.get('rewritten_cv'),
+        'errors': errors,
+        'meta': {
+            'language': language,
+            'degraded': degraded,
+            'elapsed': round(time.monotonic() - started, 3),
+            'compaction': result.get('compaction'),
+            'usage': usage_totals(calls),
+        },
+    })
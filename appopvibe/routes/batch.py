@@ -0,0 +1,146 @@
+"""
+Batch analysis routes for the CV Analyzer application.
+"""
+import json
+import uuid
+import logging
+from flask import Blueprint, request, current_app, jsonify, Response
+from werkzeug.wsgi import get_input_stream
+
+from appopvibe import csrf, limiter
+from appopvibe.routes.api import require_api_token, _rate_limit_key
+from appopvibe.services.container import get_analyzer_service, get_report_service, get_admission
+from appopvibe.services.llm.admission import OverloadedError
+from appopvibe.services.llm.http_pool import http_pool
+from appopvibe.services.report.report_service import ReportSaveError
+
+# Create blueprint
+batch_bp = Blueprint('batch', __name__, url_prefix='/batch')
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+def _ndjson(data: dict) -> str:
+    """Format one line of newline-delimited JSON."""
+    return json.dumps(data) + "\n"
+
+def _bad_request(message: str):
+    return jsonify({'error': message}), 400
+
+@batch_bp.errorhandler(429)
+def rate_limited(error):
+    return jsonify({'error': f"Rate limit exceeded ({error.description})."}), 429
+
+def _read_json() -> dict:
+    """Parse the request body under the batch size limit (above the form limit)."""
+    max_bytes = current_app.config.get('BATCH_MAX_CONTENT_KB', 2048) * 1024
+    body = get_input_stream(request.environ, max_content_length=max_bytes).read()
+    return json.loads(body or b'null')
+
+def _texts(payload: dict, key: str):
+    """Get a list of non-empty texts from the payload, or None if invalid."""
+    texts = payload.get(key)
+    max_length = current_app.config.get('MAX_CONTENT_LENGTH')
+    if not isinstance(texts, list) or not texts:
+        return None
+    if not all(isinstance(text, str) and text.strip() for text in texts):
+        return None
+    if max_length and any(len(text.encode('utf-8')) > max_length for text in texts):
+        return None
+    return texts
+
+@batch_bp.route('/analyze', methods=['POST'])
+@csrf.exempt  # Token authenticated, no cookies to protect
+@limiter.limit(lambda: current_app.config.get('BATCH_RATE_LIMIT', '10 per hour'),
+               key_func=_rate_limit_key)
+@require_api_token
+def analyze_batch():
+    """Analyze every CV against every job description, streaming results as NDJSON.
+
+    Expects ``{"cvs": [...], "jds": [...], "language": "en", "rewrite": false}``
+    with an API bearer token. The first line describes the batch, then one
+    line per pair is sent as it completes (with the id of the report saved
+    for it), and a final line reports how many pairs completed. A batch
+    holds one admission slot while it runs: under load the rewrite is
+    skipped (``degraded``), and when saturated the response is a 503 with
+    ``Retry-After``.
+    """
+    try:
+        payload = _read_json()
+    except ValueError:
+        return _bad_request("The request body must be JSON.")
+    if not isinstance(payload, dict):
+        return _bad_request("The request body must be a JSON object.")
+
+    cvs, jds = _texts(payload, 'cvs'), _texts(payload, 'jds')
+    if cvs is None or jds is None:
+        return _bad_request("'cvs' and 'jds' must be non-empty lists of texts within the size limit.")
+    max_pairs = current_app.config.get('BATCH_MAX_PAIRS', 200)
+    if len(cvs) * len(jds) > max_pairs:
+        return _bad_request(f"A batch may hold at most {max_pairs} CV/JD pairs.")
+    language = payload.get('language', 'en')
+    if language not in current_app.config.get('SUPPORTED_LANGUAGES', {'en': 'English'}):
+        return _bad_request(f"Unsupported language: {language}")
+    rewrite = bool(payload.get('rewrite', False))
+
+    admission = get_admission()
+    try:
+        ticket = admission.acquire() if admission else None
+    except OverloadedError as e:
+        response = jsonify({'error': "The service is saturated. Retry later."})
+        response.headers['Retry-After'] = str(int(e.retry_after))
+        return response, 503
+    degraded = bool(ticket and ticket.degraded)
+    rewrite = rewrite and not degraded
+
+    batch_id = uuid.uuid4().hex[:12]
+    analyzer_service = get_analyzer_service()
+    report_service = get_report_service()
+    concurrency = current_app.config.get('BATCH_CONCURRENCY', 8)
+    patience = current_app.config.get('BATCH_QUEUE_PATIENCE', 600)
+    logger.info(f"Batch {batch_id}: {len(cvs)} CVs x {len(jds)} JDs (rewrite={rewrite})")
+
+    def lines():
+        yield _ndjson({'batch_id': batch_id, 'pairs': len(cvs) * len(jds), 'rewrite': rewrite,
+                      'degraded': degraded})
+        completed = 0
+        try:
+            stream = analyzer_service.analyze_batch(
+                cvs, jds, language, rewrite, concurrency=concurrency, patience=patience,
+                model=ticket.model if ticket else None
+            )
+            # Pairs run on the LLM pool loop; this generator only saves
+            # reports and relays results as they finish
+            for result in http_pool.iterate(stream):
+                cv_index, jd_index = result['cv_index'], result['jd_index']
+                try:
+                    report_id = report_service.save_report(
+                        cvs[cv_index], jds[jd_index], result['analysis'], result.get('rewritten_cv'),
+                        language,
+                        filename=report_service.generate_report_filename(
+                            f"report-{batch_id}-{jd_index}-{cv_index}"),
+                        compaction=result.get('compaction')
+                    )
+                except ReportSaveError:
+                    report_id = None
+                    result.setdefault('errors', {})['report'] = "not saved"
+                completed += 1
+                if ticket:
+                    ticket.renew()
+                yield _ndjson({**result, 'report_id': report_id or None})
+        except Exception as e:
+            logger.exception(f"Error in batch {batch_id}: {e}")
+            yield _ndjson({'error': "The batch was interrupted. Completed pairs were saved."})
+        finally:
+            if ticket:
+                ticket.release()
+        yield _ndjson({'done': True, 'completed': completed})
+
+    response = Response(lines(), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Do not let a proxy buffer the stream
+    })
+    if ticket:
+        # Also released if the stream is abandoned before it starts
+        response.call_on_close(ticket.release)
+    return response
@@ -10,6 +10,7 @@ from flask import (
 )
 
 from appopvibe.models.forms import FeedbackForm
+from appopvibe.services.report.retention import FEEDBACK_SHARD_FORMAT
 
 # Create blueprint
 feedback_bp = Blueprint('feedback', __name__, url_prefix='/feedback')
@@ -30,7 +31,8 @@ def submit_feedback():
             rating = form.rating.data
             
             # Create filename with timestamp and email (if provided)
-            timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H-%M-%SZ")
+            now = datetime.datetime.now(datetime.timezone.utc)
+            timestamp = now.strftime("%Y-%m-%dT%H-%M-%SZ")
             email_slug = "anonymous"
             if email:
                 email_slug = email.replace('@', '-').replace('.', '-')
@@ -49,8 +51,9 @@ Email: {email or 'Not provided'}
 {feedback_text}
 """
             
-            # Save feedback to file
-            feedback_dir = current_app.config.get('FEEDBACK_FOLDER', 'feedback')
+            # Save feedback to file, in the directory of its day (for retention)
+            feedback_dir = os.path.join(current_app.config.get('FEEDBACK_FOLDER', 'feedback'),
+                                        now.strftime(FEEDBACK_SHARD_FORMAT))
             os.makedirs(feedback_dir, exist_ok=True)
             
             with open(os.path.join(feedback_dir, filename), 'w', encoding='utf-8') as f:
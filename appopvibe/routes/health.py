@@ -7,6 +7,13 @@ import platform
 import logging
 from flask import Blueprint, jsonify, current_app
 
+from appopvibe.services.container import (
+    get_response_cache, get_job_queue, get_circuit_breaker, get_throttle,
+    get_template_registry, get_admission, get_retention_sweeper
+)
+from appopvibe.services.llm.single_flight import single_flight
+from appopvibe.services.llm.usage import usage_tracker
+
 # Create blueprint
 health_bp = Blueprint('health', __name__, url_prefix='/health')
 
@@ -42,4 +49,73 @@ def detailed_health():
         'system_info': system_info,
     }
     
+    # LLM response cache counters (shared by all workers)
+    try:
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            health_status['llm_cache'] = response_cache.stats()
+    except Exception as e:
+        logger.warning(f"Could not read LLM cache stats: {e}")
+    
+    # Versions of the prompt templates in use (they are part of the cache keys)
+    try:
+        health_status['prompt_templates'] = get_template_registry().versions()
+    except Exception as e:
+        logger.warning(f"Could not read prompt template versions: {e}")
+    
+    # Token usage, prompt-cache hits and latency per template version (this worker)
+    health_status['llm_usage'] = usage_tracker.snapshot()
+    
+    # Provider circuit breakers: state, failure/retry counters and recent transitions
+    try:
+        breaker = get_circuit_breaker()
+        if breaker is not None:
+            health_status['llm_breakers'] = breaker.states()
+            health_status['llm_breaker_transitions'] = breaker.transitions()
+    except Exception as e:
+        logger.warning(f"Could not read circuit breaker states: {e}")
+    
+    # Rate limiter bucket levels and queueing per provider/model
+    try:
+        throttle = get_throttle()
+        if throttle is not None:
+            health_status['llm_throttle'] = throttle.stats()
+    except Exception as e:
+        logger.warning(f"Could not read rate limiter stats: {e}")
+    
+    # Analyses in flight and queued, and how many were degraded or shed
+    try:
+        admission = get_admission()
+        if admission is not None:
+            health_status['admission'] = admission.stats()
+    except Exception as e:
+        logger.warning(f"Could not read admission stats: {e}")
+    
+    # Last retention sweep (by any worker) and what recent sweeps removed
+    try:
+        if current_app.config.get('RETENTION_SWEEP_ENABLED'):
+            health_status['retention'] = get_retention_sweeper().stats()
+        else:
+            health_status['retention'] = {'enabled': False}
+    except Exception as e:
+        logger.warning(f"Could not read retention stats: {e}")
+    
+    # Identical LLM calls merged in this worker
+    health_status['llm_single_flight'] = {
+        'coalesced': single_flight.coalesced,
+        'in_flight': single_flight.in_flight(),
+    }
+    
+    # Requests in flight in this worker when served natively over ASGI
+    asgi_app = current_app.extensions.get('appopvibe.asgi')
+    if asgi_app is not None:
+        health_status['asgi'] = asgi_app.stats()
+    
+    # Background job queue depth per state
+    if current_app.config.get('ANALYZE_ASYNC'):
+        try:
+            health_status['jobs'] = get_job_queue().depth()
+        except Exception as e:
+            logger.warning(f"Could not read job queue depth: {e}")
+    
     return jsonify(health_status), 200 if health_status['status'] == 'ok' else 503
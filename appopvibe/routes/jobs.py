@@ -0,0 +1,70 @@
+"""
+Job status routes for the CV Analyzer application.
+"""
+import logging
+from flask import (
+    Blueprint, render_template, redirect, url_for,
+    flash, abort, session, jsonify, current_app
+)
+
+from appopvibe.services.container import get_job_queue
+from appopvibe.services.jobs.job_queue import DONE, FAILED
+
+# Create blueprint
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+# Setup logger
+logger = logging.getLogger(__name__)
+
+# Number of job ids remembered in the session cookie
+MAX_SESSION_JOBS = 10
+
+def remember_job(job_id: str):
+    """Allow the current session to poll the given job."""
+    job_ids = session.get('job_ids', [])
+    session['job_ids'] = (job_ids + [job_id])[-MAX_SESSION_JOBS:]
+
+def _get_own_job(job_id: str) -> dict:
+    """Load a job, aborting unless it belongs to the current session."""
+    # Security check - only allow polling jobs submitted from this session
+    if job_id not in session.get('job_ids', []):
+        abort(403)
+    
+    job = get_job_queue().get(job_id)
+    if job is None:
+        abort(404)
+    return job
+
+@jobs_bp.route('/<job_id>')
+def job_status(job_id):
+    """Show the progress of a queued analysis, redirecting to the report once done."""
+    job = _get_own_job(job_id)
+    
+    if job['status'] == DONE:
+        session['current_report_id'] = job['report_id']
+        return redirect(url_for('report.view_report', report_id=job['report_id']))
+    
+    if job['status'] == FAILED:
+        logger.warning(f"Job {job_id} failed: {job['error']}")
+        flash("An error occurred while analyzing your CV. Please try again.", "error")
+        return redirect(url_for('main.index'))
+    
+    return render_template(
+        'job_status.html',
+        job=job,
+        poll_seconds=current_app.config.get('JOB_STATUS_POLL_SECONDS', 2)
+    )
+
+@jobs_bp.route('/<job_id>/status')
+def job_status_json(job_id):
+    """Report the state of a queued analysis as JSON."""
+    job = _get_own_job(job_id)
+    
+    status = {
+        'id': job['id'],
+        'status': job['status'],
+    }
+    if job['status'] == DONE:
+        status['report_url'] = url_for('jobs.job_status', job_id=job_id)
+    
+    return jsonify(status)
@@ -1,46 +1,129 @@
 """
 Report routes for the CV Analyzer application.
+
+Reports never change once saved, so responses carry strong ETags derived
+from the report's content digest and a Last-Modified date, and repeat
+requests are answered with 304 Not Modified. Bodies are compressed for
+clients that accept it; downloads use stored compressed copies.
 """
-import os
+import io
+import hashlib
+import datetime
+from pathlib import Path
 from flask import (
-    Blueprint, render_template, send_from_directory,
-    current_app, abort, session
+    Blueprint, render_template, send_file, make_response, request,
+    current_app, abort, session, Response
 )
-from appopvibe.services import ReportService
+from werkzeug.http import is_resource_modified
+
+from appopvibe.services.container import get_report_service
+from appopvibe.services.report.report_service import RENDERER_VERSION
+from appopvibe.utils.compression import compress, negotiate
 
 # Create blueprint
 report_bp = Blueprint('report', __name__, url_prefix='/report')
 
+# Reports are private to their session: browsers may keep them but must
+# revalidate, which re-runs the session check
+CACHE_CONTROL = 'private, no-cache'
+
+def _check_access(report_id: str):
+    """Only allow access to the report of the current session."""
+    if 'current_report_id' not in session or session['current_report_id'] != report_id:
+        abort(403)
+
+def _page_version() -> str:
+    """Digest of the templates the report page is rendered from (part of its ETag)."""
+    key = 'appopvibe.report_page_version'
+    if key not in current_app.extensions:
+        env = current_app.jinja_env
+        sources = [env.loader.get_source(env, name)[0] for name in ('base.html', 'report.html')]
+        current_app.extensions[key] = hashlib.sha256('\0'.join(sources).encode('utf-8')).hexdigest()[:8]
+    return current_app.extensions[key]
+
+def _encoded(response: Response, encoding):
+    """Mark a response body as sent with a content encoding (None for none)."""
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _validators(response: Response, etag: str, last_modified: datetime.datetime):
+    """Set the validators and cache policy of a report response."""
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
 @report_bp.route('/<report_id>')
 def view_report(report_id):
     """Display a CV analysis report."""
     # Security check - only allow viewing if report ID matches session
-    if 'current_report_id' not in session or session['current_report_id'] != report_id:
-        abort(403)
-        
-    reports_folder = current_app.config.get('REPORTS_FOLDER', 'reports')
-    report_service = ReportService(reports_directory=reports_folder)
+    _check_access(report_id)
+
+    report_service = get_report_service()
+    entry = report_service.get_report_info(report_id)
+    encoding = negotiate(request.accept_encodings)
+
+    # A page showing flashed messages differs from the report's usual page,
+    # so it is neither validated nor cached
+    etag = last_modified = None
+    if entry is not None and not session.get('_flashes'):
+        etag = f"{entry['digest'][:32]}-{RENDERER_VERSION}-{_page_version()}"
+        if encoding:
+            etag += f"-{encoding}"
+        last_modified = datetime.datetime.fromtimestamp(int(entry['created_at']), datetime.timezone.utc)
+        if not is_resource_modified(request.environ, etag, last_modified=last_modified):
+            return _encoded(_validators(Response(status=304), etag, last_modified), None)
+
     report_html = report_service.get_report_html(report_id)
-    
+
     if report_html is None:
         abort(404)
-        
-    return render_template('report.html', report_content=report_html)
+
+    response = make_response(render_template('report.html', report_content=report_html, report_id=report_id))
+    if encoding:
+        response.set_data(compress(response.get_data(), encoding))
+    _encoded(response, encoding)
+    if etag is None:
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    return _validators(response, etag, last_modified)
 
 @report_bp.route('/download/<report_id>')
 def download_report(report_id):
     """Download the raw report file."""
     # Security check - only allow download if report ID matches session
-    if 'current_report_id' not in session or session['current_report_id'] != report_id:
-        abort(403)
-        
-    reports_folder = current_app.config.get('REPORTS_FOLDER', 'reports')
-    try:
-        return send_from_directory(
-            reports_folder,
-            f"{report_id}.md",
-            as_attachment=True,
-            download_name=f"cv_analysis_{report_id}.md"
-        )
-    except FileNotFoundError:
-        abort(404)
+    _check_access(report_id)
+
+    report_service = get_report_service()
+    entry = report_service.get_report_info(report_id)
+
+    # Send the compressed copy if the client accepts it, else the report file;
+    # reports stored as blobs have no file and are sent as reassembled
+    encoding = negotiate(request.accept_encodings)
+    encoded_path = report_service.encoded_report_path(report_id, encoding) if encoding else None
+    if encoded_path is None:
+        encoding = None
+    source = encoded_path or report_service.report_path(report_id)
+    if source is None:
+        content = report_service.get_report(report_id)
+        if content is None:
+            abort(404)
+        source = io.BytesIO(content.encode('utf-8'))
+    digest = entry['digest'] if entry else None
+
+    # send_file hands the file to the server's sendfile support when it has
+    # one, and answers conditional and range requests
+    response = send_file(
+        source,
+        mimetype='text/markdown',
+        as_attachment=True,
+        download_name=f"cv_analysis_{Path(report_id).stem}.md",
+        conditional=True,
+        etag=(f"{digest[:32]}-{encoding}" if encoding else digest[:32]) if digest else True,
+        last_modified=entry['created_at'] if entry else None,
+        max_age=None
+    )
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return _encoded(response, encoding)
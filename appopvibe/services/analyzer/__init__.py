@@ -2,5 +2,7 @@
 Analyzer service module for CV Analyzer application.
 """
 from appopvibe.services.analyzer.analyzer_service import AnalyzerService
+from appopvibe.services.analyzer.keyword_matcher import KeywordMatch, KeywordMatcher
+from appopvibe.services.analyzer.template_registry import PromptTemplate, TemplateRegistry
 
-__all__ = ['AnalyzerService']
+__all__ = ['AnalyzerService', 'KeywordMatch', 'KeywordMatcher', 'PromptTemplate', 'TemplateRegistry']
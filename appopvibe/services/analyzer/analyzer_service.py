@@ -1,67 +1,168 @@
 """
 CV analyzer service that processes CVs and job descriptions.
 """
+import asyncio
 import logging
-from typing import Dict, Any, Optional, Tuple
-import hashlib
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
 
 from appopvibe.services.llm.llm_service import LLMService
+from appopvibe.services.llm.throttle import queue_patience
+from appopvibe.services.analyzer.template_registry import PromptTemplate, TemplateRegistry, INLINE
+from appopvibe.services.analyzer.input_compactor import InputCompactor
+from appopvibe.services.analyzer.keyword_matcher import KeywordMatch, KeywordMatcher, merge_keyword_section
+from appopvibe.services.analyzer.requirements import JobRequirements, jd_digest
+
+# Output limit of the requirements extraction (a short JSON object)
+REQUIREMENTS_MAX_TOKENS = 1024
 
 class AnalyzerService:
     """Service for analyzing CV and job description matches."""
     
-    def __init__(self, llm_service: LLMService, prompt_templates: Dict[str, Dict[str, str]]):
+    def __init__(self, llm_service: LLMService,
+                 prompt_templates: Union[TemplateRegistry, Dict[str, Dict[str, str]]],
+                 task_timeout: Optional[float] = None, prompt_layout: str = INLINE,
+                 compactor: Optional[InputCompactor] = None,
+                 keyword_matcher: Optional[KeywordMatcher] = None, two_stage: bool = False):
         """Initialize the analyzer service.
         
         Args:
             llm_service: The LLM service for generating text
-            prompt_templates: Dictionary of prompt templates keyed by language
+            prompt_templates: Template registry, or a dictionary of prompt
+                templates keyed by language
+            task_timeout: Seconds each part of a submission may take (None for no limit)
+            prompt_layout: How prompts are split into messages ('inline' or 'system_prefix')
+            compactor: Input compaction applied to submissions (None sends them as is)
+            keyword_matcher: Local matcher producing the Keyword Analysis section
+                for templates that take a ``keywords`` input
+            two_stage: Extract (and cache) the JD's requirements first, then
+                match the CV against them instead of the full JD; needs the
+                'requirements' and 'match' templates
         """
         self.llm_service = llm_service
+        if not isinstance(prompt_templates, TemplateRegistry):
+            prompt_templates = TemplateRegistry.from_dict(prompt_templates)
         self.prompt_templates = prompt_templates
+        self.task_timeout = task_timeout
+        self.prompt_layout = prompt_layout
+        self.compactor = compactor
+        self.keyword_matcher = keyword_matcher or KeywordMatcher()
+        self.two_stage = two_stage
         self.logger = logging.getLogger(__name__)
     
-    def _get_prompt_template(self, language: str, template_type: str) -> str:
+    def _get_prompt_template(self, language: str, template_type: str) -> PromptTemplate:
         """Get the appropriate prompt template based on language and type."""
+        template = self.prompt_templates.get(language, template_type)
+        self.logger.info(f"Using prompt template {template.name}@{template.version}")
+        return template
+    
+    def _compact(self, cv_text: str, jd_text: str) -> Tuple[str, str, Optional[Dict[str, int]]]:
+        """Compact a submission for the LLM; returns the texts and token statistics."""
+        if self.compactor is None:
+            return cv_text, jd_text, None
+        compacted = self.compactor.compact(
+            cv_text, jd_text, getattr(self.llm_service, 'default_model', None)
+        )
+        return compacted.cv, compacted.jd, compacted.stats()
+    
+    def _match_keywords(self, template: PromptTemplate, cv_text: str,
+                        jd_text: str) -> Optional[KeywordMatch]:
+        """Match keywords locally if the template leaves that section to us."""
+        if 'keywords' not in template.fields:
+            return None
+        keywords = self.keyword_matcher.match(cv_text, jd_text)
+        self.logger.info(f"Matched {len(keywords.matched)} of "
+                         f"{len(keywords.matched) + len(keywords.missing)} JD keywords locally")
+        return keywords
+    
+    async def extract_requirements(self, jd_text: str,
+                                   language: str = 'en') -> Optional[JobRequirements]:
+        """Extract the requirements of a job description (first analysis stage).
+        
+        The extraction is served from the LLM response cache whenever the
+        same job description was extracted before.
+        
+        Args:
+            jd_text: The job description text content
+            language: The language code (e.g., 'en', 'fr')
+            
+        Returns:
+            The requirements, or None if they could not be extracted
+        """
+        digest = jd_digest(jd_text)
         try:
-            return self.prompt_templates[language][template_type]
-        except KeyError:
-            self.logger.warning(f"Template not found for {language}/{template_type}, falling back to English")
-            return self.prompt_templates['en'][template_type]
+            prompt = self._get_prompt_template(language, 'requirements').layout(
+                self.prompt_layout, jd=jd_text)
+            text = await self.llm_service.cached_generate(
+                prompt=prompt.prompt,
+                temperature=0.0,  # The extraction is reused, keep it deterministic
+                max_tokens=REQUIREMENTS_MAX_TOKENS,
+                template_version=prompt.template_version,
+                system=prompt.system
+            )
+        except Exception as e:
+            self.logger.error(f"Requirements extraction of JD {digest[:12]} failed: {e}")
+            return None
+        
+        requirements = JobRequirements.parse(text, digest)
+        if requirements is not None:
+            self.logger.info(f"Using requirements of JD {digest[:12]} "
+                             f"({len(requirements.must_have)} must-haves, {requirements.seniority})")
+        return requirements
     
-    def _create_hash(self, text: str) -> str:
-        """Create a hash of the given text for caching purposes."""
-        return hashlib.md5(text.encode('utf-8')).hexdigest()
+    async def _analysis_prompt(self, cv_text: str, jd_text: str, language: str):
+        """Build the analysis prompt, with the locally matched keywords if the template uses them.
+        
+        In two-stage mode the CV is matched against the JD's extracted
+        requirements; the full JD is sent only if the extraction fails.
+        """
+        requirements = await self.extract_requirements(jd_text, language) if self.two_stage else None
+        if requirements is not None:
+            template = self._get_prompt_template(language, 'match')
+            values = {'cv': cv_text, 'requirements': requirements.to_prompt(language)}
+        else:
+            template = self._get_prompt_template(language, 'analysis')
+            values = {'cv': cv_text, 'jd': jd_text}
+        
+        keywords = self._match_keywords(template, cv_text, jd_text)
+        values['keywords'] = keywords.to_prompt(language) if keywords else ''
+        return template.layout(self.prompt_layout, **values), keywords
+    
+    @staticmethod
+    def _with_keywords(analysis: str, keywords: Optional[KeywordMatch], language: str) -> str:
+        """Insert the Keyword Analysis section into a successful LLM analysis."""
+        if keywords is None or analysis.startswith("Error:"):
+            return analysis
+        return merge_keyword_section(analysis, keywords.to_markdown(language))
     
     async def analyze_cv_jd(self, cv_text: str, jd_text: str, 
-                          language: str = 'en') -> str:
+                          language: str = 'en', model: Optional[str] = None) -> str:
         """Analyze a CV against a job description.
         
         Args:
             cv_text: The CV text content
             jd_text: The job description text content
             language: The language code (e.g., 'en', 'fr')
+            model: Model to use instead of the LLM service's default
             
         Returns:
             Analysis results as a formatted string
         """
         self.logger.info(f"Analyzing CV ({len(cv_text)} chars) against JD ({len(jd_text)} chars) in {language}")
         
-        # Get the appropriate prompt template
-        analysis_template = self._get_prompt_template(language, 'analysis')
-        
-        # Create prompt from template
-        analysis_prompt = analysis_template.format(cv=cv_text, jd=jd_text)
-        
-        # Generate analysis using LLM service
-        cv_hash = self._create_hash(cv_text)
-        jd_hash = self._create_hash(jd_text)
+        # Create prompt from template; keywords are matched locally rather
+        # than by the LLM when the template allows it
+        analysis_prompt, keywords = await self._analysis_prompt(cv_text, jd_text, language)
         
-        # Use cached version if available to save API costs
+        # Use cached version if available to save API costs; the template
+        # version is part of the cache key so editing a template invalidates it
         analysis_result = await self.llm_service.cached_generate(
-            prompt=analysis_prompt, 
-            temperature=0.2  # Lower temperature for more consistent analysis
+            prompt=analysis_prompt.prompt, 
+            temperature=0.2,  # Lower temperature for more consistent analysis
+            model=model,
+            template_version=analysis_prompt.template_version,
+            system=analysis_prompt.system
         )
+        analysis_result = self._with_keywords(analysis_result, keywords, language)
         
         self.logger.info(f"Analysis completed, result length: {len(analysis_result)}")
         return analysis_result
@@ -84,19 +185,23 @@ class AnalyzerService:
         rewrite_template = self._get_prompt_template(language, 'rewrite')
         
         # Create prompt from template
-        rewrite_prompt = rewrite_template.format(cv=cv_text, jd=jd_text)
+        rewrite_prompt = rewrite_template.layout(self.prompt_layout, cv=cv_text, jd=jd_text)
         
         # Generate rewrite using LLM service
         rewrite_result = await self.llm_service.generate(
-            prompt=rewrite_prompt,
-            temperature=0.4  # Moderate temperature for creativity but relevance
+            prompt=rewrite_prompt.prompt,
+            temperature=0.4,  # Moderate temperature for creativity but relevance
+            system=rewrite_prompt.system,
+            template_version=rewrite_prompt.template_version
         )
         
         self.logger.info(f"CV rewriting completed, result length: {len(rewrite_result)}")
         return rewrite_result
         
     async def process_submission(self, cv_text: str, jd_text: str,
-                              language: str = 'en', rewrite: bool = False) -> Dict[str, str]:
+                              language: str = 'en', rewrite: bool = False,
+                              task_timeout: Optional[float] = None,
+                              model: Optional[str] = None) -> Dict[str, str]:
         """Process a complete submission including analysis and optional CV rewriting.
         
         Args:
@@ -104,34 +209,206 @@ class AnalyzerService:
             jd_text: The job description text content
             language: The language code (e.g., 'en', 'fr')
             rewrite: Whether to include CV rewriting
+            task_timeout: Per-part timeout overriding the service's own
+            model: Model to use for the analysis instead of the default
             
         Returns:
-            Dict with analysis and optionally rewritten CV
+            Dict with analysis, optionally rewritten CV, and the token
+            statistics of input compaction under 'compaction'
         """
         self.logger.info(f"Processing submission (rewrite={rewrite})")
+        cv_text, jd_text, compaction = self._compact(cv_text, jd_text)
         
-        # Start analysis
-        analysis_task = self.analyze_cv_jd(cv_text, jd_text, language)
+        timeout = self.task_timeout if task_timeout is None else task_timeout
         
-        # If rewrite requested, start that too
-        rewrite_task = None
+        # Run analysis and rewrite as concurrent tasks so the user waits for
+        # the slower of the two LLM calls rather than their sum
+        parts = {'analysis': self.analyze_cv_jd(cv_text, jd_text, language, model)}
         if rewrite:
-            rewrite_task = self.rewrite_cv(cv_text, jd_text, language)
+            parts['rewritten_cv'] = self.rewrite_cv(cv_text, jd_text, language)
         
-        # Wait for analysis to complete
-        analysis = await analysis_task
-        
-        # Wait for rewrite if requested
-        rewritten_cv = None
-        if rewrite_task:
-            rewritten_cv = await rewrite_task
-            
-        # Build result
-        result = {
-            'analysis': analysis
+        tasks = {
+            name: asyncio.create_task(asyncio.wait_for(coro, timeout))
+            for name, coro in parts.items()
         }
         
-        if rewritten_cv:
-            result['rewritten_cv'] = rewritten_cv
+        try:
+            outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        except asyncio.CancelledError:
+            # The request was aborted: do not leave sibling LLM calls running
+            for task in tasks.values():
+                task.cancel()
+            raise
+        
+        # Build result, reporting each part separately so a failed rewrite
+        # does not cost the user their analysis
+        result = {}
+        errors = {}
+        for name, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                self.logger.error(f"Submission part '{name}' timed out after {timeout}s")
+                errors[name] = "timed out"
+            elif isinstance(outcome, BaseException):
+                self.logger.error(f"Submission part '{name}' failed: {outcome}", exc_info=outcome)
+                errors[name] = "failed"
+            elif isinstance(outcome, str) and outcome.startswith("Error:"):
+                # The LLM service reports provider failures as error texts
+                self.logger.error(f"Submission part '{name}' failed: {outcome}")
+                errors[name] = "failed"
+                if name == 'analysis':
+                    result[name] = outcome  # keeps the provider's explanation
+            else:
+                result[name] = outcome
+        
+        if 'analysis' not in result:
+            result['analysis'] = f"Error: The analysis {errors['analysis']}."
+        
+        if errors:
+            result['errors'] = errors
+        if compaction is not None:
+            result['compaction'] = compaction
             
         return result
+
+    async def stream_submission(self, cv_text: str, jd_text: str, language: str = 'en',
+                                rewrite: bool = False,
+                                model: Optional[str] = None) -> AsyncIterator[Dict[str, str]]:
+        """Stream a submission, yielding text as the LLM produces it.
+        
+        Analysis and rewrite are streamed concurrently and their chunks are
+        interleaved as they arrive.
+        
+        Args:
+            cv_text: The CV text content
+            jd_text: The job description text content
+            language: The language code (e.g., 'en', 'fr')
+            rewrite: Whether to include CV rewriting
+            model: Model to use for the analysis instead of the default
+            
+        Yields:
+            ``{'compaction': stats}`` first if inputs were compacted, then
+            ``{'part': name, 'delta': chunk}`` for each chunk, and one
+            ``{'part': name, 'text': full_text}`` per part when it completes
+            (with an ``'error'`` entry if it failed)
+        """
+        self.logger.info(f"Streaming submission (rewrite={rewrite})")
+        cv_text, jd_text, compaction = self._compact(cv_text, jd_text)
+        if compaction is not None:
+            yield {'compaction': compaction}
+        
+        keywords = None
+        
+        async def analysis_stream():
+            # Build the prompt inside the stream so a requirements extraction
+            # runs under the part's timeout and does not hold up the rewrite
+            nonlocal keywords
+            analysis_prompt, keywords = await self._analysis_prompt(cv_text, jd_text, language)
+            async for chunk in self.llm_service.generate_stream(
+                prompt=analysis_prompt.prompt,
+                temperature=0.2,
+                model=model,
+                template_version=analysis_prompt.template_version,
+                use_cache=True,
+                system=analysis_prompt.system
+            ):
+                yield chunk
+        
+        streams = {'analysis': analysis_stream()}
+        if rewrite:
+            rewrite_prompt = self._get_prompt_template(language, 'rewrite').layout(
+                self.prompt_layout, cv=cv_text, jd=jd_text)
+            streams['rewritten_cv'] = self.llm_service.generate_stream(
+                prompt=rewrite_prompt.prompt,
+                temperature=0.4,
+                template_version=rewrite_prompt.template_version,
+                system=rewrite_prompt.system
+            )
+        
+        events = asyncio.Queue()
+        
+        async def pump(name: str, stream: AsyncIterator[str]):
+            chunks = []
+            final = {'part': name}
+            try:
+                async with asyncio.timeout(self.task_timeout):
+                    async for chunk in stream:
+                        chunks.append(chunk)
+                        await events.put({'part': name, 'delta': chunk})
+            except TimeoutError:
+                self.logger.error(f"Streamed part '{name}' timed out after {self.task_timeout}s")
+                final['error'] = "timed out"
+            except Exception as e:
+                self.logger.error(f"Streamed part '{name}' failed: {e}", exc_info=e)
+                final['error'] = "failed"
+            final['text'] = "".join(chunks)
+            if name == 'analysis' and 'error' not in final:
+                final['text'] = self._with_keywords(final['text'], keywords, language)
+            await events.put(final)
+        
+        tasks = [asyncio.create_task(pump(name, stream)) for name, stream in streams.items()]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                event = await events.get()
+                if 'text' in event:
+                    remaining -= 1
+                yield event
+        finally:
+            # Stop any part still running if the consumer went away
+            for task in tasks:
+                task.cancel()
+
+    async def analyze_batch(self, cv_texts: List[str], jd_texts: List[str], language: str = 'en',
+                            rewrite: bool = False, concurrency: int = 8,
+                            patience: float = 600.0,
+                            model: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Analyze every CV against every job description.
+        
+        Pairs are processed by ``concurrency`` workers, one job description
+        at a time so its requirements extraction is shared by all CVs. Calls
+        queue for provider quota for up to ``patience`` seconds rather than
+        failing, so a batch runs at the pace the provider allows.
+        
+        Args:
+            cv_texts: The CV text contents
+            jd_texts: The job description text contents
+            language: The language code (e.g., 'en', 'fr')
+            rewrite: Whether to include CV rewriting
+            concurrency: Most pairs in progress at once
+            patience: Longest a call may queue for rate limit quota
+            model: Model to use instead of the configured one (e.g. under load)
+            
+        Yields:
+            One ``process_submission`` result per pair, in completion order,
+            with the pair's ``cv_index`` and ``jd_index``
+        """
+        pairs = [(cv_index, jd_index)
+                 for jd_index in range(len(jd_texts)) for cv_index in range(len(cv_texts))]
+        self.logger.info(f"Analyzing batch of {len(pairs)} pairs (concurrency={concurrency})")
+        pending = iter(pairs)
+        results = asyncio.Queue()
+        # Time spent queueing for quota does not count against the part timeout
+        timeout = None if self.task_timeout is None else self.task_timeout + patience
+        
+        async def worker():
+            queue_patience.set(patience)
+            # Workers share one iterator, so each pair is taken exactly once
+            for cv_index, jd_index in pending:
+                try:
+                    result = await self.process_submission(
+                        cv_texts[cv_index], jd_texts[jd_index], language, rewrite,
+                        task_timeout=timeout, model=model
+                    )
+                except Exception as e:
+                    self.logger.error(f"Batch pair cv={cv_index} jd={jd_index} failed: {e}", exc_info=e)
+                    result = {'analysis': "Error: The analysis failed.", 'errors': {'analysis': "failed"}}
+                await results.put({'cv_index': cv_index, 'jd_index': jd_index, **result})
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(pairs)))]
+        try:
+            for _ in pairs:
+                yield await results.get()
+        finally:
+            # Stop the workers if the consumer went away
+            for task in workers:
+                task.cancel()
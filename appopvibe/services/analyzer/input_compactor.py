@@ -0,0 +1,205 @@
+"""
+Input compaction ahead of the LLM calls.
+
+CVs and job descriptions pasted from PDFs and job boards carry a lot of
+tokens that do not help the analysis: odd bullet glyphs and whitespace,
+lines repeated by copy/paste, and JD boilerplate such as equal-opportunity
+statements and benefits blurbs. Stripping them, then trimming what is left
+to the model's input budget, makes calls faster and cheaper and keeps
+oversized submissions from overflowing the context window.
+"""
+import re
+import logging
+import unicodedata
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+from appopvibe.services.llm.tokens import estimate_tokens
+
+# Bullet-like glyphs normalized to a Markdown "- " at the start of a line
+_BULLET = re.compile(r"^[ \t]*[•●▪◦‣∙·■□▫◆◇❖➢➤►▶✓✔✗\-–—*o][ \t]+", re.MULTILINE)
+_INVISIBLE = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+_SPACES = re.compile("[ \t\u00a0\u2000-\u200a\u202f\u3000]+")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+_WORD_END = re.compile(r"\S+")
+_SENTENCE_END = re.compile(r"[.!?;](?=\s)")
+
+# JD headings introducing sections that are pure boilerplate (English and French)
+_BOILERPLATE_HEADING = re.compile(
+    r"^\W*(benefits|perks|what we offer|why join us|our offer|compensation (and|&) benefits|"
+    r"equal (employment )?opportunit\w*|eeo statement|diversity (and|&) inclusion|"
+    r"avantages|ce que nous (vous )?offrons|nous (vous )?offrons|pourquoi nous rejoindre|"
+    r"diversité et inclusion|égalité des chances)\b.{0,40}$",
+    re.IGNORECASE
+)
+# Paragraphs that are boilerplate wherever they appear
+_BOILERPLATE_PARAGRAPH = re.compile(
+    r"equal opportunity employer|without regard to (race|age|sex|gender)|"
+    r"reasonable accommodations?|e-verify|protected veteran|"
+    r"égalité des chances|tous nos postes sont ouverts aux personnes en situation de handicap|"
+    r"sans distinction d'origine",
+    re.IGNORECASE
+)
+
+# Lines shorter than this are never treated as duplicates (headings, one-word skills)
+MIN_DUPLICATE_LINE_LENGTH = 25
+TRUNCATION_MARKER = "[…]"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompactedInputs:
+    """Compacted CV and JD with the token counts before and after."""
+    cv: str
+    jd: str
+    tokens_before: int
+    tokens_after: int
+    truncated: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated input tokens removed by compaction."""
+        return self.tokens_before - self.tokens_after
+
+    def stats(self) -> Dict[str, int]:
+        """Token counts to record in the report."""
+        stats = asdict(self)
+        del stats['cv'], stats['jd']
+        stats['tokens_saved'] = self.tokens_saved
+        return stats
+
+
+class InputCompactor:
+    """Normalizes, deduplicates and trims CV/JD text to a per-model token budget."""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        """Initialize the compactor.
+
+        Args:
+            budgets: Input token budget (CV plus JD) per model name, with a
+                "default" entry for other models; no entry means no trimming
+        """
+        self.budgets = budgets or {}
+
+    def budget_for(self, model: Optional[str]) -> Optional[int]:
+        """Input token budget of a model, or None for unlimited."""
+        return self.budgets.get(model) or self.budgets.get('default')
+
+    def compact(self, cv_text: str, jd_text: str, model: Optional[str] = None) -> CompactedInputs:
+        """Compact a CV/JD pair for a call to ``model``."""
+        before = estimate_tokens(cv_text, model) + estimate_tokens(jd_text, model)
+
+        cv = self._dedupe(self.normalize(cv_text))
+        jd = self._dedupe(self._strip_boilerplate(self.normalize(jd_text)))
+
+        truncated = False
+        budget = self.budget_for(model)
+        if budget:
+            cv_tokens, jd_tokens = estimate_tokens(cv, model), estimate_tokens(jd, model)
+            if cv_tokens + jd_tokens > budget:
+                # Share the budget, letting either side use what the other leaves
+                jd_budget = max(budget // 2, budget - cv_tokens)
+                jd = self._trim(jd, min(jd_tokens, jd_budget), model)
+                cv = self._trim(cv, budget - estimate_tokens(jd, model), model)
+                truncated = True
+
+        after = estimate_tokens(cv, model) + estimate_tokens(jd, model)
+        if truncated:
+            logger.warning(f"Inputs exceed the {budget} token budget of {model}, truncated")
+        logger.info(f"Compacted inputs from ~{before} to ~{after} tokens")
+        return CompactedInputs(cv, jd, before, after, truncated)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize Unicode, whitespace and bullet glyphs."""
+        text = unicodedata.normalize('NFC', text).replace('\r\n', '\n').replace('\r', '\n')
+        text = _INVISIBLE.sub('', text)
+        text = _SPACES.sub(' ', text)
+        text = '\n'.join(line.strip() for line in text.split('\n'))
+        text = _BULLET.sub('- ', text)
+        return _BLANK_RUNS.sub('\n\n', text).strip()
+
+    @staticmethod
+    def _dedupe(text: str) -> str:
+        """Drop repeated lines (keeping the first occurrence)."""
+        seen = set()
+        lines = []
+        for line in text.split('\n'):
+            key = line.casefold()
+            if len(key) >= MIN_DUPLICATE_LINE_LENGTH:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+        return _BLANK_RUNS.sub('\n\n', '\n'.join(lines)).strip()
+
+    @staticmethod
+    def _strip_boilerplate(text: str) -> str:
+        """Drop EEO/benefits sections and paragraphs from a job description."""
+        kept: List[str] = []
+        skipping = False
+        for paragraph in text.split('\n\n'):
+            first_line = paragraph.split('\n', 1)[0]
+            if _BOILERPLATE_HEADING.match(first_line):
+                # A heading alone in its paragraph hides the section below it too
+                skipping = '\n' not in paragraph
+                continue
+            if skipping and not _looks_like_heading(first_line):
+                continue
+            skipping = False
+            if _BOILERPLATE_PARAGRAPH.search(paragraph):
+                continue
+            kept.append(paragraph)
+        return '\n\n'.join(kept)
+
+    @classmethod
+    def _trim(cls, text: str, budget: int, model: Optional[str]) -> str:
+        """Keep the start of ``text`` that fits in ``budget`` tokens.
+        
+        Whole lines are kept while they fit; the first line that does not is
+        cut at a sentence (or else word) boundary, so a long single-paragraph
+        input is shortened rather than dropped.
+        """
+        if estimate_tokens(text, model) <= budget:
+            return text
+        kept = []
+        used = estimate_tokens(TRUNCATION_MARKER, model)
+        for line in text.split('\n'):
+            cost = estimate_tokens(line, model)
+            if used + cost > budget:
+                head = cls._cut(line, budget - used, model)
+                if head:
+                    kept.append(head)
+                break
+            kept.append(line)
+            used += cost
+        return '\n'.join(kept + [TRUNCATION_MARKER])
+
+    @staticmethod
+    def _cut(line: str, budget: int, model: Optional[str]) -> str:
+        """Longest start of ``line`` ending on a word that fits in ``budget`` tokens,
+        shortened to its last sentence end if that keeps at least half of it."""
+        ends = [match.end() for match in _WORD_END.finditer(line)]
+        low, high = 0, len(ends)
+        while low < high:  # most words whose prefix fits
+            middle = (low + high + 1) // 2
+            if estimate_tokens(line[:ends[middle - 1]], model) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        if not low:
+            return ""
+        head = line[:ends[low - 1]]
+        sentence_ends = [match.end() for match in _SENTENCE_END.finditer(head + " ")]
+        if sentence_ends and sentence_ends[-1] >= len(head) // 2:
+            head = head[:sentence_ends[-1]]
+        return head
+
+
+def _looks_like_heading(line: str) -> bool:
+    """Short line that introduces a section (Markdown heading or "Title:")."""
+    line = line.strip()
+    return bool(line) and len(line) <= 60 and (
+        line.startswith('#') or line.endswith(':') or (line.istitle() and not line.endswith('.'))
+    )
@@ -0,0 +1,289 @@
+"""
+Local keyword matching for the "Keyword Analysis" section of a report.
+
+Skill terms are extracted from the job description (a vocabulary of known
+skills, plus acronyms, CamelCase and symbol-bearing terms such as C++ or
+Node.js) and looked up in the CV. Both steps run a word-level Aho-Corasick
+automaton over normalized tokens: case and accents are folded, plurals are
+reduced to their singular and known aliases (k8s, JS, Postgres...) map to
+the same term. The result is deterministic and takes milliseconds, so the
+LLM no longer has to produce this section.
+"""
+import re
+import unicodedata
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Known skills, each with the aliases that mean the same thing. Skills that are
+# also common words (Go, C, R, REST, Excel) are only listed in unambiguous forms.
+SKILL_VOCABULARY: Dict[str, Tuple[str, ...]] = {
+    # Languages
+    'python': (), 'java': (), 'javascript': ('js', 'ecmascript'), 'typescript': ('ts',),
+    'golang': (), 'rust': (), 'c++': ('cpp',), 'c#': ('csharp', 'c sharp'),
+    'ruby': (), 'php': (), 'scala': (), 'kotlin': (), 'swift': (), 'matlab': (),
+    'bash': ('shell scripting',), 'sql': (), 'nosql': (), 'html': ('html5',), 'css': ('css3',),
+    # Frameworks and libraries
+    'django': (), 'flask': (), 'fastapi': (), 'spring boot': (), 'react': ('reactjs', 'react.js'),
+    'angular': ('angularjs',), 'vue': ('vuejs', 'vue.js'), 'node': ('nodejs', 'node.js'),
+    '.net': ('dotnet', 'asp.net'), 'pandas': (), 'numpy': (), 'pytorch': (), 'tensorflow': (),
+    'scikit-learn': ('sklearn', 'scikit learn'), 'spark': ('apache spark', 'pyspark'),
+    'hadoop': (), 'kafka': ('apache kafka',), 'airflow': ('apache airflow',), 'graphql': (),
+    'rest api': ('restful', 'restful api'),
+    # Data stores
+    'postgresql': ('postgres',), 'mysql': (), 'mongodb': ('mongo',), 'redis': (),
+    'elasticsearch': ('elastic search',), 'snowflake': (), 'bigquery': (), 'oracle': (),
+    'sqlite': (), 'dynamodb': (), 'cassandra': (),
+    # Cloud and operations
+    'aws': ('amazon web services',), 'azure': ('microsoft azure',), 'gcp': ('google cloud', 'google cloud platform'),
+    'docker': (), 'kubernetes': ('k8s',), 'terraform': (), 'ansible': (), 'jenkins': (),
+    'ci/cd': ('continuous integration', 'continuous delivery', 'continuous deployment',
+              'intégration continue', 'déploiement continu'),
+    'git': ('github', 'gitlab'), 'linux': (), 'microservices': ('microservice architecture',),
+    'devops': (), 'observability': ('monitoring',), 'prometheus': (), 'grafana': (),
+    # Data and AI
+    'machine learning': ('ml', 'apprentissage automatique'), 'deep learning': ('apprentissage profond',),
+    'artificial intelligence': ('ai', 'intelligence artificielle', 'ia'),
+    'natural language processing': ('nlp',), 'computer vision': ('vision par ordinateur',),
+    'data analysis': ('analyse de données',), 'data engineering': (), 'etl': (),
+    'statistics': ('statistiques',), 'power bi': ('powerbi',), 'tableau': (), 'microsoft excel': ('ms excel',),
+    'llm': ('large language models',),
+    # Practices and methods
+    'agile': ('méthodes agiles', 'agilité'), 'scrum': (), 'kanban': (), 'tdd': ('test driven development',),
+    'unit testing': ('tests unitaires', 'unit tests'), 'code review': ('revue de code',),
+    'system design': (), 'distributed systems': ('systèmes distribués',), 'security': ('sécurité',),
+    'project management': ('gestion de projet',), 'product management': ('gestion de produit',),
+    'stakeholder management': ('gestion des parties prenantes',), 'jira': (), 'figma': (),
+    'ux': ('user experience', 'expérience utilisateur'), 'ui': ('user interface', 'interface utilisateur'),
+    'seo': (), 'sap': (), 'salesforce': (), 'erp': (), 'crm': (),
+    # Languages spoken
+    'english': ('anglais',), 'french': ('français',), 'german': ('allemand',), 'spanish': ('espagnol',),
+}
+
+# Acronyms that are not skills
+STOP_ACRONYMS = {
+    'CV', 'JD', 'OR', 'AND', 'THE', 'FOR', 'USA', 'UK', 'EU', 'EEO', 'HR', 'CEO', 'CTO', 'CFO',
+    'LLC', 'INC', 'LTD', 'SA', 'SAS', 'SARL', 'PME', 'CDI', 'CDD', 'RTT', 'TBD', 'FAQ', 'ETC',
+    'NB', 'PS', 'IT', 'ET', 'OU', 'LE', 'LA', 'DE', 'DU', 'EN', 'AU', 'UN', 'WE', 'YOU', 'OUR',
+    'NOT', 'ALL', 'NEW', 'ASAP', 'H', 'F', 'M', 'K', 'KM', 'AM', 'PM',
+    # Currencies
+    'USD', 'EUR', 'GBP', 'CHF', 'CAD', 'AUD', 'JPY', 'CNY', 'INR', 'SEK', 'NOK', 'DKK', 'PLN',
+    # Countries and regions
+    'US', 'FR', 'BE', 'CH', 'CA', 'NL', 'ES', 'PT', 'PL', 'SE', 'NO', 'DK', 'IE', 'LU', 'AT',
+    'IN', 'CN', 'JP', 'AU', 'NZ', 'UAE', 'EMEA', 'APAC', 'LATAM', 'NA',
+    # Degrees
+    'BAC', 'BTS', 'DUT', 'BUT', 'BA', 'BS', 'BSC', 'MA', 'MS', 'MSC', 'MBA', 'PHD', 'MENG', 'BENG',
+}
+
+# "Bac+5", "5+": a level or a count, not a skill like C++
+_NUMBERED = re.compile(r"\+\d+$")
+
+MAX_KEYWORDS = 40
+
+_TOKEN = re.compile(r"\.?\w[\w+#]*(?:\.\w+)*")
+_ACRONYM = re.compile(r"^[A-Z][A-Z0-9]{1,4}$")
+_CAMEL_CASE = re.compile(r"^[A-Za-z][a-z]+[A-Z][A-Za-z0-9]*$")
+
+# Section labels per report language
+LABELS = {
+    'en': ('## 2. Keyword Analysis', 'Matched Keywords', 'Missing Keywords', 'none'),
+    'fr': ('## 2. Analyse des mots-clés', 'Mots-clés correspondants', 'Mots-clés manquants', 'aucun'),
+}
+
+
+def normalize_token(token: str) -> str:
+    """Fold case, accents and plurals of a single token."""
+    token = unicodedata.normalize('NFKD', token.casefold())
+    token = ''.join(ch for ch in token if not unicodedata.combining(ch))
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 4 and token.endswith('aux'):
+        return token[:-3] + 'al'
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'sis')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """Split text into (surface form, normalized form) tokens."""
+    return [(token, normalize_token(token)) for token in _TOKEN.findall(text)]
+
+
+def _phrase_key(phrase: str) -> Tuple[str, ...]:
+    return tuple(normalized for _, normalized in tokenize(phrase))
+
+
+class _Automaton:
+    """Aho-Corasick automaton over token sequences (whole-token matches only)."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, int]]] = [[]]
+
+    def add(self, tokens: Tuple[str, ...], value: str):
+        """Register a token sequence reporting ``value`` when matched."""
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            nxt = self._goto[node].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((value, len(tokens)))
+
+    def build(self) -> '_Automaton':
+        """Compute failure links; call once after all patterns are added."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+        return self
+
+    def search(self, tokens: Iterable[str]) -> Iterator[Tuple[int, str, int]]:
+        """Yield (end index, value, pattern length) for every match in ``tokens``."""
+        node = 0
+        for index, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for value, length in self._out[node]:
+                yield index, value, length
+
+
+@dataclass
+class KeywordMatch:
+    """Skill terms of a job description split by whether the CV mentions them."""
+    matched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    def to_markdown(self, language: str = 'en') -> str:
+        """Render as the report's Keyword Analysis section."""
+        heading, matched_label, missing_label, none = LABELS.get(language, LABELS['en'])
+        return (f"{heading}\n"
+                f"- **{matched_label}:** {', '.join(self.matched) or none}\n"
+                f"- **{missing_label}:** {', '.join(self.missing) or none}\n")
+
+    def to_prompt(self, language: str = 'en') -> str:
+        """Render as an input block for the analysis prompt."""
+        _, matched_label, missing_label, none = LABELS.get(language, LABELS['en'])
+        return (f"{matched_label}: {', '.join(self.matched) or none}\n"
+                f"{missing_label}: {', '.join(self.missing) or none}")
+
+
+class KeywordMatcher:
+    """Extracts skill terms from a job description and matches them against a CV."""
+
+    def __init__(self, vocabulary: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 max_keywords: int = MAX_KEYWORDS):
+        """Initialize the matcher and compile the vocabulary automaton.
+
+        Args:
+            vocabulary: Known skills mapped to their aliases (defaults to SKILL_VOCABULARY)
+            max_keywords: Most terms reported per job description
+        """
+        self.vocabulary = SKILL_VOCABULARY if vocabulary is None else vocabulary
+        self.max_keywords = max_keywords
+        # Every spelling of a skill, keyed by its canonical term
+        self._variants: Dict[str, List[Tuple[str, ...]]] = {}
+        for skill, aliases in self.vocabulary.items():
+            self._variants[skill] = [_phrase_key(v) for v in (skill, *aliases) if _phrase_key(v)]
+        self._vocabulary_automaton = self._compile(self._variants)
+
+    @staticmethod
+    def _compile(variants: Dict[str, List[Tuple[str, ...]]]) -> _Automaton:
+        automaton = _Automaton()
+        for term, keys in variants.items():
+            for key in keys:
+                automaton.add(key, term)
+        return automaton.build()
+
+    def extract(self, jd_text: str) -> List[Tuple[str, str]]:
+        """Find skill terms in a job description.
+
+        Returns:
+            (term id, display form as written in the JD) pairs in order of
+            first appearance
+        """
+        tokens = [(m.start(), m.end(), m.group(), normalize_token(m.group()))
+                  for m in _TOKEN.finditer(jd_text)]
+        found: Dict[str, Tuple[int, str]] = {}
+        covered = set()
+
+        for end, term, length in self._vocabulary_automaton.search(t[3] for t in tokens):
+            start = end - length + 1
+            covered.update(range(start, end + 1))
+            if term not in found or found[term][0] > start:
+                found[term] = (start, jd_text[tokens[start][0]:tokens[end][1]])
+
+        # All-caps headings are not lists of acronyms
+        headings = set()
+        offset = 0
+        for line in jd_text.split('\n'):
+            words = [w for w in _TOKEN.findall(line) if w.isalpha()]
+            if len(words) > 1 and all(word.isupper() for word in words):
+                headings.add(offset)
+            offset += len(line) + 1
+        line_starts = [0] + [i + 1 for i, ch in enumerate(jd_text) if ch == '\n']
+
+        for index, (start, _, surface, normalized) in enumerate(tokens):
+            if index in covered or normalized in found or not self._looks_like_term(surface):
+                continue
+            if line_starts[bisect_right(line_starts, start) - 1] not in headings:
+                found[normalized] = (index, surface)
+
+        ordered = sorted(found.items(), key=lambda item: item[1][0])
+        return [(term, display) for term, (_, display) in ordered[:self.max_keywords]]
+
+    @staticmethod
+    def _looks_like_term(surface: str) -> bool:
+        """Acronym (SQL), CamelCase (PostgreSQL) or symbol-bearing (C++, Node.js) token."""
+        if _ACRONYM.match(surface):
+            return surface not in STOP_ACRONYMS
+        if _NUMBERED.search(surface):
+            return False
+        return bool(_CAMEL_CASE.match(surface)) or (
+            any(ch in surface for ch in '+#.') and any(ch.isalpha() for ch in surface)
+        )
+
+    def match(self, cv_text: str, jd_text: str) -> KeywordMatch:
+        """Split the job description's skill terms into those the CV mentions and the rest."""
+        terms = self.extract(jd_text)
+        automaton = self._compile({
+            term: self._variants.get(term) or [(term,)] for term, _ in terms
+        })
+        present = {term for _, term, _ in automaton.search(n for _, n in tokenize(cv_text))}
+
+        result = KeywordMatch()
+        for term, display in terms:
+            (result.matched if term in present else result.missing).append(display)
+        return result
+
+
+def merge_keyword_section(analysis: str, section: str) -> str:
+    """Put the computed Keyword Analysis section into an LLM analysis.
+
+    Replaces a section 2 the model wrote anyway, otherwise inserts the
+    section before section 3 (or after section 1, or at the end).
+    """
+    section = section.rstrip('\n') + '\n\n'
+    existing = re.search(r"^##\s*2\..*?(?=^##\s*\d+\.|\Z)", analysis, re.MULTILINE | re.DOTALL)
+    if existing:
+        return analysis[:existing.start()] + section + analysis[existing.end():]
+    for pattern in (r"^##\s*3\.", r"^##\s*[4-9]\."):
+        following = re.search(pattern, analysis, re.MULTILINE)
+        if following:
+            return analysis[:following.start()] + section + analysis[following.start():]
+    return analysis.rstrip('\n') + '\n\n' + section
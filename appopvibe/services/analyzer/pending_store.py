@@ -0,0 +1,65 @@
+"""
+Short-lived store for submissions awaiting a streaming response.
+
+A streamed analysis takes two requests: the form POST, then the
+EventSource GET that carries the events. The submission is parked here in
+between, in SQLite so the GET may land on any worker.
+"""
+import json
+import time
+import uuid
+import logging
+from typing import Any, Dict, Optional
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+
+class PendingSubmissionStore(SQLiteStore):
+    """Single-use hand-over of submissions between requests."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pending_submissions (
+        id TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_pending_submissions_created ON pending_submissions(created_at);
+    """
+
+    def __init__(self, path, ttl: int = 600):
+        """Initialize the store.
+
+        Args:
+            path: Path of the SQLite database file
+            ttl: Seconds a parked submission stays claimable
+        """
+        super().__init__(path)
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+
+    def put(self, submission: Dict[str, Any]) -> str:
+        """Park a submission and return its id."""
+        submission_id = uuid.uuid4().hex
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            conn.execute("DELETE FROM pending_submissions WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "INSERT INTO pending_submissions (id, payload, created_at) VALUES (?, ?, ?)",
+                (submission_id, json.dumps(submission), now)
+            )
+        return submission_id
+
+    def pop(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        """Claim a parked submission; each one can be claimed only once."""
+        with self.transaction(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM pending_submissions WHERE id = ?", (submission_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM pending_submissions WHERE id = ?", (submission_id,))
+
+        if row["created_at"] < time.time() - self.ttl:
+            self.logger.warning(f"Pending submission {submission_id} expired")
+            return None
+        return json.loads(row["payload"])
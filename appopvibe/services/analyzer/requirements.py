@@ -0,0 +1,99 @@
+"""
+Structured job requirements for the two-stage analysis.
+
+The first stage asks the LLM to extract a job description's requirements as
+JSON. The extraction prompt holds nothing but the job description, so the
+LLM response cache keys it by the JD's digest: every CV analyzed against a
+popular job description reuses one extraction, and the second stage sends
+the much shorter requirements instead of the full JD.
+"""
+import re
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+SENIORITY_LEVELS = ('intern', 'junior', 'mid', 'senior', 'lead', 'executive', 'unspecified')
+
+# Labels of the requirements block in the matching prompt, per language
+LABELS = {
+    'en': ('Title', 'Seniority', 'Must have', 'Nice to have', 'Responsibilities', 'Keywords'),
+    'fr': ('Intitulé', 'Séniorité', 'Requis', 'Apprécié', 'Missions', 'Mots-clés'),
+}
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+logger = logging.getLogger(__name__)
+
+
+def jd_digest(jd_text: str) -> str:
+    """Digest identifying a job description (after compaction)."""
+    return hashlib.sha256(jd_text.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class JobRequirements:
+    """Requirements extracted from a job description."""
+    digest: str
+    title: str = ''
+    seniority: str = 'unspecified'
+    must_have: List[str] = field(default_factory=list)
+    nice_to_have: List[str] = field(default_factory=list)
+    responsibilities: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, text: str, digest: str) -> Optional['JobRequirements']:
+        """Parse the extraction stage's output.
+
+        Returns:
+            The requirements, or None if the output is not a usable JSON
+            object (e.g. an error message or an empty extraction)
+        """
+        match = _JSON_OBJECT.search(text or '')
+        try:
+            data = json.loads(match.group()) if match else None
+        except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            logger.warning(f"Unusable JD requirements extraction: {(text or '')[:80]!r}")
+            return None
+
+        def strings(key: str) -> List[str]:
+            value = data.get(key)
+            if not isinstance(value, list):
+                return []
+            return [str(item).strip() for item in value if str(item).strip()]
+
+        seniority = str(data.get('seniority') or '').strip().lower()
+        requirements = cls(
+            digest=digest,
+            title=str(data.get('title') or '').strip(),
+            seniority=seniority if seniority in SENIORITY_LEVELS else 'unspecified',
+            must_have=strings('must_have'),
+            nice_to_have=strings('nice_to_have'),
+            responsibilities=strings('responsibilities'),
+            keywords=strings('keywords'),
+        )
+        if not (requirements.must_have or requirements.keywords):
+            logger.warning("JD requirements extraction found no requirements")
+            return None
+        return requirements
+
+    def to_prompt(self, language: str = 'en') -> str:
+        """Render as the requirements block of the matching prompt."""
+        title, seniority, must_have, nice_to_have, responsibilities, keywords = \
+            LABELS.get(language, LABELS['en'])
+        lines = []
+        if self.title:
+            lines.append(f"{title}: {self.title}")
+        lines.append(f"{seniority}: {self.seniority}")
+        for label, items in ((must_have, self.must_have), (nice_to_have, self.nice_to_have),
+                             (responsibilities, self.responsibilities)):
+            if items:
+                lines.append(f"{label}:")
+                lines.extend(f"- {item}" for item in items)
+        if self.keywords:
+            lines.append(f"{keywords}: {', '.join(self.keywords)}")
+        return '\n'.join(lines)
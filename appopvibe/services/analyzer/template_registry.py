@@ -0,0 +1,201 @@
+"""
+Registry of versioned, precompiled prompt templates.
+
+Templates are loaded once from the ``prompts`` package and split into their
+literal and placeholder segments, so building a prompt is a single join
+rather than a parse of the whole template on every request. Each template
+carries a version derived from its content; it is part of the LLM cache key,
+so editing one template only invalidates the results produced from it.
+
+Templates can also be laid out for provider prompt caching: the static
+instructions go into the system message and only the block holding the CV
+and job description is sent as the user message, so every request for a
+template starts with the same tokens.
+"""
+import hashlib
+import logging
+import pkgutil
+import importlib
+from dataclasses import dataclass
+from string import Formatter
+from typing import Dict, Optional, Tuple
+
+# Prompt layouts: the whole template as one user message, or the static
+# instructions as a system message followed by the variable inputs
+INLINE = 'inline'
+SYSTEM_PREFIX = 'system_prefix'
+LAYOUTS = (INLINE, SYSTEM_PREFIX)
+
+# Template constant prefixes in the prompts modules, by template type
+TEMPLATE_KINDS = {
+    'FULL_ANALYSIS_PROMPT_TEMPLATE': 'analysis',
+    'CV_REWRITE_PROMPT_TEMPLATE': 'rewrite',
+    'JD_REQUIREMENTS_PROMPT_TEMPLATE': 'requirements',
+    'CV_MATCH_PROMPT_TEMPLATE': 'match',
+}
+
+logger = logging.getLogger(__name__)
+
+
+Segments = Tuple[Tuple[str, Optional[str]], ...]
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """Messages built from a template, with the version identifying their layout."""
+    prompt: str
+    system: Optional[str]
+    template_version: str
+
+
+def _split(source: str) -> Segments:
+    """Split a ``str.format`` template into (literal, placeholder) pairs."""
+    return tuple((literal, field) for literal, field, _, _ in Formatter().parse(source))
+
+
+def _join(segments: Segments, values: Dict[str, str]) -> str:
+    """Fill placeholder values into split segments."""
+    return "".join(
+        literal if field is None else literal + str(values[field])
+        for literal, field in segments
+    )
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A prompt template split into literal text and named placeholders."""
+    language: str
+    kind: str
+    source: str
+    segments: Segments
+    version: str
+    # Static text around the input block, and the input block itself
+    # (None when the template has no placeholders to separate)
+    instructions: Optional[str] = None
+    input_segments: Optional[Segments] = None
+
+    @classmethod
+    def compile(cls, language: str, kind: str, source: str) -> 'PromptTemplate':
+        """Parse a ``str.format`` style template once.
+
+        Raises:
+            ValueError: If a placeholder uses a format spec, a conversion or
+                positional/attribute access, none of which templates need
+        """
+        segments = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                raise ValueError(f"Unsupported placeholder {{{field}}} in {language}/{kind} template")
+            segments.append((literal, field))
+        version = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+        instructions, input_segments = cls._separate_inputs(source)
+        return cls(language, kind, source, tuple(segments), version, instructions, input_segments)
+
+    @staticmethod
+    def _separate_inputs(source: str):
+        """Cut out the lines holding placeholders (and the label line above them).
+
+        Returns:
+            The remaining static text and the segments of the input block,
+            or ``(None, None)`` if the template has no placeholders
+        """
+        lines = source.split('\n')
+        placeholder_lines = [i for i, line in enumerate(lines)
+                             if any(field is not None for _, field in _split(line))]
+        if not placeholder_lines:
+            return None, None
+
+        start, end = placeholder_lines[0], placeholder_lines[-1] + 1
+        if start > 0 and lines[start - 1].rstrip().endswith(':'):
+            start -= 1  # keep a "CV:" style label with its input
+
+        head = '\n'.join(lines[:start]).strip()
+        tail = '\n'.join(lines[end:]).strip()
+        static = '\n\n'.join(part for part in (head, tail) if part)
+        instructions = ''.join(literal for literal, _ in _split(static))  # unescape {{ }}
+        return instructions, _split('\n'.join(lines[start:end]).strip())
+
+    @property
+    def name(self) -> str:
+        """Identifier used in logs and metrics, e.g. ``en/analysis``."""
+        return f"{self.language}/{self.kind}"
+
+    @property
+    def fields(self) -> frozenset:
+        """Names of the placeholders the template expects."""
+        return frozenset(field for _, field in self.segments if field is not None)
+
+    def render(self, **values: str) -> str:
+        """Fill in the placeholders (same result as ``source.format(**values)``)."""
+        return _join(self.segments, values)
+
+    def layout(self, layout: str = INLINE, **values: str) -> RenderedPrompt:
+        """Build the messages for a call in the given layout.
+
+        The template version of a non-inline layout is suffixed with the
+        layout name, keeping its cache entries and metrics apart.
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown prompt layout: {layout}")
+        if layout == SYSTEM_PREFIX and self.instructions:
+            return RenderedPrompt(prompt=_join(self.input_segments, values),
+                                  system=self.instructions,
+                                  template_version=f"{self.version}+{layout}")
+        return RenderedPrompt(prompt=self.render(**values), system=None,
+                              template_version=self.version)
+
+
+class TemplateRegistry:
+    """Prompt templates keyed by language and template type."""
+
+    def __init__(self, templates: Dict[str, Dict[str, PromptTemplate]], default_language: str = 'en'):
+        """Initialize the registry.
+
+        Args:
+            templates: Compiled templates keyed by language, then by template type
+            default_language: Language used when a template is missing for another one
+        """
+        self.templates = templates
+        self.default_language = default_language
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Dict[str, str]], **kwargs) -> 'TemplateRegistry':
+        """Build a registry from plain template strings keyed by language and type."""
+        return cls({
+            language: {kind: PromptTemplate.compile(language, kind, source)
+                       for kind, source in kinds.items()}
+            for language, kinds in raw.items()
+        }, **kwargs)
+
+    @classmethod
+    def load(cls, package: str = 'prompts', **kwargs) -> 'TemplateRegistry':
+        """Load the templates of every ``prompts_<language>`` module in ``package``."""
+        raw: Dict[str, Dict[str, str]] = {}
+        root = importlib.import_module(package)
+        for module_info in pkgutil.iter_modules(root.__path__):
+            if not module_info.name.startswith('prompts_'):
+                continue
+            language = module_info.name[len('prompts_'):]
+            module = importlib.import_module(f"{package}.{module_info.name}")
+            for prefix, kind in TEMPLATE_KINDS.items():
+                source = getattr(module, f"{prefix}_{language.upper()}", None)
+                if source is not None:
+                    raw.setdefault(language, {})[kind] = source
+
+        registry = cls.from_dict(raw, **kwargs)
+        logger.info(f"Loaded prompt templates: {registry.versions()}")
+        return registry
+
+    def get(self, language: str, kind: str) -> PromptTemplate:
+        """Get a template, falling back to the default language."""
+        try:
+            return self.templates[language][kind]
+        except KeyError:
+            logger.warning(f"Template not found for {language}/{kind}, "
+                           f"falling back to {self.default_language}")
+            return self.templates[self.default_language][kind]
+
+    def versions(self) -> Dict[str, str]:
+        """Get the version of every template, keyed by ``language/type``."""
+        return {template.name: template.version
+                for kinds in self.templates.values() for template in kinds.values()}
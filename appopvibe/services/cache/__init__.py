@@ -2,5 +2,6 @@
 Cache service module for CV Analyzer application.
 """
 from appopvibe.services.cache.cache_service import CacheService, cache
+from appopvibe.services.cache.response_cache import LLMResponseCache
 
-__all__ = ['CacheService', 'cache']
+__all__ = ['CacheService', 'cache', 'LLMResponseCache']
@@ -0,0 +1,306 @@
+"""
+Content-addressed cache of LLM responses.
+
+Responses are stored in a SQLite database so every gunicorn worker on the
+host shares the same entries. Entries expire after a TTL and the least
+recently used ones are evicted once the cache grows beyond its size limit.
+Lookups are plain reads: each worker counts hits, misses and the last use
+of the entries it served in memory and writes them in batches (every
+``flush_every`` lookups or ``flush_interval`` seconds, and with every
+``set``), so lookups in different workers do not contend for the SQLite
+write lock. The total size is kept up to date in a meta row instead of
+being summed on every write.
+
+Fill leases let workers agree that only one of them requests a missing
+response from the provider while the others wait for it to be cached.
+"""
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+
+class LLMResponseCache(SQLiteStore):
+    """Shared, size-bounded LRU cache of LLM completions."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_responses (
+        key TEXT PRIMARY KEY,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        template_version TEXT,
+        response TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses(last_access);
+    CREATE INDEX IF NOT EXISTS idx_llm_responses_expires_at ON llm_responses(expires_at);
+    CREATE TABLE IF NOT EXISTS llm_cache_meta (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS llm_cache_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS llm_fill_leases (
+        key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path, ttl: int = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024,
+                 flush_every: int = 100, flush_interval: float = 5.0):
+        """Initialize the response cache.
+
+        Args:
+            path: Path of the SQLite database file
+            ttl: Seconds a cached response stays valid
+            max_bytes: Total response size above which LRU entries are evicted
+            flush_every: Lookups after which this worker's counters are written
+            flush_interval: Seconds after which they are written anyway
+        """
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+
+        # Not yet written: counter increments, and last access and hits per key
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._accessed: Dict[str, tuple] = {}
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, max_tokens: int,
+                 template_version: Optional[str], prompt: str,
+                 system: Optional[str] = None) -> str:
+        """Build the cache key for a completion request.
+
+        The prompt (and system message, if any) is reduced to its digest, so
+        keys stay small regardless of the size of the CV and job description.
+        """
+        messages = prompt if system is None else f"{system}\0{prompt}"
+        prompt_digest = hashlib.sha256(messages.encode('utf-8')).hexdigest()
+        key_str = "|".join([
+            str(provider), str(model), f"{temperature:.3f}", str(max_tokens),
+            template_version or "-", prompt_digest
+        ])
+        return hashlib.sha256(key_str.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None on a miss.
+
+        The lookup is a plain read, so lookups in different workers never
+        wait on each other; its use is recorded in memory and written with
+        the next batch. Expired entries are left to eviction.
+        """
+        now = time.time()
+        row = self.connection().execute(
+            "SELECT response FROM llm_responses WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self._counts["misses"] = self._counts.get("misses", 0) + 1
+            else:
+                self._counts["hits"] = self._counts.get("hits", 0) + 1
+                hits = self._accessed.get(key, (now, 0))[1]
+                self._accessed[key] = (now, hits + 1)
+            self._unflushed += 1
+            due = (self._unflushed >= self.flush_every
+                   or time.monotonic() - self._flushed_at >= self.flush_interval)
+        if due:
+            self.flush()
+        return row["response"] if row is not None else None
+
+    def peek(self, key: str) -> Optional[str]:
+        """Get a live cached response without touching LRU order or counters."""
+        row = self.connection().execute(
+            "SELECT response FROM llm_responses WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row["response"] if row is not None else None
+
+    def set(self, key: str, response: str, provider: str, model: str,
+            template_version: Optional[str] = None, ttl: Optional[int] = None):
+        """Store a response and evict LRU entries if the cache is too large."""
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+
+        with self.transaction(immediate=True) as conn:
+            # Recent hits count for the LRU order of the eviction below
+            self._flush(conn)
+            self._total_size(conn)  # seeds the meta row before the table changes
+            old = conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                """INSERT OR REPLACE INTO llm_responses
+                   (key, provider, model, template_version, response, size,
+                    created_at, expires_at, last_access, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                (key, provider, model, template_version, response, size, now, expires_at, now)
+            )
+            self._add_size(conn, size - (old["size"] if old else 0))
+            self._evict(conn, now)
+
+    def _total_size(self, conn) -> int:
+        """Total size of the stored responses, from the meta row."""
+        row = conn.execute("SELECT value FROM llm_cache_meta WHERE name = 'size'").fetchone()
+        if row is not None:
+            return row["value"]
+        # Caches created before the meta row: sum the table once
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        conn.execute("INSERT INTO llm_cache_meta (name, value) VALUES ('size', ?)", (total,))
+        return total
+
+    def _add_size(self, conn, amount: int):
+        """Adjust the total size by ``amount`` bytes (within the writing transaction)."""
+        total = self._total_size(conn)
+        conn.execute("UPDATE llm_cache_meta SET value = ? WHERE name = 'size'", (total + amount,))
+
+    def _evict(self, conn, now: float):
+        """Drop expired entries, then LRU entries until under the size limit."""
+        expired_size, expired = conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM llm_responses WHERE expires_at <= ?", (now,)
+        ).fetchone()
+        if expired:
+            conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+            self._add_size(conn, -expired_size)
+
+        evicted = 0
+        total = self._total_size(conn)
+        if total > self.max_bytes:
+            victims = []
+            freed = 0
+            for row in conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access"):
+                if total - freed <= self.max_bytes:
+                    break
+                victims.append((row["key"],))
+                freed += row["size"]
+            conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+            self._add_size(conn, -freed)
+            evicted = len(victims)
+
+        if expired or evicted:
+            self._bump(conn, "evictions", expired + evicted)
+            self.logger.info(f"LLM cache evicted {evicted} LRU and {expired} expired entries")
+
+    def record(self, name: str, amount: int = 1):
+        """Increment a shared counter (written with the next batch)."""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def flush(self):
+        """Write this worker's pending counters and entry uses."""
+        try:
+            with self.transaction(immediate=True) as conn:
+                self._flush(conn)
+        except Exception as e:
+            # Only statistics and LRU order are lost
+            self.logger.warning(f"LLM cache counters could not be written: {e}")
+
+    def _flush(self, conn):
+        """Write pending counters and entry uses within the caller's transaction."""
+        with self._lock:
+            counts, accessed = self._counts, self._accessed
+            self._counts, self._accessed = {}, {}
+            self._unflushed = 0
+            self._flushed_at = time.monotonic()
+        conn.executemany(
+            "UPDATE llm_responses SET last_access = MAX(last_access, ?), hits = hits + ? WHERE key = ?",
+            [(last_access, hits, key) for key, (last_access, hits) in accessed.items()]
+        )
+        for name, amount in counts.items():
+            self._bump(conn, name, amount)
+
+    def _bump(self, conn, name: str, amount: int = 1):
+        """Increment a shared counter."""
+        conn.execute(
+            """INSERT INTO llm_cache_stats (name, value) VALUES (?, ?)
+               ON CONFLICT(name) DO UPDATE SET value = value + excluded.value""",
+            (name, amount)
+        )
+
+    def acquire_fill(self, key: str, owner: str, ttl: float) -> bool:
+        """Try to become the worker that fills a missing entry.
+
+        Returns:
+            True if the lease was granted (or already held by ``owner``),
+            False while another worker holds an unexpired lease
+        """
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT owner, expires_at FROM llm_fill_leases WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row["owner"] != owner and row["expires_at"] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_fill_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + ttl)
+            )
+            return True
+
+    def release_fill(self, key: str, owner: str):
+        """Release a fill lease held by ``owner``."""
+        with self.transaction(immediate=True) as conn:
+            conn.execute("DELETE FROM llm_fill_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def fill_pending(self, key: str) -> bool:
+        """Whether another worker currently holds an unexpired fill lease for ``key``."""
+        row = self.connection().execute(
+            "SELECT 1 FROM llm_fill_leases WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size, shared across workers.
+
+        Other workers' most recent lookups may not be written yet.
+        """
+        self.flush()
+        conn = self.connection()
+        counters = {row["name"]: row["value"]
+                    for row in conn.execute("SELECT name, value FROM llm_cache_stats")}
+        entries = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        size_row = conn.execute("SELECT value FROM llm_cache_meta WHERE name = 'size'").fetchone()
+        size = size_row["value"] if size_row else 0
+
+        by_template = {
+            row["template_version"] or "-": row["entries"]
+            for row in conn.execute(
+                "SELECT template_version, COUNT(*) AS entries FROM llm_responses "
+                "GROUP BY template_version"
+            )
+        }
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': counters.get("evictions", 0),
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'peer_waits': counters.get("peer_waits", 0),
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'entries_by_template_version': by_template,
+        }
+
+    def clear(self):
+        """Remove every cached response (counters are kept)."""
+        with self.transaction(immediate=True) as conn:
+            conn.execute("DELETE FROM llm_responses")
+            conn.execute("INSERT OR REPLACE INTO llm_cache_meta (name, value) VALUES ('size', 0)")
@@ -0,0 +1,265 @@
+"""
+Per-application service instances shared across requests.
+
+Services are built once per app (and therefore once per worker process) and
+kept in ``app.extensions`` so long-lived state such as pooled connections is
+reused instead of being rebuilt on every request.
+"""
+import os
+import logging
+from flask import current_app
+
+from appopvibe.services.llm.llm_service import LLMService
+from appopvibe.services.llm.retry import RetryPolicy
+from appopvibe.services.llm.circuit_breaker import CircuitBreaker
+from appopvibe.services.llm.throttle import Throttle
+from appopvibe.services.llm.admission import AdmissionController
+from appopvibe.services.cache.response_cache import LLMResponseCache
+from appopvibe.services.report.report_service import ReportService
+from appopvibe.services.report.report_index import ReportIndex
+from appopvibe.services.report.blob_store import BlobStore
+from appopvibe.services.report.retention import RetentionSweeper
+from appopvibe.services.analyzer.analyzer_service import AnalyzerService
+from appopvibe.services.analyzer.template_registry import TemplateRegistry
+from appopvibe.services.analyzer.input_compactor import InputCompactor
+from appopvibe.services.analyzer.keyword_matcher import KeywordMatcher
+from appopvibe.services.analyzer.pending_store import PendingSubmissionStore
+from appopvibe.services.jobs.job_queue import JobQueue
+
+EXTENSION_KEY = 'appopvibe.services'
+
+logger = logging.getLogger(__name__)
+
+
+def _services() -> dict:
+    """Get the service registry of the current app."""
+    return current_app.extensions.setdefault(EXTENSION_KEY, {})
+
+
+def get_response_cache():
+    """Get the shared LLM response cache, or None when caching is disabled."""
+    services = _services()
+    if 'response_cache' not in services:
+        config = current_app.config
+        services['response_cache'] = None
+        if config.get('LLM_CACHE_ENABLED', False):
+            services['response_cache'] = LLMResponseCache(
+                config['LLM_CACHE_PATH'],
+                ttl=config['LLM_CACHE_TTL'],
+                max_bytes=config['LLM_CACHE_MAX_MB'] * 1024 * 1024
+            )
+    return services['response_cache']
+
+
+def get_circuit_breaker():
+    """Get the shared LLM provider circuit breakers, or None when disabled."""
+    services = _services()
+    if 'circuit_breaker' not in services:
+        config = current_app.config
+        services['circuit_breaker'] = None
+        if config.get('LLM_BREAKER_ENABLED', False):
+            services['circuit_breaker'] = CircuitBreaker(
+                config['LLM_BREAKER_PATH'],
+                failure_threshold=config['LLM_BREAKER_FAILURE_THRESHOLD'],
+                reset_timeout=config['LLM_BREAKER_RESET_TIMEOUT']
+            )
+    return services['circuit_breaker']
+
+
+def get_throttle():
+    """Get the shared LLM rate limiter, or None when disabled."""
+    services = _services()
+    if 'throttle' not in services:
+        config = current_app.config
+        services['throttle'] = None
+        if config.get('LLM_THROTTLE_ENABLED', False):
+            services['throttle'] = Throttle(
+                config['LLM_THROTTLE_PATH'],
+                limits=config['LLM_RATE_LIMITS'],
+                max_wait=config['LLM_THROTTLE_MAX_WAIT'],
+                background_horizon=config['LLM_THROTTLE_BACKGROUND_HORIZON']
+            )
+    return services['throttle']
+
+
+def get_admission():
+    """Get the admission controller of interactive analyses, or None when disabled."""
+    services = _services()
+    if 'admission' not in services:
+        config = current_app.config
+        services['admission'] = None
+        if config.get('ADMISSION_ENABLED', False):
+            services['admission'] = AdmissionController(
+                config['ADMISSION_PATH'],
+                max_in_flight=config['ADMISSION_MAX_IN_FLIGHT'],
+                worker_max_in_flight=config['ADMISSION_WORKER_MAX_IN_FLIGHT'],
+                queue_size=config['ADMISSION_QUEUE_SIZE'],
+                queue_timeout=config['ADMISSION_QUEUE_TIMEOUT'],
+                degrade_at=config['ADMISSION_DEGRADE_AT'],
+                degraded_model=config['ADMISSION_DEGRADED_MODEL'],
+                retry_after=config['ADMISSION_RETRY_AFTER'],
+                lease_seconds=config['ADMISSION_LEASE_SECONDS'],
+                handover_seconds=config['ADMISSION_HANDOVER_SECONDS']
+            )
+    return services['admission']
+
+
+def _llm_settings() -> dict:
+    """Build the arguments shared by all LLM services: retries, breakers, rate and output limits."""
+    config = current_app.config
+    return {
+        'max_output_tokens': config['LLM_MAX_OUTPUT_TOKENS'],
+        'retry': RetryPolicy(
+            max_attempts=config['LLM_RETRY_ATTEMPTS'],
+            base_delay=config['LLM_RETRY_BASE_DELAY'],
+            max_delay=config['LLM_RETRY_MAX_DELAY'],
+            max_retry_after=config['LLM_RETRY_MAX_RETRY_AFTER']
+        ),
+        'breaker': get_circuit_breaker(),
+        'throttle': get_throttle(),
+    }
+
+
+def _hedge_settings() -> dict:
+    """Build the hedging arguments for the primary LLM service."""
+    config = current_app.config
+    openrouter_api_key = config.get('OPENROUTER_API_KEY') or os.getenv('OPENROUTER_API_KEY')
+    if not config.get('LLM_HEDGE_ENABLED') or not openrouter_api_key:
+        return {}
+
+    backup = LLMService(
+        api_key=openrouter_api_key,
+        provider="openrouter",
+        default_model=config['BACKUP_MODEL'],
+        **_llm_settings()
+    )
+    logger.info(f"Hedging slow LLM calls to {backup.provider} model {backup.default_model}")
+    return {
+        'hedge': backup,
+        'hedge_percentile': config['LLM_HEDGE_PERCENTILE'],
+        'hedge_delay': config['LLM_HEDGE_DELAY'],
+        'hedge_min_delay': config['LLM_HEDGE_MIN_DELAY'],
+    }
+
+
+def get_llm_service() -> LLMService:
+    """Get the shared LLM service for the current app."""
+    services = _services()
+    if 'llm' not in services:
+        # Get API keys directly from environment
+        groq_api_key = os.getenv('GROQ_API_KEY')
+
+        if not groq_api_key:
+            logger.error("No GROQ_API_KEY found in environment variables")
+            raise ValueError("Missing GROQ_API_KEY environment variable")
+
+        # Initialize LLM service with explicit API key and provider
+        services['llm'] = LLMService(
+            api_key=groq_api_key,
+            provider="groq",
+            default_model="llama-3.3-70b-versatile",
+            cache=get_response_cache(),
+            **_llm_settings(),
+            **_hedge_settings()
+        )
+        logger.info(f"Using {services['llm'].provider} as LLM provider "
+                    f"with model {services['llm'].default_model}")
+    return services['llm']
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Get the prompt templates, loaded from the prompts package once per app."""
+    services = _services()
+    if 'templates' not in services:
+        services['templates'] = TemplateRegistry.load(
+            current_app.config.get('PROMPTS_PACKAGE', 'prompts')
+        )
+    return services['templates']
+
+
+def get_analyzer_service() -> AnalyzerService:
+    """Build an analyzer on top of the app's shared LLM service."""
+    # Reuse the worker's LLM service (and its pooled connections)
+    return AnalyzerService(
+        get_llm_service(), get_template_registry(),
+        task_timeout=current_app.config.get('ANALYSIS_TASK_TIMEOUT'),
+        prompt_layout=current_app.config.get('PROMPT_LAYOUT', 'inline'),
+        compactor=_input_compactor(),
+        keyword_matcher=get_keyword_matcher(),
+        two_stage=current_app.config.get('TWO_STAGE_ANALYSIS', False)
+    )
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Get the shared keyword matcher (its vocabulary automaton is compiled once)."""
+    services = _services()
+    if 'keyword_matcher' not in services:
+        services['keyword_matcher'] = KeywordMatcher()
+    return services['keyword_matcher']
+
+
+def _input_compactor():
+    """Build the input compaction stage, or None when disabled."""
+    config = current_app.config
+    if not config.get('INPUT_COMPACTION_ENABLED', False):
+        return None
+    return InputCompactor(config['LLM_INPUT_TOKEN_BUDGETS'])
+
+
+def get_report_service() -> ReportService:
+    """Get the shared report service for the current app."""
+    services = _services()
+    if 'report' not in services:
+        config = current_app.config
+        reports_dir = config.get('REPORTS_FOLDER', os.path.join(os.getcwd(), 'reports'))
+        os.makedirs(reports_dir, exist_ok=True)
+        services['report'] = ReportService(
+            reports_directory=reports_dir,
+            retention_days=config.get('REPORT_RETENTION_DAYS', 30),
+            index=ReportIndex(config['REPORT_INDEX_PATH']),
+            blobs=BlobStore(os.path.join(reports_dir, '.blobs'), fsync=config.get('REPORT_FSYNC', 'file'))
+            if config.get('REPORT_BLOBS_ENABLED', True) else None,
+            fsync=config.get('REPORT_FSYNC', 'file'),
+            io_threads=config.get('REPORT_IO_THREADS', 4)
+        )
+    return services['report']
+
+
+def get_retention_sweeper() -> RetentionSweeper:
+    """Get the sweeper deleting expired reports and feedback."""
+    services = _services()
+    if 'retention' not in services:
+        config = current_app.config
+        services['retention'] = RetentionSweeper(
+            config['RETENTION_PATH'], get_report_service(),
+            feedback_dir=config.get('FEEDBACK_FOLDER', 'feedback'),
+            feedback_retention_days=config.get('FEEDBACK_RETENTION_DAYS', 90),
+            batch_size=config.get('RETENTION_BATCH_SIZE', 200),
+            max_deletes_per_second=config.get('RETENTION_MAX_DELETES_PER_SECOND', 50),
+            interval=config.get('RETENTION_SWEEP_INTERVAL', 3600),
+            max_sweep_seconds=config.get('RETENTION_MAX_SWEEP_SECONDS', 300)
+        )
+    return services['retention']
+
+
+def get_pending_store() -> PendingSubmissionStore:
+    """Get the store handing submissions over to their event stream."""
+    services = _services()
+    if 'pending' not in services:
+        config = current_app.config
+        services['pending'] = PendingSubmissionStore(
+            config['PENDING_SUBMISSIONS_PATH'],
+            ttl=config.get('PENDING_SUBMISSION_TTL', 600)
+        )
+    return services['pending']
+
+
+def get_job_queue() -> JobQueue:
+    """Get the durable queue of analysis jobs."""
+    services = _services()
+    if 'jobs' not in services:
+        services['jobs'] = JobQueue(
+            current_app.config['JOBS_PATH'],
+            max_attempts=current_app.config.get('JOB_MAX_ATTEMPTS', 3)
+        )
+    return services['jobs']
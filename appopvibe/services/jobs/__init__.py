@@ -0,0 +1,7 @@
+"""
+Background job module for CV Analyzer application.
+"""
+from appopvibe.services.jobs.job_queue import JobQueue
+from appopvibe.services.jobs.job_runner import JobRunner
+
+__all__ = ['JobQueue', 'JobRunner']
@@ -0,0 +1,153 @@
+"""
+Durable queue of analysis jobs.
+
+Jobs live in SQLite so any web worker can enqueue or poll them and any
+executor process can run them. Executors claim a job with a time-limited
+lease; a job whose executor died is handed out again once its lease expires.
+"""
+import json
+import time
+import uuid
+import logging
+from typing import Any, Dict, Optional
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue(SQLiteStore):
+    """SQLite-backed queue of submissions awaiting analysis."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        payload TEXT,
+        report_id TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires REAL,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+    """
+
+    def __init__(self, path, max_attempts: int = 3):
+        """Initialize the queue.
+
+        Args:
+            path: Path of the SQLite database file
+            max_attempts: Runs allowed per job before it is marked failed
+        """
+        super().__init__(path)
+        self.max_attempts = max_attempts
+        self.logger = logging.getLogger(__name__)
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """Add a job and return its id."""
+        job_id = uuid.uuid4().hex
+        with self.transaction(immediate=True) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), time.time())
+            )
+        self.logger.info(f"Enqueued job {job_id}")
+        return job_id
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Claim the oldest runnable job, or return None if there is none.
+
+        Runnable jobs are queued ones and running ones whose lease expired.
+        """
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            # Jobs whose executor died too often are given up on
+            conn.execute(
+                """UPDATE jobs SET status = ?, error = ?, payload = NULL, finished_at = ?
+                   WHERE status = ? AND lease_expires < ? AND attempts >= ?""",
+                (FAILED, "abandoned by executor", now, RUNNING, now, self.max_attempts)
+            )
+            row = conn.execute(
+                """SELECT id FROM jobs
+                   WHERE status = ? OR (status = ? AND lease_expires < ?)
+                   ORDER BY created_at LIMIT 1""",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                """UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?,
+                   attempts = attempts + 1, started_at = ? WHERE id = ?""",
+                (RUNNING, owner, now + lease_seconds, now, row["id"])
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+
+        return self._to_dict(job)
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease of a running job; returns False if ``owner`` no longer holds it."""
+        with self.transaction(immediate=True) as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (time.time() + lease_seconds, job_id, RUNNING, owner)
+            ).rowcount
+        return updated > 0
+
+    def complete(self, job_id: str, owner: str, report_id: str) -> bool:
+        """Mark a job done; its payload is dropped now that the report holds it.
+
+        Returns False (and changes nothing) if ``owner`` no longer holds the lease.
+        """
+        with self.transaction(immediate=True) as conn:
+            updated = conn.execute(
+                """UPDATE jobs SET status = ?, report_id = ?, payload = NULL,
+                   lease_owner = NULL, lease_expires = NULL, finished_at = ?
+                   WHERE id = ? AND status = ? AND lease_owner = ?""",
+                (DONE, report_id, time.time(), job_id, RUNNING, owner)
+            ).rowcount
+        return updated > 0
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        """Record a failed run: the job is queued again while it has attempts left.
+
+        Returns False (and changes nothing) if ``owner`` no longer holds the lease.
+        """
+        with self.transaction(immediate=True) as conn:
+            updated = conn.execute(
+                """UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL
+                   WHERE id = ? AND status = ? AND lease_owner = ? AND attempts < ?""",
+                (QUEUED, error, job_id, RUNNING, owner, self.max_attempts)
+            ).rowcount
+            if not updated:
+                updated = conn.execute(
+                    """UPDATE jobs SET status = ?, error = ?, payload = NULL,
+                       lease_owner = NULL, lease_expires = NULL, finished_at = ?
+                       WHERE id = ? AND status = ? AND lease_owner = ?""",
+                    (FAILED, error, time.time(), job_id, RUNNING, owner)
+                ).rowcount
+        return updated > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id."""
+        row = self.connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def depth(self) -> Dict[str, int]:
+        """Count jobs per state."""
+        rows = self.connection().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload']) if job['payload'] else None
+        return job
@@ -0,0 +1,147 @@
+"""
+Background executor for queued analysis jobs.
+
+The runner lives on the LLM pool's event loop, so LLM-bound jobs only hold
+a coroutine while they wait on the provider. How many jobs run at once is
+set by its concurrency, independently of the number of web workers.
+"""
+import os
+import socket
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from appopvibe.services.jobs.job_queue import JobQueue
+from appopvibe.services.llm.http_pool import http_pool
+
+
+class JobRunner:
+    """Claims jobs from a JobQueue and runs them concurrently."""
+
+    def __init__(self, app, queue: JobQueue, concurrency: int = 4,
+                 poll_interval: float = 1.0, lease_seconds: float = 300.0):
+        """Initialize the runner.
+
+        Args:
+            app: Flask app whose services and config the jobs use
+            queue: Queue to claim jobs from
+            concurrency: Maximum jobs running at once in this process
+            poll_interval: Seconds to wait before polling an empty queue again
+            lease_seconds: Time after which an unfinished job may be reclaimed
+        """
+        self.app = app
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+        self._future = None
+        self._pid = None
+
+    def start(self):
+        """Start polling on the pool loop (once per process)."""
+        if self._pid == os.getpid() and self._future and not self._future.done():
+            return
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._pid = os.getpid()
+        self._future = asyncio.run_coroutine_threadsafe(self.run(), http_pool.loop)
+        self.logger.info(f"Job runner {self.owner} started with concurrency {self.concurrency}")
+
+    def run_forever(self):
+        """Run jobs in the foreground until interrupted (for a dedicated executor process)."""
+        self.start()
+        try:
+            self._future.result()
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self):
+        """Stop polling; running jobs are cancelled and will be reclaimed after their lease."""
+        if self._future:
+            self._future.cancel()
+            self._future = None
+
+    async def run(self):
+        """Claim and run jobs until cancelled."""
+        slots = asyncio.Semaphore(self.concurrency)
+        running = set()
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    job = await asyncio.to_thread(self.queue.claim, self.owner, self.lease_seconds)
+                except Exception as e:
+                    self.logger.error(f"Could not claim job: {e}")
+                    job = None
+
+                if job is None:
+                    slots.release()
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                task = asyncio.create_task(self.execute(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def execute(self, job: Dict[str, Any]) -> Optional[str]:
+        """Run one job and record its outcome; returns the report id on success."""
+        job_id = job['id']
+        payload = job['payload']
+        self.logger.info(f"Running job {job_id} (attempt {job['attempts']})")
+        keeper = asyncio.create_task(self._keep_lease(job_id, asyncio.current_task()))
+
+        try:
+            # Services are looked up through the app context, as in a request
+            # (imported here: the container itself depends on this package)
+            from appopvibe.services.container import get_analyzer_service, get_report_service
+            with self.app.app_context():
+                analyzer_service = get_analyzer_service()
+                report_service = get_report_service()
+
+            result = await analyzer_service.process_submission(
+                payload['cv'], payload['jd'], payload['language'], payload['rewrite']
+            )
+            # A failed analysis comes back as an error text: retry it rather
+            # than saving it as the report
+            if 'analysis' in result.get('errors', {}) or result.get('analysis', '').startswith("Error:"):
+                raise RuntimeError(f"analysis failed: {result.get('analysis', '')[:200]}")
+            report_id = await report_service.save_report_async(
+                payload['cv'], payload['jd'], result['analysis'],
+                result.get('rewritten_cv'), payload['language'],
+                compaction=result.get('compaction')
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.exception(f"Job {job_id} failed: {e}")
+            if not await asyncio.to_thread(self.queue.fail, job_id, self.owner, str(e)):
+                self.logger.warning(f"Job {job_id} was taken over by another executor")
+            return None
+        finally:
+            keeper.cancel()
+
+        if not await asyncio.to_thread(self.queue.complete, job_id, self.owner, report_id):
+            self.logger.warning(f"Job {job_id} was taken over by another executor; "
+                                f"report {report_id} left unreferenced")
+            return None
+        self.logger.info(f"Job {job_id} done, report {report_id}")
+        return report_id
+
+    async def _keep_lease(self, job_id: str, work: asyncio.Task):
+        """Renew a running job's lease; cancel the job if another executor took it over."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                owned = await asyncio.to_thread(self.queue.renew, job_id, self.owner, self.lease_seconds)
+            except Exception as e:
+                self.logger.warning(f"Could not renew the lease of job {job_id}: {e}")
+                continue
+            if not owned:
+                self.logger.warning(f"Lost the lease of job {job_id}; stopping it")
+                work.cancel()
+                return
@@ -2,5 +2,6 @@
 LLM service module for CV Analyzer application.
 """
 from appopvibe.services.llm.llm_service import LLMService
+from appopvibe.services.llm.http_pool import HTTPPool, http_pool
 
-__all__ = ['LLMService']
+__all__ = ['LLMService', 'HTTPPool', 'http_pool']
@@ -0,0 +1,324 @@
+"""
+Admission control for interactive LLM work.
+
+Each analysis holds a lease while it runs. Leases live in SQLite, so the cap
+on analyses in flight applies to all workers on the host; each worker also
+caps its own share. A request finding no free slot waits in a short, bounded
+queue (in arrival order) and is turned away with a retry delay when the
+queue is full or its wait runs out, rather than sitting in the server's
+backlog until the worker timeout kills it.
+
+Near saturation requests are admitted degraded: the optional CV rewrite is
+skipped and, if configured, a faster model is used, so the service keeps
+answering at a predictable pace.
+"""
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+RUNNING = "running"
+WAITING = "waiting"
+
+# Outcomes of one admission attempt
+_QUEUED, _SHED = "queued", "shed"
+
+
+class OverloadedError(Exception):
+    """Raised when a request cannot be admitted; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(f"Service overloaded ({reason}), retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Ticket:
+    """An admitted request's lease; release it when the LLM work is done."""
+
+    def __init__(self, controller: 'AdmissionController', lease_id: str, degraded: bool,
+                 model: Optional[str] = None):
+        self.controller = controller
+        self.id = lease_id
+        self.degraded = degraded
+        self.model = model  # model to use instead of the default, if degraded
+        self._local = True
+        self._released = False
+
+    def handover(self) -> str:
+        """Keep the lease for a follow-up request (see ``AdmissionController.resume``)."""
+        self.controller._leave_worker(self)
+        return self.id
+
+    def renew(self):
+        """Keep the lease of long-running work (e.g. a batch) from expiring."""
+        if not self._released:
+            self.controller._renew(self)
+
+    def release(self):
+        """Give the slot back (idempotent)."""
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    async def release_async(self):
+        """Give the slot back without blocking the event loop."""
+        if not self._released:
+            await asyncio.to_thread(self.release)
+
+    def __enter__(self) -> 'Ticket':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController(SQLiteStore):
+    """Caps analyses in flight per host and per worker, with a bounded wait queue."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS admission_leases (
+        id TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        queued_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS admission_leases_state ON admission_leases (state, queued_at);
+    CREATE TABLE IF NOT EXISTS admission_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, path, max_in_flight: int = 64, worker_max_in_flight: int = 32,
+                 queue_size: int = 16, queue_timeout: float = 5.0, degrade_at: float = 0.75,
+                 degraded_model: Optional[str] = None, retry_after: float = 30.0,
+                 lease_seconds: float = 300.0, handover_seconds: float = 30.0,
+                 poll_interval: float = 0.1):
+        """Initialize the controller.
+
+        Args:
+            path: Path of the SQLite database file
+            max_in_flight: Analyses running at once on the host
+            worker_max_in_flight: Analyses running at once in this worker
+            queue_size: Requests allowed to wait for a slot on the host
+            queue_timeout: Longest a request waits for a slot
+            degrade_at: Share of ``max_in_flight`` above which requests are degraded
+                (queued requests always are)
+            degraded_model: Model used by degraded requests (None keeps the default)
+            retry_after: Seconds a turned away client is told to wait
+            lease_seconds: Lifetime of a lease whose holder never released it
+            handover_seconds: Lifetime of a handed over lease until the follow-up
+                request resumes it
+            poll_interval: Seconds between admission attempts while queued
+        """
+        super().__init__(path)
+        self.max_in_flight = max_in_flight
+        self.worker_max_in_flight = worker_max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.degrade_at = degrade_at
+        self.degraded_model = degraded_model or None
+        self.retry_after = retry_after
+        self.lease_seconds = lease_seconds
+        self.handover_seconds = handover_seconds
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting = 0
+
+    def acquire(self) -> Ticket:
+        """Admit a request, waiting in the queue if needed (blocking).
+
+        Raises:
+            OverloadedError: If the queue is full or the wait timed out
+        """
+        lease_id, deadline = uuid.uuid4().hex, time.monotonic() + self.queue_timeout
+        outcome = self._attempt(lease_id, queued=False)
+        try:
+            while outcome is _QUEUED:
+                if time.monotonic() >= deadline:
+                    raise self._time_out()
+                time.sleep(self.poll_interval)
+                outcome = self._attempt(lease_id, queued=True)
+        finally:
+            if outcome is _QUEUED:
+                self._leave_queue(lease_id)
+        return self._admitted(outcome)
+
+    async def admit(self) -> Ticket:
+        """Admit a request, waiting in the queue if needed (without blocking the event loop).
+
+        Raises:
+            OverloadedError: If the queue is full or the wait timed out
+        """
+        lease_id, deadline = uuid.uuid4().hex, time.monotonic() + self.queue_timeout
+        # Lease updates take a lock and a SQLite write lock: run them off the loop
+        outcome = await asyncio.to_thread(self._attempt, lease_id, False)
+        try:
+            while outcome is _QUEUED:
+                if time.monotonic() >= deadline:
+                    raise await asyncio.to_thread(self._time_out)
+                await asyncio.sleep(self.poll_interval)
+                outcome = await asyncio.to_thread(self._attempt, lease_id, True)
+        finally:
+            if outcome is _QUEUED:
+                await asyncio.to_thread(self._leave_queue, lease_id)
+        return self._admitted(outcome)
+
+    def resume(self, lease_id: str, degraded: bool = False, model: Optional[str] = None) -> Ticket:
+        """Take over a lease handed over by an earlier request (e.g. the form POST of a stream)."""
+        now = time.time()
+        with self._lock:
+            self._running += 1
+            with self.transaction(immediate=True) as conn:
+                # The lease may have expired if the follow-up came late; it still runs
+                conn.execute(
+                    "INSERT OR REPLACE INTO admission_leases (id, state, queued_at, expires_at) "
+                    "VALUES (?, ?, COALESCE((SELECT queued_at FROM admission_leases WHERE id = ?), ?), ?)",
+                    (lease_id, RUNNING, lease_id, now, now + self.lease_seconds)
+                )
+        return Ticket(self, lease_id, degraded, model)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get slot usage, queue depth and admission counters."""
+        conn = self.connection()
+        now = time.time()
+        depth = dict(conn.execute(
+            "SELECT state, COUNT(*) FROM admission_leases WHERE expires_at >= ? GROUP BY state",
+            (now,)
+        ).fetchall())
+        counters = dict(conn.execute("SELECT name, value FROM admission_counters").fetchall())
+        return {
+            'in_flight': depth.get(RUNNING, 0),
+            'queued': depth.get(WAITING, 0),
+            'max_in_flight': self.max_in_flight,
+            'queue_size': self.queue_size,
+            'worker_in_flight': self._running,
+            'worker_queued': self._waiting,
+            'worker_max_in_flight': self.worker_max_in_flight,
+            **{name: counters.get(name, 0) for name in ('admitted', 'queued_total', 'degraded', 'shed')},
+        }
+
+    def _attempt(self, lease_id: str, queued: bool):
+        """Try to admit a request; returns a Ticket, _QUEUED or _SHED."""
+        now = time.time()
+        with self._lock:
+            with self.transaction(immediate=True) as conn:
+                conn.execute("DELETE FROM admission_leases WHERE expires_at < ?", (now,))
+                running = conn.execute(
+                    "SELECT COUNT(*) FROM admission_leases WHERE state = ?", (RUNNING,)
+                ).fetchone()[0]
+                # Free slots go to the requests queued first
+                if queued:
+                    ahead = conn.execute(
+                        "SELECT COUNT(*) FROM admission_leases WHERE state = ? AND queued_at < "
+                        "(SELECT queued_at FROM admission_leases WHERE id = ?)",
+                        (WAITING, lease_id)
+                    ).fetchone()[0]
+                else:
+                    ahead = conn.execute(
+                        "SELECT COUNT(*) FROM admission_leases WHERE state = ?", (WAITING,)
+                    ).fetchone()[0]
+
+                if running + ahead < self.max_in_flight and self._running < self.worker_max_in_flight:
+                    degraded = (queued or running >= self.degrade_at * self.max_in_flight
+                                or self._running >= self.degrade_at * self.worker_max_in_flight)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO admission_leases (id, state, queued_at, expires_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (lease_id, RUNNING, now, now + self.lease_seconds)
+                    )
+                    self._count(conn, 'admitted')
+                    if degraded:
+                        self._count(conn, 'degraded')
+                    self._running += 1
+                    if queued:
+                        self._waiting -= 1
+                    return Ticket(self, lease_id, degraded, self.degraded_model if degraded else None)
+
+                if queued:
+                    conn.execute("UPDATE admission_leases SET expires_at = ? WHERE id = ?",
+                                 (now + self.lease_seconds, lease_id))
+                    return _QUEUED
+
+                if ahead >= self.queue_size:
+                    self._count(conn, 'shed')
+                    return _SHED
+                conn.execute(
+                    "INSERT INTO admission_leases (id, state, queued_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (lease_id, WAITING, now, now + self.lease_seconds)
+                )
+                self._count(conn, 'queued_total')
+                self._waiting += 1
+                return _QUEUED
+
+    def _admitted(self, outcome) -> Ticket:
+        """Return the ticket of an admission attempt, or raise if the request was shed."""
+        if outcome is _SHED:
+            self.logger.warning("Request shed: admission queue is full")
+            raise OverloadedError(self.retry_after, "queue full")
+        if outcome.degraded:
+            self.logger.info(f"Request admitted degraded (model={outcome.model or 'default'})")
+        return outcome
+
+    def _time_out(self) -> OverloadedError:
+        """Count a request whose queue wait ran out."""
+        with self.transaction(immediate=True) as conn:
+            self._count(conn, 'shed')
+        self.logger.warning(f"Request shed: no slot within {self.queue_timeout}s")
+        return OverloadedError(self.retry_after, "queue timeout")
+
+    def _leave_queue(self, lease_id: str):
+        """Drop a waiting request's place in the queue."""
+        with self._lock:
+            self._waiting -= 1
+            with self.transaction(immediate=True) as conn:
+                conn.execute("DELETE FROM admission_leases WHERE id = ?", (lease_id,))
+
+    def _leave_worker(self, ticket: Ticket):
+        """Stop counting a handed over lease against this worker.
+
+        The lease only lives ``handover_seconds`` until it is resumed, so a
+        follow-up request that never comes does not hold the slot for long.
+        """
+        with self._lock:
+            if ticket._local:
+                ticket._local = False
+                self._running -= 1
+            with self.transaction(immediate=True) as conn:
+                conn.execute("UPDATE admission_leases SET expires_at = ? WHERE id = ?",
+                             (time.time() + self.handover_seconds, ticket.id))
+
+    def _renew(self, ticket: Ticket):
+        """Push back the expiry of a running lease (restoring it if it already expired)."""
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO admission_leases (id, state, queued_at, expires_at) "
+                "VALUES (?, ?, COALESCE((SELECT queued_at FROM admission_leases WHERE id = ?), ?), ?)",
+                (ticket.id, RUNNING, ticket.id, now, now + self.lease_seconds)
+            )
+
+    def _release(self, ticket: Ticket):
+        """Free a lease's slot."""
+        with self._lock:
+            if ticket._local:
+                ticket._local = False
+                self._running -= 1
+            with self.transaction(immediate=True) as conn:
+                conn.execute("DELETE FROM admission_leases WHERE id = ?", (ticket.id,))
+
+    @staticmethod
+    def _count(conn, name: str):
+        conn.execute(
+            "INSERT INTO admission_counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
@@ -0,0 +1,209 @@
+"""
+Per-provider circuit breakers shared by all workers on the host.
+
+A breaker is closed while its provider is healthy. After ``failure_threshold``
+consecutive failures it opens and calls are rejected without touching the
+network. Once ``reset_timeout`` has passed it turns half-open and lets a
+single probe call through: success closes it again, failure re-opens it.
+
+State lives in SQLite, so one worker observing a brown-out spares the
+others from discovering it the slow way.
+"""
+import time
+import logging
+from typing import Any, Dict, List
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailableError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} circuit is open, retry in {retry_in:.0f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class CircuitBreaker(SQLiteStore):
+    """Closed/open/half-open breakers keyed by provider name."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_breakers (
+        provider TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        failures INTEGER NOT NULL DEFAULT 0,
+        opened_at REAL,
+        probe_until REAL,
+        total_failures INTEGER NOT NULL DEFAULT 0,
+        total_rejected INTEGER NOT NULL DEFAULT 0,
+        total_retries INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS llm_breaker_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        provider TEXT NOT NULL,
+        from_state TEXT NOT NULL,
+        to_state TEXT NOT NULL,
+        reason TEXT,
+        at REAL NOT NULL
+    );
+    """
+
+    # Transitions kept for monitoring
+    MAX_EVENTS = 100
+
+    def __init__(self, path, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 probe_timeout: float = 130.0):
+        """Initialize the breakers.
+
+        Args:
+            path: Path of the SQLite database file
+            failure_threshold: Consecutive failures that open a closed breaker
+            reset_timeout: Seconds an open breaker waits before letting a probe through
+            probe_timeout: Seconds after which an unanswered probe is presumed lost
+        """
+        super().__init__(path)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.logger = logging.getLogger(__name__)
+
+    def allow(self, provider: str):
+        """Check that a call to ``provider`` may go ahead.
+
+        Raises:
+            ProviderUnavailableError: If the breaker is open, or half-open
+                with its probe already taken by another caller
+        """
+        now = time.time()
+        retry_in = None
+        with self.transaction(immediate=True) as conn:
+            row = self._row(conn, provider, now)
+
+            if row["state"] == OPEN:
+                retry_at = row["opened_at"] + self.reset_timeout
+                if now < retry_at:
+                    retry_in = retry_at - now
+                else:
+                    self._transition(conn, provider, OPEN, HALF_OPEN, "reset timeout elapsed", now)
+                    conn.execute("UPDATE llm_breakers SET probe_until = NULL WHERE provider = ?",
+                                 (provider,))
+                    row = self._row(conn, provider, now)
+
+            if row["state"] == HALF_OPEN:
+                if row["probe_until"] is not None and row["probe_until"] > now:
+                    retry_in = row["probe_until"] - now
+                else:
+                    # This caller is the probe
+                    conn.execute(
+                        "UPDATE llm_breakers SET probe_until = ?, updated_at = ? WHERE provider = ?",
+                        (now + self.probe_timeout, now, provider)
+                    )
+
+            if retry_in is not None:
+                conn.execute(
+                    "UPDATE llm_breakers SET total_rejected = total_rejected + 1 WHERE provider = ?",
+                    (provider,)
+                )
+
+        if retry_in is not None:
+            raise ProviderUnavailableError(provider, retry_in)
+
+    def record_success(self, provider: str):
+        """Record a call the provider answered; closes the breaker."""
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            row = self._row(conn, provider, now)
+            if row["state"] != CLOSED:
+                self._transition(conn, provider, row["state"], CLOSED, "call succeeded", now)
+            conn.execute(
+                """UPDATE llm_breakers SET failures = 0, opened_at = NULL, probe_until = NULL,
+                   updated_at = ? WHERE provider = ?""",
+                (now, provider)
+            )
+
+    def record_failure(self, provider: str, reason: str = ""):
+        """Record a failed call; may open the breaker."""
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            row = self._row(conn, provider, now)
+            failures = row["failures"] + 1
+            conn.execute(
+                """UPDATE llm_breakers SET failures = ?, total_failures = total_failures + 1,
+                   updated_at = ? WHERE provider = ?""",
+                (failures, now, provider)
+            )
+            if row["state"] == HALF_OPEN or (row["state"] == CLOSED and failures >= self.failure_threshold):
+                self._transition(conn, provider, row["state"], OPEN, reason, now)
+                conn.execute(
+                    "UPDATE llm_breakers SET opened_at = ?, probe_until = NULL WHERE provider = ?",
+                    (now, provider)
+                )
+            elif row["state"] == OPEN:
+                # A call admitted before the breaker opened; keep the open period fresh
+                conn.execute("UPDATE llm_breakers SET opened_at = ? WHERE provider = ?",
+                             (now, provider))
+
+    def record_retry(self, provider: str):
+        """Count a retried call for monitoring."""
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            self._row(conn, provider, now)
+            conn.execute(
+                "UPDATE llm_breakers SET total_retries = total_retries + 1 WHERE provider = ?",
+                (provider,)
+            )
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """Get the state and counters of every breaker."""
+        conn = self.connection()
+        now = time.time()
+        states = {}
+        for row in conn.execute("SELECT * FROM llm_breakers ORDER BY provider"):
+            info = {
+                'state': row["state"],
+                'consecutive_failures': row["failures"],
+                'total_failures': row["total_failures"],
+                'total_rejected': row["total_rejected"],
+                'total_retries': row["total_retries"],
+            }
+            if row["state"] == OPEN:
+                info['retry_in'] = round(max(0.0, row["opened_at"] + self.reset_timeout - now), 1)
+            states[row["provider"]] = info
+        return states
+
+    def transitions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent state transitions, newest first."""
+        rows = self.connection().execute(
+            "SELECT provider, from_state, to_state, reason, at FROM llm_breaker_events "
+            "ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [dict(row) for row in rows]
+
+    def _row(self, conn, provider: str, now: float):
+        """Get the breaker row of ``provider``, creating a closed one if missing."""
+        conn.execute(
+            "INSERT OR IGNORE INTO llm_breakers (provider, state, updated_at) VALUES (?, ?, ?)",
+            (provider, CLOSED, now)
+        )
+        return conn.execute("SELECT * FROM llm_breakers WHERE provider = ?", (provider,)).fetchone()
+
+    def _transition(self, conn, provider: str, from_state: str, to_state: str,
+                    reason: str, now: float):
+        conn.execute("UPDATE llm_breakers SET state = ? WHERE provider = ?", (to_state, provider))
+        conn.execute(
+            "INSERT INTO llm_breaker_events (provider, from_state, to_state, reason, at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (provider, from_state, to_state, reason, now)
+        )
+        conn.execute(
+            "DELETE FROM llm_breaker_events WHERE id <= "
+            "(SELECT MAX(id) FROM llm_breaker_events) - ?", (self.MAX_EVENTS,)
+        )
+        log = self.logger.warning if to_state == OPEN else self.logger.info
+        log(f"Circuit breaker for {provider}: {from_state} -> {to_state} ({reason})")
@@ -0,0 +1,258 @@
+"""
+Shared HTTP connection pool for LLM provider calls.
+
+httpx connections belong to the event loop that opened them, while Flask runs
+every async view in a short-lived loop of its own. The pool therefore owns a
+long-lived loop on a daemon thread; requests issued from any other loop are
+handed over to it, so keep-alive connections survive across requests.
+"""
+import os
+import queue
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    # httpx only negotiates HTTP/2 when the h2 package is installed
+    HTTP2_AVAILABLE = False
+
+# Marks the end of a stream handed over between threads
+_END = object()
+
+
+class HTTPPool:
+    """Per-process pooled ``httpx.AsyncClient`` running on a dedicated event loop."""
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0, http2: bool = True):
+        """Initialize the pool settings; the client itself is created lazily.
+
+        Args:
+            max_connections: Maximum concurrent connections across all hosts
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept alive
+            http2: Negotiate HTTP/2 when the h2 package is available
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self.logger = logging.getLogger(__name__)
+
+    def init_app(self, app):
+        """Configure the pool from the Flask app config and optionally warm it up."""
+        self.max_connections = app.config.get('LLM_POOL_MAX_CONNECTIONS', self.max_connections)
+        self.max_keepalive_connections = app.config.get('LLM_POOL_MAX_KEEPALIVE', self.max_keepalive_connections)
+        self.keepalive_expiry = app.config.get('LLM_POOL_KEEPALIVE_EXPIRY', self.keepalive_expiry)
+        self.http2 = app.config.get('LLM_HTTP2', self.http2)
+
+        if app.config.get('LLM_POOL_WARMUP', False):
+            from appopvibe.services.llm.llm_service import LLMService
+            self.warm_up(cfg["url"] for cfg in LLMService.PROVIDER_CONFIGS.values()
+                         if os.getenv(cfg["env_var"]))
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop owning the pooled connections (started on first use)."""
+        self._ensure_started()
+        return self._loop
+
+    def _ensure_started(self):
+        """Start the pool loop, restarting it in a freshly forked worker."""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+
+            # A forked child inherits the parent's objects but not its threads,
+            # so anything left over is unusable and must be rebuilt.
+            self._client = None
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                self._client = self._create_client()
+                ready.set()
+                loop.run_forever()
+
+            thread = threading.Thread(target=run_loop, name="llm-http-pool", daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            self.logger.info(f"LLM HTTP pool started (max_connections={self.max_connections}, "
+                             f"keepalive={self.max_keepalive_connections}, "
+                             f"http2={self.http2 and HTTP2_AVAILABLE})")
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled client; must run on the pool loop."""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(limits=limits, http2=self.http2 and HTTP2_AVAILABLE)
+
+    async def run(self, func: Callable[[httpx.AsyncClient], Awaitable[Any]]) -> Any:
+        """Run ``func(client)`` on the pool loop and await its result.
+
+        Cancelling the caller cancels the request on the pool loop as well.
+        """
+        self._ensure_started()
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            return await func(self._client)
+
+        future = asyncio.run_coroutine_threadsafe(func(self._client), self._loop)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """POST through the pooled client."""
+        return await self.run(lambda client: client.post(url, **kwargs))
+
+    async def stream_lines(self, method: str, url: str, **kwargs) -> AsyncIterator[str]:
+        """Send a request through the pooled client and yield the response body line by line.
+
+        Raises ``httpx.HTTPStatusError`` for error responses before any line is yielded.
+        """
+        self._ensure_started()
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            async for line in self._lines(method, url, **kwargs):
+                yield line
+            return
+
+        # Bridge lines from the pool loop into the caller's loop
+        lines = asyncio.Queue()
+
+        def put(item):
+            try:
+                running.call_soon_threadsafe(lines.put_nowait, item)
+            except RuntimeError:
+                pass  # the caller's loop is gone; nobody is listening any more
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._pump(self._lines(method, url, **kwargs), put), self._loop)
+        try:
+            while True:
+                ok, item = await lines.get()
+                if not ok:
+                    raise item
+                if item is _END:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    async def _lines(self, method: str, url: str, **kwargs) -> AsyncIterator[str]:
+        """Yield response lines; must run on the pool loop."""
+        async with self._client.stream(method, url, **kwargs) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                yield line
+
+    @staticmethod
+    async def _pump(source: AsyncIterator, put: Callable[[tuple], None]):
+        """Forward items of an async iterator as ``(ok, item)`` pairs, ending with ``_END``."""
+        try:
+            async for item in source:
+                put((True, item))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            put((False, e))
+        else:
+            put((True, _END))
+
+    def iterate(self, source: AsyncIterator) -> Iterator:
+        """Consume an async iterator from synchronous code by running it on the pool loop.
+
+        This lets streaming WSGI responses drive async LLM streams. Closing
+        the returned generator (e.g. on client disconnect) cancels the source.
+        """
+        items = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._pump(source, items.put), self.loop)
+        try:
+            while True:
+                ok, item = items.get()
+                if not ok:
+                    raise item
+                if item is _END:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    def warm_up(self, urls: Iterable[str], timeout: float = 5.0):
+        """Open connections to the given endpoints in the background.
+
+        Warm-up never blocks worker boot and failures are only logged; the
+        point is to have DNS, TCP and TLS done before the first real request.
+        """
+        origins = sorted({f"{urlsplit(u).scheme}://{urlsplit(u).netloc}" for u in urls})
+        if not origins:
+            return
+
+        async def touch(client: httpx.AsyncClient, origin: str):
+            try:
+                await client.head(origin, timeout=timeout)
+                self.logger.info(f"Warmed up connection to {origin}")
+            except Exception as e:
+                self.logger.warning(f"Connection warm-up to {origin} failed: {e}")
+
+        loop = self.loop
+        for origin in origins:
+            asyncio.run_coroutine_threadsafe(touch(self._client, origin), loop)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Close the pooled client and stop the pool loop."""
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread or not self._thread.is_alive():
+                self._loop = self._thread = self._client = self._pid = None
+                return
+
+            loop, thread, client = self._loop, self._thread, self._client
+            future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            try:
+                future.result(timeout)
+            except Exception as e:
+                self.logger.warning(f"Error closing LLM HTTP pool: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self._loop = self._thread = self._client = self._pid = None
+
+
+# Shared pool instance, one per worker process
+http_pool = HTTPPool()
@@ -0,0 +1,62 @@
+"""
+Rolling latency statistics for LLM calls.
+
+Used to decide when a call has become slow enough to hedge: the threshold
+is a percentile of recently observed latencies for the same provider/model.
+"""
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """Per-process sliding window of call latencies, keyed by provider/model."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """Initialize the tracker.
+
+        Args:
+            window: Number of most recent samples kept per key
+            min_samples: Samples required before percentiles are reported
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, seconds: float):
+        """Record the latency of a successful call."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, percentile: float) -> Optional[float]:
+        """Get the given latency percentile (0-100), or None without enough samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(percentile / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Summarize p50/p95/p99 per key for monitoring."""
+        with self._lock:
+            keys = list(self._samples)
+        summary = {}
+        for key in keys:
+            with self._lock:
+                count = len(self._samples[key])
+            summary[key] = {'samples': count}
+            for p in (50, 95, 99):
+                value = self.percentile(key, p)
+                if value is not None:
+                    summary[key][f'p{p}'] = round(value, 3)
+        return summary
+
+
+# Shared tracker, one per worker process
+latency_tracker = LatencyTracker()
@@ -3,22 +3,51 @@ LLM service for handling interactions with language models.
 Supports multiple providers (Groq, OpenRouter, etc.) through a flexible provider system.
 """
 import os
+import json
+import time
+import socket
+import hashlib
 import logging
 import httpx
 import asyncio
-from typing import Dict, Any, Optional, List, Literal
-from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Dict, Any, AsyncIterator, Optional, List, Literal
 from enum import Enum
 
+from appopvibe.services.llm.http_pool import http_pool
+from appopvibe.services.llm.single_flight import single_flight
+from appopvibe.services.llm.latency import latency_tracker
+from appopvibe.services.llm.usage import usage_tracker
+from appopvibe.services.llm.retry import RetryPolicy
+from appopvibe.services.llm.circuit_breaker import ProviderUnavailableError
+from appopvibe.services.llm.throttle import RateLimitedError, queue_patience
+from appopvibe.services.llm.tokens import estimate_tokens
+
 class LLMProvider(str, Enum):
     """Supported LLM providers."""
     GROQ = "groq"
     OPENROUTER = "openrouter"
     # Add more providers as needed
 
+class LLMResponseError(Exception):
+    """Raised when the provider answers with an unusable response body."""
+
+@dataclass
+class LLMCompletion:
+    """A completion together with where and how fast it was served."""
+    text: str
+    provider: str
+    model: str
+    latency: float
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
 class LLMService:
     """Service for interacting with language model APIs."""
     
+    # System message used when the caller does not provide one
+    DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+    
     # Provider-specific configurations
     PROVIDER_CONFIGS = {
         LLMProvider.GROQ: {
@@ -36,7 +65,12 @@ class LLMService:
     }
     
     def __init__(self, api_key: str = None, default_model: str = None, 
-                 provider: str = None, timeout: int = None):
+                 provider: str = None, timeout: int = None, pool=None, cache=None,
+                 coalescer=None, hedge: Optional['LLMService'] = None,
+                 hedge_percentile: float = 95.0, hedge_delay: float = 30.0,
+                 hedge_min_delay: float = 2.0, retry: Optional[RetryPolicy] = None,
+                 breaker=None, throttle=None,
+                 max_output_tokens: Optional[Dict[str, int]] = None):
         """Initialize the LLM service.
         
         Args:
@@ -44,6 +78,18 @@ class LLMService:
             default_model: The default model to use (if None, will use provider default)
             provider: The LLM provider to use (groq, openrouter, etc.)
             timeout: Request timeout in seconds (if None, will use provider default)
+            pool: HTTP connection pool to send requests through (defaults to the shared per-worker pool)
+            cache: Response cache used by cached_generate (None disables caching)
+            coalescer: Single-flight registry merging identical concurrent calls
+                (defaults to the shared per-worker registry)
+            hedge: Secondary service the same prompt is sent to when the primary is slow
+            hedge_percentile: Latency percentile of the primary after which to hedge
+            hedge_delay: Hedge delay used until enough latencies have been observed
+            hedge_min_delay: Lower bound on the hedge delay
+            retry: Policy for retrying transient failures (defaults to RetryPolicy())
+            breaker: Circuit breaker shared across workers (None disables it)
+            throttle: Request/token rate limiter shared across workers (None disables it)
+            max_output_tokens: Completion token limit per model name ("default" for others)
         """
         # Determine provider (default to GROQ if available, then OPENROUTER)
         self.provider = None
@@ -70,6 +116,19 @@ class LLMService:
         self.default_model = default_model or provider_config["default_model"]
         self.timeout = timeout or provider_config["timeout"]
         self.api_url = provider_config["url"]
+        self.pool = pool or http_pool
+        self.cache = cache
+        self.coalescer = coalescer or single_flight
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = latency_tracker
+        self.usage = usage_tracker
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker
+        self.throttle = throttle
+        self.max_output_tokens = max_output_tokens or {}
         
         self.logger = logging.getLogger(__name__)
         
@@ -78,14 +137,18 @@ class LLMService:
             self.logger.warning(f"No API key provided for {self.provider}. LLM service will not work.")
     
     async def generate(self, prompt: str, temperature: float = 0.7, 
-                      model: Optional[str] = None, max_tokens: int = 2048) -> str:
+                      model: Optional[str] = None, max_tokens: Optional[int] = None,
+                      system: Optional[str] = None,
+                      template_version: Optional[str] = None) -> str:
         """Generate text using the LLM API.
         
         Args:
             prompt: The prompt to send to the LLM
             temperature: Controls randomness (0-1)
             model: Model to use (defaults to self.default_model)
-            max_tokens: Maximum tokens to generate
+            max_tokens: Maximum tokens to generate (defaults to the model's output limit)
+            system: System message sent ahead of the prompt (defaults to a generic one)
+            template_version: Version of the prompt template, for usage metrics
             
         Returns:
             Generated text string
@@ -95,58 +158,516 @@ class LLMService:
             return "Error: API key not configured."
             
         model = model or self.default_model
+        max_tokens = max_tokens or self.max_tokens_for(model)
         self.logger.info(f"Generating text with model: {model}")
         
         try:
-            # Use the configured provider's API endpoint
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    self.api_url,  # Use the provider-specific URL
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": "You are a helpful assistant."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": temperature,
-                        "max_tokens": max_tokens,
-                    }
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                if "choices" in result and result["choices"]:
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    self.logger.warning("Unexpected API response format")
-                    return "Error: Unexpected response from LLM API"
-                
-        except httpx.TimeoutException:
-            self.logger.error(f"Timeout when calling LLM API with model {model}")
-            return "Error: The request to the LLM service timed out."
-        except httpx.HTTPStatusError as e:
-            self.logger.error(f"HTTP error when calling LLM API: {e}")
-            return f"Error: LLM API request failed with status {e.response.status_code}"
+            # Identical concurrent calls in this worker share one upstream request
+            completion = await self.coalescer.do(
+                self._call_key(prompt, temperature, model, max_tokens, system),
+                lambda: self._complete_hedged(prompt, temperature, model, max_tokens,
+                                              system, template_version)
+            )
+            return completion.text
         except Exception as e:
-            self.logger.exception(f"Exception when calling LLM API: {e}")
-            return "Error: An unexpected error occurred when communicating with the LLM service."
+            return self._error_message(e, model)
     
-    @lru_cache(maxsize=32)
     async def cached_generate(self, prompt: str, temperature: float = 0.7,
-                           model: Optional[str] = None) -> str:
-        """Cached version of generate to avoid redundant API calls."""
-        return await self.generate(prompt, temperature, model)
+                           model: Optional[str] = None, max_tokens: Optional[int] = None,
+                           template_version: Optional[str] = None,
+                           system: Optional[str] = None) -> str:
+        """Cached version of generate to avoid redundant API calls.
+        
+        Responses are looked up in the shared response cache by provider,
+        model, sampling parameters, template version and prompt digest.
+        Only successful completions are stored.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            temperature: Controls randomness (0-1)
+            model: Model to use (defaults to self.default_model)
+            max_tokens: Maximum tokens to generate (defaults to the model's output limit)
+            template_version: Version of the prompt template the prompt was built from
+            system: System message sent ahead of the prompt (defaults to a generic one)
+            
+        Returns:
+            Generated (or cached) text string
+        """
+        if self.cache is None or not self.api_key:
+            return await self.generate(prompt, temperature, model, max_tokens,
+                                       system, template_version)
+        
+        model = model or self.default_model
+        max_tokens = max_tokens or self.max_tokens_for(model)
+        key = self.cache.make_key(self.provider.value, model, temperature, max_tokens,
+                                  template_version, prompt, system)
+        
+        cached = await self._cache_lookup(key, model)
+        if cached is not None:
+            return cached
+        
+        try:
+            return await self.coalescer.do(
+                f"cache:{key}",
+                lambda: self._fill_cache(key, prompt, temperature, model, max_tokens,
+                                         template_version, system)
+            )
+        except Exception as e:
+            return self._error_message(e, model)
+    
+    async def generate_stream(self, prompt: str, temperature: float = 0.7,
+                              model: Optional[str] = None, max_tokens: Optional[int] = None,
+                              template_version: Optional[str] = None,
+                              use_cache: bool = False,
+                              system: Optional[str] = None) -> AsyncIterator[str]:
+        """Generate text with ``stream=True``, yielding chunks as they arrive.
+        
+        Errors are yielded as a final chunk in the same form generate returns them.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            temperature: Controls randomness (0-1)
+            model: Model to use (defaults to self.default_model)
+            max_tokens: Maximum tokens to generate (defaults to the model's output limit)
+            template_version: Version of the prompt template (used for caching)
+            use_cache: Serve from and store into the response cache like cached_generate
+            system: System message sent ahead of the prompt (defaults to a generic one)
+            
+        Yields:
+            Text chunks of the completion
+        """
+        if not self.api_key:
+            self.logger.error("Cannot generate: No API key provided")
+            yield "Error: API key not configured."
+            return
+        
+        model = model or self.default_model
+        max_tokens = max_tokens or self.max_tokens_for(model)
+        key = None
+        if use_cache and self.cache is not None:
+            key = self.cache.make_key(self.provider.value, model, temperature, max_tokens,
+                                      template_version, prompt, system)
+            cached = await self._cache_lookup(key, model)
+            if cached is not None:
+                yield cached
+                return
+        
+        self.logger.info(f"Streaming text with model: {model}")
+        chunks = []
+        usage = {}
+        started = time.monotonic()
+        deadline = started + self.timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self._admit()
+                await self._acquire_quota(prompt, model, max_tokens, deadline, system)
+                async for line in self.pool.stream_lines(
+                    "POST", self.api_url,
+                    headers=self._headers(),
+                    json={**self._payload(prompt, temperature, model, max_tokens, system),
+                          "stream": True, "stream_options": {"include_usage": True}},
+                    timeout=self.timeout
+                ):
+                    # Server-sent events: skip blank separators and ": keep-alive" comments
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    event = json.loads(data)
+                    # Usage arrives with the last chunk (Groq nests it under x_groq)
+                    raw_usage = event.get("usage") or (event.get("x_groq") or {}).get("usage")
+                    if raw_usage:
+                        usage = self._parse_usage(raw_usage)
+                    choices = event.get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+                await self._settle(None)
+                await self._refund_quota(model, max_tokens, "".join(chunks))
+                self.usage.record(template_version, time.monotonic() - started, usage)
+                break
+            except Exception as e:
+                await self._settle(e)
+                # Once text went out the stream cannot be replayed
+                delay = None if chunks else self._retry_delay(attempt, e, deadline)
+                if delay is None:
+                    yield ("\n\n" if chunks else "") + self._error_message(e, model)
+                    return
+                await self._note_retry(attempt, e, delay)
+        
+        if key is not None and chunks:
+            await self._cache_store(key, "".join(chunks), model, template_version)
+    
+    def max_tokens_for(self, model: str) -> int:
+        """Completion token limit for a model."""
+        return self.max_output_tokens.get(model) or self.max_output_tokens.get('default') or 2048
+    
+    async def _fill_cache(self, key: str, prompt: str, temperature: float, model: str,
+                          max_tokens: int, template_version: Optional[str],
+                          system: Optional[str] = None) -> str:
+        """Produce a missing cache entry, letting one worker on the host call the provider.
+        
+        The worker holding the fill lease requests the completion; others
+        wait for it to show up in the cache and only call the provider
+        themselves if the lease holder gives up without storing a result.
+        """
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            leased = await asyncio.to_thread(self.cache.acquire_fill, key, owner, self.timeout + 5)
+        except Exception as e:
+            self.logger.warning(f"LLM cache lease failed: {e}")
+            leased = None
+        
+        if leased is False:
+            text = await self._await_peer_fill(key, model)
+            if text is not None:
+                return text
+        
+        try:
+            self.logger.info(f"Generating text with model: {model}")
+            completion = await self._complete_hedged(prompt, temperature, model, max_tokens,
+                                                     system, template_version)
+            # Only cache what the requested provider/model produced
+            if completion.provider == self.provider.value and completion.model == model:
+                await self._cache_store(key, completion.text, model, template_version)
+            return completion.text
+        finally:
+            if leased:
+                try:
+                    await asyncio.to_thread(self.cache.release_fill, key, owner)
+                except Exception as e:
+                    self.logger.warning(f"LLM cache lease release failed: {e}")
+    
+    async def _await_peer_fill(self, key: str, model: str,
+                               poll_interval: float = 0.5) -> Optional[str]:
+        """Wait for another worker to cache the response; None if it gave up."""
+        self.logger.info(f"Waiting for another worker to generate with model {model}")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(poll_interval)
+                text = await asyncio.to_thread(self.cache.peek, key)
+                if text is not None:
+                    await asyncio.to_thread(self.cache.record, "peer_waits")
+                    return text
+                if not await asyncio.to_thread(self.cache.fill_pending, key):
+                    return await asyncio.to_thread(self.cache.peek, key)
+        except Exception as e:
+            self.logger.warning(f"LLM cache wait failed: {e}")
+        return None
+    
+    def _call_key(self, prompt: str, temperature: float, model: str, max_tokens: int,
+                  system: Optional[str] = None) -> str:
+        """Identity of an upstream call, used to coalesce identical requests."""
+        messages = f"{system or ''}\0{prompt}"
+        key_str = "|".join([self.provider.value, self.api_url, model, f"{temperature:.3f}",
+                            str(max_tokens), hashlib.sha256(messages.encode('utf-8')).hexdigest()])
+        return "call:" + hashlib.sha256(key_str.encode('utf-8')).hexdigest()
+    
+    async def _cache_lookup(self, key: str, model: str) -> Optional[str]:
+        """Look a response up in the cache, treating cache failures as misses."""
+        try:
+            cached = await asyncio.to_thread(self.cache.get, key)
+        except Exception as e:
+            # A broken cache must never break generation
+            self.logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+        
+        if cached is not None:
+            self.logger.info(f"LLM cache hit for model {model}")
+        return cached
+    
+    async def _cache_store(self, key: str, text: str, model: str,
+                           template_version: Optional[str]):
+        """Store a successful response in the cache, logging failures."""
+        try:
+            await asyncio.to_thread(self.cache.set, key, text, self.provider.value,
+                                    model, template_version)
+        except Exception as e:
+            self.logger.warning(f"LLM cache store failed: {e}")
+    
+    async def _complete_hedged(self, prompt: str, temperature: float, model: str,
+                               max_tokens: int, system: Optional[str] = None,
+                               template_version: Optional[str] = None) -> LLMCompletion:
+        """Request a completion, hedging to the secondary service if the primary is slow.
+        
+        If the primary has not answered within its hedge delay (or fails
+        before that), the same prompt is sent to the secondary service. The
+        first successful answer wins and the other request is cancelled.
+        """
+        completion = await self._race(prompt, temperature, model, max_tokens, system)
+        self.usage.record(template_version, completion.latency, completion.usage)
+        return completion
+    
+    async def _race(self, prompt: str, temperature: float, model: str, max_tokens: int,
+                    system: Optional[str]) -> LLMCompletion:
+        """Run the primary call and, once it is late or failed, the hedge call."""
+        if self.hedge is None:
+            return await self._call(prompt, temperature, model, max_tokens, system)
+        
+        primary = asyncio.create_task(self._call(prompt, temperature, model, max_tokens, system))
+        tasks = [primary]
+        try:
+            delay = self._hedge_delay(model)
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if primary in done and primary.exception() is None:
+                return primary.result()
+            
+            if primary in done:
+                self.logger.warning(f"Primary model {model} failed, sending to "
+                                    f"{self.hedge.provider.value}/{self.hedge.default_model}")
+            else:
+                self.logger.warning(f"No response from {model} after {delay:.1f}s, hedging to "
+                                    f"{self.hedge.provider.value}/{self.hedge.default_model}")
+            backup = asyncio.create_task(self.hedge._call(
+                prompt, temperature, self.hedge.default_model, max_tokens, system))
+            tasks.append(backup)
+            
+            errors = []
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task.result()
+                        if task is backup:
+                            self.logger.info(f"Hedged request won by {winner.provider}/{winner.model}")
+                        return winner
+                    errors.append(task.exception())
+            # Both failed: report the primary's error
+            raise primary.exception() or errors[0]
+        finally:
+            # Cancel the loser (or everything, if we were cancelled) and let it
+            # unwind so its connection goes back to the pool
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+    
+    def _hedge_delay(self, model: str) -> float:
+        """Seconds to wait for the primary before hedging."""
+        observed = self.latency.percentile(f"{self.provider.value}:{model}", self.hedge_percentile)
+        delay = observed if observed is not None else self.hedge_delay
+        return max(self.hedge_min_delay, delay)
+    
+    async def _call(self, prompt: str, temperature: float, model: str,
+                    max_tokens: int, system: Optional[str] = None) -> LLMCompletion:
+        """Request a completion, retrying transient failures behind the circuit breaker.
+        
+        Retries back off exponentially with jitter (or as the provider's
+        ``Retry-After`` asks) and stop once the next attempt could not start
+        within the request timeout or the breaker opens.
+        """
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self._admit()
+                await self._acquire_quota(prompt, model, max_tokens, deadline, system)
+                completion = await self._complete(prompt, temperature, model, max_tokens, system)
+            except Exception as e:
+                await self._settle(e)
+                delay = self._retry_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                await self._note_retry(attempt, e, delay)
+                continue
+            await self._settle(None)
+            await self._refund_quota(model, max_tokens, completion.text)
+            return completion
+    
+    def _retry_delay(self, attempt: int, error: Exception, deadline: float) -> Optional[float]:
+        """Backoff before the next attempt, or None to give up."""
+        delay = self.retry.delay(attempt, error)
+        if delay is None or time.monotonic() + delay >= deadline:
+            return None
+        return delay
+    
+    async def _note_retry(self, attempt: int, error: Exception, delay: float):
+        """Log and count a retry, then wait out its backoff."""
+        self.logger.warning(f"LLM call to {self.provider.value} failed ({error!r}), "
+                            f"retry {attempt}/{self.retry.max_attempts - 1} in {delay:.1f}s")
+        await self._breaker_update("record_retry")
+        await asyncio.sleep(delay)
+    
+    async def _admit(self):
+        """Fail fast if the provider's circuit is open."""
+        if self.breaker is None:
+            return
+        try:
+            await asyncio.to_thread(self.breaker.allow, self.provider.value)
+        except ProviderUnavailableError:
+            raise
+        except Exception as e:
+            # Breaker storage trouble must not take the LLM down with it
+            self.logger.warning(f"Circuit breaker check failed: {e}")
+    
+    async def _acquire_quota(self, prompt: str, model: str, max_tokens: int, deadline: float,
+                             system: Optional[str] = None):
+        """Wait for rate limit quota, or raise RateLimitedError if it would take past ``deadline``.
+        
+        Callers that set ``queue_patience`` are background work: they wait
+        up to that long, reserving quota only a short way ahead at a time.
+        """
+        if self.throttle is None:
+            return
+        tokens = (estimate_tokens(system or self.DEFAULT_SYSTEM_PROMPT, model)
+                  + estimate_tokens(prompt, model) + max_tokens)
+        patience = queue_patience.get()
+        background = patience is not None
+        if background:
+            deadline = max(deadline, time.monotonic() + patience)
+        while True:
+            try:
+                wait = await asyncio.to_thread(self.throttle.reserve, self.provider.value, model,
+                                               tokens, deadline - time.monotonic(), background)
+                break
+            except RateLimitedError as e:
+                if not background or time.monotonic() + e.retry_in > deadline:
+                    raise
+                await asyncio.sleep(e.retry_in)
+            except Exception as e:
+                self.logger.warning(f"Rate limiter check failed: {e}")
+                return
+        if wait > 0:
+            self.logger.info(f"Rate limit for {self.provider.value}/{model}: queued for {wait:.1f}s")
+            await asyncio.sleep(wait)
+    
+    async def _refund_quota(self, model: str, max_tokens: int, text: str):
+        """Return the part of the reserved completion tokens the answer did not use."""
+        if self.throttle is None:
+            return
+        try:
+            await asyncio.to_thread(self.throttle.refund, self.provider.value, model,
+                                    max_tokens - estimate_tokens(text, model))
+        except Exception as e:
+            self.logger.warning(f"Rate limiter refund failed: {e}")
+    
+    async def _settle(self, error: Optional[Exception]):
+        """Report the outcome of an attempt to the circuit breaker."""
+        if error is None or (isinstance(error, httpx.HTTPStatusError)
+                             and not self.retry.is_retryable(error)):
+            # The provider answered (a 4xx is our fault, not its)
+            await self._breaker_update("record_success")
+        elif self.retry.is_retryable(error) or isinstance(error, LLMResponseError):
+            await self._breaker_update("record_failure", repr(error))
+    
+    async def _breaker_update(self, method: str, *args):
+        """Call a circuit breaker method for this provider off the event loop."""
+        if self.breaker is None:
+            return
+        try:
+            await asyncio.to_thread(getattr(self.breaker, method), self.provider.value, *args)
+        except Exception as e:
+            self.logger.warning(f"Circuit breaker update failed: {e}")
+    
+    async def _complete(self, prompt: str, temperature: float, model: str,
+                        max_tokens: int, system: Optional[str] = None) -> LLMCompletion:
+        """Request a completion from the provider, raising on any failure."""
+        started = time.monotonic()
+        # Use the configured provider's API endpoint through the shared
+        # pool so keep-alive connections are reused across requests
+        response = await self.pool.post(
+            self.api_url,  # Use the provider-specific URL
+            headers=self._headers(),
+            json=self._payload(prompt, temperature, model, max_tokens, system),
+            timeout=self.timeout
+        )
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        if "choices" in result and result["choices"]:
+            elapsed = time.monotonic() - started
+            self.latency.record(f"{self.provider.value}:{model}", elapsed)
+            return LLMCompletion(
+                text=result["choices"][0]["message"]["content"],
+                provider=self.provider.value,
+                model=model,
+                latency=elapsed,
+                usage=self._parse_usage(result.get("usage"))
+            )
+        raise LLMResponseError("Unexpected response from LLM API")
+    
+    def _headers(self) -> Dict[str, str]:
+        """Build the request headers for the provider API."""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _payload(self, prompt: str, temperature: float, model: str,
+                 max_tokens: int, system: Optional[str] = None) -> Dict[str, Any]:
+        """Build the chat completion request body.
+        
+        The system message comes first so that, when it carries the static
+        instructions of a template, consecutive requests share a long
+        identical prefix the provider can serve from its prompt cache.
+        """
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system or self.DEFAULT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+    
+    @staticmethod
+    def _parse_usage(raw: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        """Normalize the token usage block of a response, including prompt-cache hits."""
+        if not raw:
+            return {}
+        details = raw.get("prompt_tokens_details") or {}
+        return {
+            'prompt_tokens': raw.get("prompt_tokens") or 0,
+            'completion_tokens': raw.get("completion_tokens") or 0,
+            'total_tokens': raw.get("total_tokens") or 0,
+            'cached_tokens': details.get("cached_tokens") or raw.get("cached_tokens") or 0,
+        }
+    
+    def _error_message(self, error: Exception, model: str) -> str:
+        """Log a failed completion and turn it into a user-facing error string."""
+        if isinstance(error, httpx.TimeoutException):
+            self.logger.error(f"Timeout when calling LLM API with model {model}")
+            return "Error: The request to the LLM service timed out."
+        if isinstance(error, httpx.HTTPStatusError):
+            self.logger.error(f"HTTP error when calling LLM API: {error}")
+            return f"Error: LLM API request failed with status {error.response.status_code}"
+        if isinstance(error, ProviderUnavailableError):
+            self.logger.error(f"Not calling LLM API: {error}")
+            return "Error: The LLM service is temporarily unavailable. Please try again shortly."
+        if isinstance(error, RateLimitedError):
+            self.logger.warning(f"Not calling LLM API: {error}")
+            return (f"Error: The LLM service is busy right now. "
+                    f"Please try again in {max(1, round(error.retry_in))} seconds.")
+        if isinstance(error, LLMResponseError):
+            self.logger.warning("Unexpected API response format")
+            return f"Error: {error}"
+        self.logger.error(f"Exception when calling LLM API: {error}", exc_info=error)
+        return "Error: An unexpected error occurred when communicating with the LLM service."
         
     async def generate_with_fallback(self, prompt: str, primary_model: str,
                                   backup_model: str, temperature: float = 0.7) -> str:
         """Try generating with primary model, fall back to backup if it fails."""
-        try:
+        if not self.api_key:
             return await self.generate(prompt, temperature, primary_model)
+        
+        try:
+            # Call the provider directly: generate turns failures into
+            # error strings, which would never trigger the fallback
+            completion = await self._call(prompt, temperature, primary_model,
+                                          self.max_tokens_for(primary_model))
+            return completion.text
         except Exception as e:
             self.logger.warning(f"Primary model failed: {e}, trying backup model")
             return await self.generate(prompt, temperature, backup_model)
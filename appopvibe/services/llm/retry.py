@@ -0,0 +1,76 @@
+"""
+Retry policy for LLM provider calls.
+
+Timeouts, connection errors, 429s and 5xx responses are retried with
+exponential backoff and full jitter. A ``Retry-After`` header sent by the
+provider takes precedence over the computed backoff.
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+# Status codes worth another attempt: rate limited or a transient server error
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Decides whether and when to retry a failed provider call."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, max_retry_after: float = 30.0):
+        """Initialize the policy.
+
+        Args:
+            max_attempts: Total number of attempts, including the first one
+            base_delay: Backoff before the first retry (doubled for each further retry)
+            max_delay: Upper bound on the computed backoff
+            max_retry_after: Longest ``Retry-After`` the caller is willing to honor
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    @staticmethod
+    def is_retryable(error: BaseException) -> bool:
+        """Whether a failure is transient and the call may succeed if repeated."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        # Timeouts, refused/reset connections, protocol errors
+        return isinstance(error, httpx.TransportError)
+
+    def delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retrying after ``attempt`` (1-based) failed with ``error``.
+
+        Returns:
+            The delay, or None if the call should not be retried
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(error):
+            return None
+
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+
+        # Full jitter keeps workers that failed together from retrying together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def retry_after(error: BaseException) -> Optional[float]:
+        """Parse the ``Retry-After`` header of an HTTP error (seconds or HTTP date)."""
+        if not isinstance(error, httpx.HTTPStatusError):
+            return None
+        value = error.response.headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
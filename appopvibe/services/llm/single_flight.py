@@ -0,0 +1,89 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+
+While a call for a key is in flight, further callers with the same key wait
+for it and share its outcome instead of starting their own. Callers may
+live on different event loops (Flask runs each async view in its own), so
+results are handed over through thread-safe futures.
+"""
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar('T')
+
+
+class _LeaderCancelled(Exception):
+    """The call being waited on was cancelled; a waiter should take over."""
+
+
+class SingleFlight:
+    """Per-process registry of in-flight calls keyed by request identity."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+        self.coalesced = 0
+        self.logger = logging.getLogger(__name__)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Run ``func`` unless a call for ``key`` is already in flight, then share its outcome.
+
+        Args:
+            key: Identity of the call; equal keys must mean interchangeable results
+            func: Zero-argument coroutine function performing the call
+
+        Returns:
+            The result of the (possibly shared) call; its exception is raised
+            to every caller sharing it
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = future
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                return await self._lead(key, future, func)
+
+            self.logger.info(f"Joining in-flight call {key[:12]}")
+            try:
+                # Shielded so that one waiter giving up does not cancel the call for the others
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                continue  # the caller that made the call went away; retry ourselves
+
+    async def _lead(self, key: str, future: concurrent.futures.Future,
+                    func: Callable[[], Awaitable[T]]) -> T:
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._finish(key)
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: str):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently in flight."""
+        with self._lock:
+            return len(self._calls)
+
+
+# Shared registry, one per worker process
+single_flight = SingleFlight()
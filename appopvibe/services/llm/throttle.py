@@ -0,0 +1,191 @@
+"""
+Client-side throttling against provider rate limits.
+
+Each provider/model pair has two token buckets, one metering requests per
+minute and one metering (estimated) tokens per minute. Buckets live in
+SQLite so every worker on the host draws from the same quota. A caller that
+finds a bucket empty reserves its share anyway and waits until the bucket
+has refilled, which queues callers in arrival order; if that wait would be
+too long the call is rejected up front instead.
+
+Interactive requests only queue briefly; background work such as batch
+analysis sets ``queue_patience`` so its calls wait for quota instead of
+failing, which keeps it running at the provider's pace. Background calls
+never reserve more than ``background_horizon`` seconds ahead: past that they
+wait without reserving and try again, so however much background work is
+queued, an interactive call never finds more than that much quota spoken for.
+"""
+import time
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+
+# Longest quota wait accepted by LLM calls made in the current context
+# (None for the throttle's own limit)
+queue_patience: ContextVar[Optional[float]] = ContextVar('queue_patience', default=None)
+
+
+class RateLimitedError(Exception):
+    """Raised when a call would have to queue longer than its deadline allows."""
+
+    def __init__(self, provider: str, model: str, retry_in: float):
+        super().__init__(f"{provider}/{model} rate limit reached, retry in {retry_in:.0f}s")
+        self.provider = provider
+        self.model = model
+        self.retry_in = retry_in
+
+
+class Throttle(SQLiteStore):
+    """Request and token buckets keyed by provider and model."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_rate_buckets (
+        key TEXT PRIMARY KEY,
+        requests REAL NOT NULL,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        waits INTEGER NOT NULL DEFAULT 0,
+        waited_seconds REAL NOT NULL DEFAULT 0,
+        rejected INTEGER NOT NULL DEFAULT 0
+    );
+    """
+
+    def __init__(self, path, limits: Dict[str, Dict[str, float]], burst_seconds: float = 60.0,
+                 max_wait: float = 20.0, background_horizon: float = 5.0):
+        """Initialize the throttle.
+
+        Args:
+            path: Path of the SQLite database file
+            limits: ``{"provider" or "provider:model": {"rpm": ..., "tpm": ...}}``;
+                either limit may be omitted, unlisted providers are not throttled
+            burst_seconds: Seconds of quota a bucket can accumulate while idle
+            max_wait: Longest a call may queue, whatever its deadline
+            background_horizon: Furthest ahead background calls may reserve quota
+        """
+        super().__init__(path)
+        self.limits = limits
+        self.burst_seconds = burst_seconds
+        self.max_wait = max_wait
+        self.background_horizon = background_horizon
+        self.logger = logging.getLogger(__name__)
+
+    def limit_for(self, provider: str, model: str) -> Optional[Dict[str, float]]:
+        """Get the limits of a model, falling back to those of its provider."""
+        return self.limits.get(f"{provider}:{model}") or self.limits.get(provider)
+
+    def reserve(self, provider: str, model: str, tokens: int,
+                max_wait: Optional[float] = None, background: bool = False) -> float:
+        """Take one request and ``tokens`` tokens from the buckets of a model.
+
+        Args:
+            provider: Provider name
+            model: Model name
+            tokens: Estimated tokens of the call (prompt plus completion)
+            max_wait: Longest acceptable wait (capped at ``self.max_wait``)
+            background: Whether the call is background work, whose wait is
+                capped at ``self.background_horizon`` instead
+
+        Returns:
+            Seconds the caller must wait before sending the request
+
+        Raises:
+            RateLimitedError: If the wait would exceed ``max_wait``; nothing is
+                reserved. For background calls ``retry_in`` is the time after
+                which the call fits within the horizon.
+        """
+        limit = self.limit_for(provider, model)
+        if not limit:
+            return 0.0
+        longest_wait = self.background_horizon if background else self.max_wait
+        max_wait = longest_wait if max_wait is None else min(max_wait, longest_wait)
+        request_rate, token_rate = self._rates(limit)
+
+        now = time.time()
+        key = f"{provider}:{model}"
+        with self.transaction(immediate=True) as conn:
+            requests, available_tokens = self._refill(conn, key, limit, now)
+            # Only metered buckets are drawn down
+            requests_after = requests - 1 if request_rate else requests
+            tokens_after = available_tokens - tokens if token_rate else available_tokens
+
+            wait = 0.0
+            if requests_after < 0:
+                wait = max(wait, -requests_after / request_rate)
+            if tokens_after < 0:
+                wait = max(wait, -tokens_after / token_rate)
+
+            if wait > max_wait:
+                # Background calls put off for later are not rejections
+                conn.execute(
+                    "UPDATE llm_rate_buckets SET requests = ?, tokens = ?, updated_at = ?, "
+                    "rejected = rejected + ? WHERE key = ?",
+                    (requests, available_tokens, now, 0 if background else 1, key)
+                )
+            else:
+                conn.execute(
+                    "UPDATE llm_rate_buckets SET requests = ?, tokens = ?, updated_at = ?, "
+                    "waits = waits + ?, waited_seconds = waited_seconds + ? WHERE key = ?",
+                    (requests_after, tokens_after, now, 1 if wait else 0, wait, key)
+                )
+
+        if wait > max_wait:
+            raise RateLimitedError(provider, model, wait - max_wait if background else wait)
+        return wait
+
+    def refund(self, provider: str, model: str, tokens: int):
+        """Give back tokens reserved but not used (e.g. a shorter completion)."""
+        limit = self.limit_for(provider, model)
+        if not limit or tokens <= 0:
+            return
+        now = time.time()
+        key = f"{provider}:{model}"
+        with self.transaction(immediate=True) as conn:
+            requests, available_tokens = self._refill(conn, key, limit, now)
+            capacity = self._capacities(limit)[1]
+            conn.execute(
+                "UPDATE llm_rate_buckets SET requests = ?, tokens = ?, updated_at = ? WHERE key = ?",
+                (requests, min(capacity, available_tokens + tokens), now, key)
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get current bucket levels and queueing counters per provider/model."""
+        return {
+            row["key"]: {
+                'requests_available': round(row["requests"], 2),
+                'tokens_available': round(row["tokens"]),
+                'waits': row["waits"],
+                'waited_seconds': round(row["waited_seconds"], 1),
+                'rejected': row["rejected"],
+            }
+            for row in self.connection().execute("SELECT * FROM llm_rate_buckets ORDER BY key")
+        }
+
+    @staticmethod
+    def _rates(limit: Dict[str, float]):
+        """Refill rates per second of the request and token buckets (0 = unlimited)."""
+        return (limit.get('rpm') or 0) / 60.0, (limit.get('tpm') or 0) / 60.0
+
+    def _capacities(self, limit: Dict[str, float]):
+        """Bucket sizes: ``burst_seconds`` worth of quota (at least one request)."""
+        request_rate, token_rate = self._rates(limit)
+        return max(1.0, request_rate * self.burst_seconds), token_rate * self.burst_seconds
+
+    def _refill(self, conn, key: str, limit: Dict[str, float], now: float):
+        """Get the bucket levels of ``key`` topped up for the time elapsed."""
+        request_capacity, token_capacity = self._capacities(limit)
+        conn.execute(
+            "INSERT OR IGNORE INTO llm_rate_buckets (key, requests, tokens, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, request_capacity, token_capacity, now)
+        )
+        row = conn.execute(
+            "SELECT requests, tokens, updated_at FROM llm_rate_buckets WHERE key = ?", (key,)
+        ).fetchone()
+
+        request_rate, token_rate = self._rates(limit)
+        elapsed = max(0.0, now - row["updated_at"])
+        return (min(request_capacity, row["requests"] + elapsed * request_rate),
+                min(token_capacity, row["tokens"] + elapsed * token_rate))
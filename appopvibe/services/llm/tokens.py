@@ -0,0 +1,45 @@
+"""
+Fast local token estimates for the models we call.
+
+The estimate mimics BPE pre-tokenization: every punctuation mark is a token
+and words are cut into pieces of at most a few characters, the piece length
+depending on how large the model family's vocabulary is. It is a single
+regex scan: not exact, but close enough for budgeting and rate limiting
+without shipping a tokenizer per model.
+"""
+import re
+from typing import Optional
+
+# Longest word piece counted as one token, by model family (bigger vocabularies
+# merge longer pieces). Matched against the model name without its vendor prefix.
+WORD_PIECE_LENGTHS = (
+    ('llama-3', 7),
+    ('llama3', 7),
+    ('gpt-4o', 7),
+    ('gpt-', 6),
+    ('mistral', 5),
+    ('mixtral', 5),
+    ('gemma', 7),
+)
+DEFAULT_WORD_PIECE_LENGTH = 6
+
+_PATTERNS = {}
+
+
+def _pattern(model: Optional[str]):
+    """Get the (cached) pre-tokenization regex for a model."""
+    piece = DEFAULT_WORD_PIECE_LENGTH
+    if model:
+        name = model.rsplit('/', 1)[-1].lower()
+        piece = next((length for prefix, length in WORD_PIECE_LENGTHS if name.startswith(prefix)), piece)
+    pattern = _PATTERNS.get(piece)
+    if pattern is None:
+        pattern = _PATTERNS[piece] = re.compile(rf"\w{{1,{piece}}}|[^\w\s]")
+    return pattern
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Estimate how many tokens ``text`` takes for ``model``."""
+    if not text:
+        return 0
+    return len(_pattern(model).findall(text)) + 1
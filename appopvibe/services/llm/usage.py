@@ -0,0 +1,86 @@
+"""
+Token usage and latency of LLM calls per prompt template version.
+
+Providers report how many prompt tokens they served from their prefix
+cache; aggregating that per template version shows what a prompt layout
+change gains in latency and billed tokens. Callers can also collect the
+calls made on their behalf, e.g. to report the usage of one API request.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+# Calls recorded in the current context, when a caller is collecting them
+_collected: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar('collected_usage', default=None)
+
+
+class UsageTracker:
+    """Per-process totals of token usage and latency, keyed by template version."""
+
+    FIELDS = ('prompt_tokens', 'cached_tokens', 'completion_tokens', 'total_tokens')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def record(self, template_version: Optional[str], latency: float, usage: Dict[str, int]):
+        """Add one completed call to the totals of its template version."""
+        collected = _collected.get()
+        if collected is not None:
+            collected.append({'template_version': template_version, 'latency': latency, **usage})
+        key = template_version or "-"
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = {'calls': 0, 'latency': 0.0,
+                                              'with_usage': 0, **{f: 0 for f in self.FIELDS}}
+            totals['calls'] += 1
+            totals['latency'] += latency
+            if usage:
+                totals['with_usage'] += 1
+                for name in self.FIELDS:
+                    totals[name] += usage.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Summarize calls, average latency, token totals and prompt-cache hit ratio."""
+        with self._lock:
+            totals = {key: dict(values) for key, values in self._totals.items()}
+        summary = {}
+        for key, values in totals.items():
+            prompt_tokens = values['prompt_tokens']
+            summary[key] = {
+                'calls': values['calls'],
+                'avg_latency': round(values['latency'] / values['calls'], 3),
+                **{name: values[name] for name in self.FIELDS},
+                'cached_prompt_ratio': round(values['cached_tokens'] / prompt_tokens, 4)
+                if prompt_tokens else 0.0,
+            }
+        return summary
+
+
+@contextmanager
+def collect_usage() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the calls recorded within the block, including by tasks it starts.
+
+    Calls served from the response cache are not recorded.
+    """
+    calls: List[Dict[str, Any]] = []
+    token = _collected.set(calls)
+    try:
+        yield calls
+    finally:
+        _collected.reset(token)
+
+
+def usage_totals(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum the latency and token usage of collected calls."""
+    totals = {'llm_calls': len(calls),
+              'llm_latency': round(sum(call['latency'] for call in calls), 3)}
+    for name in UsageTracker.FIELDS:
+        totals[name] = sum(call.get(name, 0) for call in calls)
+    return totals
+
+
+# Shared tracker, one per worker process
+usage_tracker = UsageTracker()
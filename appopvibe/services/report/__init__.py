@@ -1,6 +1,9 @@
 """
 Report service module for CV Analyzer application.
 """
-from appopvibe.services.report.report_service import ReportService
+from appopvibe.services.report.report_service import ReportService, ReportSaveError
+from appopvibe.services.report.report_index import ReportIndex
+from appopvibe.services.report.blob_store import BlobStore
+from appopvibe.services.report.retention import RetentionSweeper
 
-__all__ = ['ReportService']
+__all__ = ['ReportService', 'ReportSaveError', 'ReportIndex', 'BlobStore', 'RetentionSweeper']
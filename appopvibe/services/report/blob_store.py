@@ -0,0 +1,91 @@
+"""
+Content-addressed storage of report sections.
+
+Reports repeat the same CVs and job descriptions over and over, so their
+sections (CV, JD, analysis, rewrite) are stored as blobs named by the
+SHA-256 digest of their text: each distinct text is kept once, however many
+reports use it. Blobs are compressed with zstd when the ``zstandard`` package
+is installed and gzip otherwise; the file suffix records the codec, so blobs
+written either way stay readable.
+"""
+import gzip
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+from appopvibe.utils.atomic import write_atomic
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Codec used for new blobs, then any other readable one
+CODECS = ('.zst', '.gz') if ZSTD_AVAILABLE else ('.gz',)
+
+
+def blob_digest(text: str) -> str:
+    """Digest naming the blob of a text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    """Compressed texts stored once each under their content digest."""
+
+    def __init__(self, directory, fsync: str = 'file'):
+        """Initialize the store.
+
+        Args:
+            directory: Directory of the blob files
+            fsync: fsync policy of blob writes (see appopvibe.utils.atomic)
+        """
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self.logger = logging.getLogger(__name__)
+
+    def _path(self, digest: str, codec: str) -> Path:
+        return self.directory / digest[:2] / digest[2:4] / f"{digest}{codec}"
+
+    def _find(self, digest: str) -> Optional[Path]:
+        for codec in CODECS:
+            path = self._path(digest, codec)
+            if path.is_file():
+                return path
+        return None
+
+    def put(self, text: str) -> str:
+        """Store a text unless it is already stored; returns its digest."""
+        digest = blob_digest(text)
+        if self._find(digest) is not None:
+            return digest
+
+        data = text.encode('utf-8')
+        codec = CODECS[0]
+        if codec == '.zst':
+            data = zstandard.ZstdCompressor(level=9).compress(data)
+        else:
+            data = gzip.compress(data, compresslevel=9, mtime=0)
+
+        write_atomic(self._path(digest, codec), data, self.fsync)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """Get a stored text, or None if there is no blob with this digest."""
+        path = self._find(digest)
+        if path is None:
+            return None
+        data = path.read_bytes()
+        if path.suffix == '.zst':
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError(f"Blob {digest[:12]} is zstd-compressed and zstandard is not installed")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+        return data.decode('utf-8')
+
+    def delete(self, digest: str):
+        """Delete a blob (in every codec it was stored with)."""
+        for codec in ('.zst', '.gz'):
+            self._path(digest, codec).unlink(missing_ok=True)
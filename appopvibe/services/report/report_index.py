@@ -0,0 +1,153 @@
+"""
+SQLite index of saved reports.
+
+Reports are files, but listing, lookup and retention only need their
+metadata. The index holds one row per report (id, file path, creation time,
+language, section sizes and content digests) with an index on creation
+time, so those queries no longer glob and ``stat`` the whole directory.
+Rows are written by ``ReportService.save_report`` right after the file and
+can be rebuilt from the files at any time. Reports stored as blobs also
+record which blobs they use, so a blob is deleted with the last report
+using it.
+"""
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+# Columns of an index entry, in table order
+FIELDS = ('id', 'path', 'created_at', 'language', 'size', 'analysis_size', 'rewrite_size',
+          'cv_size', 'jd_size', 'digest', 'cv_digest', 'jd_digest')
+
+
+class ReportIndex(SQLiteStore):
+    """Metadata of saved reports, ordered by creation time."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reports (
+        id TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        language TEXT,
+        size INTEGER NOT NULL,
+        analysis_size INTEGER NOT NULL DEFAULT 0,
+        rewrite_size INTEGER NOT NULL DEFAULT 0,
+        cv_size INTEGER NOT NULL DEFAULT 0,
+        jd_size INTEGER NOT NULL DEFAULT 0,
+        digest TEXT NOT NULL,
+        cv_digest TEXT,
+        jd_digest TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports(created_at);
+    CREATE TABLE IF NOT EXISTS report_blobs (
+        report_id TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        PRIMARY KEY (report_id, digest)
+    );
+    CREATE INDEX IF NOT EXISTS idx_report_blobs_digest ON report_blobs(digest);
+    """
+
+    def __init__(self, path):
+        """Initialize the index.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        super().__init__(path)
+        self.logger = logging.getLogger(__name__)
+
+    def add(self, entry: Dict[str, Any]):
+        """Add (or replace) the entry of a report."""
+        self.add_many([entry])
+
+    def add_many(self, entries: Iterable[Dict[str, Any]]):
+        """Add (or replace) several entries in one transaction.
+        
+        An entry's optional 'blobs' lists the digests of the blobs it uses.
+        """
+        entries = list(entries)
+        rows = [tuple(entry.get(name) for name in FIELDS) for entry in entries]
+        refs = [(entry['id'], digest) for entry in entries for digest in set(entry.get('blobs') or ())]
+        with self.transaction(immediate=True) as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO reports ({', '.join(FIELDS)}) "
+                f"VALUES ({', '.join('?' for _ in FIELDS)})",
+                rows
+            )
+            conn.executemany("DELETE FROM report_blobs WHERE report_id = ?",
+                             [(entry['id'],) for entry in entries])
+            conn.executemany("INSERT INTO report_blobs (report_id, digest) VALUES (?, ?)", refs)
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Get the entry of a report, or None if it is not indexed."""
+        row = self.connection().execute(
+            "SELECT * FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the newest entries first."""
+        rows = self.connection().execute(
+            "SELECT * FROM reports ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def older_than(self, cutoff: float, limit: int = 500) -> List[Dict[str, Any]]:
+        """Get up to ``limit`` of the oldest entries created before ``cutoff``."""
+        rows = self.connection().execute(
+            "SELECT * FROM reports WHERE created_at < ? ORDER BY created_at LIMIT ?",
+            (cutoff, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_paths(self, moves: Iterable[Tuple[str, str]]):
+        """Record new file paths of reports, given as (id, path) pairs."""
+        with self.transaction(immediate=True) as conn:
+            conn.executemany(
+                "UPDATE reports SET path = ? WHERE id = ?", [(path, report_id) for report_id, path in moves]
+            )
+    
+    def remove(self, report_ids: Iterable[str],
+               on_orphan: Optional[Callable[[str], None]] = None) -> int:
+        """Remove entries; returns how many existed.
+        
+        Args:
+            report_ids: Ids of the reports to remove
+            on_orphan: Called with each blob digest no report uses any more.
+                It runs inside the transaction, so a report saved meanwhile
+                cannot start using the blob before it is gone (saves store
+                their blobs again once indexed).
+        """
+        ids = [(report_id,) for report_id in report_ids]
+        with self.transaction(immediate=True) as conn:
+            digests = set()
+            for (report_id,) in ids:
+                digests.update(row[0] for row in conn.execute(
+                    "SELECT digest FROM report_blobs WHERE report_id = ?", (report_id,)
+                ))
+            removed = conn.executemany("DELETE FROM reports WHERE id = ?", ids).rowcount
+            conn.executemany("DELETE FROM report_blobs WHERE report_id = ?", ids)
+            if on_orphan is not None:
+                for digest in sorted(digests):
+                    if conn.execute("SELECT 1 FROM report_blobs WHERE digest = ? LIMIT 1",
+                                    (digest,)).fetchone() is None:
+                        on_orphan(digest)
+            return removed
+
+    def ids(self) -> List[str]:
+        """Get the ids of all indexed reports (for a rebuild)."""
+        return [row[0] for row in self.connection().execute("SELECT id FROM reports")]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number and total size of indexed reports and the oldest creation time."""
+        row = self.connection().execute(
+            "SELECT COUNT(*) AS reports, COALESCE(SUM(size), 0) AS bytes, "
+            "MIN(created_at) AS oldest FROM reports"
+        ).fetchone()
+        oldest = row["oldest"]
+        return {
+            'reports': row["reports"],
+            'bytes': row["bytes"],
+            'oldest_age_days': round((time.time() - oldest) / 86400, 1) if oldest else None,
+        }
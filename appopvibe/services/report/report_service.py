@@ -2,44 +2,135 @@
 Report service for managing CV analysis reports.
 """
 import os
+import re
+import time
+import asyncio
 import logging
 import datetime
+import functools
+import json
 import hashlib
+import secrets
 import markdown2
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List
+
+from appopvibe.services.report.blob_store import BlobStore
+from appopvibe.services.report.report_index import ReportIndex
+from appopvibe.utils.atomic import write_atomic
+from appopvibe.utils.compression import ENCODINGS, MIN_SIZE, compress
+
+# Headings of the report sections, in report order
+SECTION_HEADINGS = {
+    'analysis': "## Analysis Summary",
+    'rewritten_cv': "## Rewritten CV Optimized for ATS",
+    'cv': "## Original CV",
+    'jd': "## Original Job Description",
+}
+
+LANGUAGE_LABELS = {
+    'en': 'English',
+    'fr': 'Français'
+}
+
+# "*Language: English*", or a "## Language" section in early reports
+_LANGUAGE_LINE = re.compile(r"^(?:\*Language: (.+)\*|## Language\n(.+))$", re.MULTILINE)
+
+# Reports indexed (or migrated) per transaction when rebuilding the index
+REBUILD_BATCH = 500
+
+# Report ids are "<prefix>_<UTC time to the millisecond>_<random hex>.md", so
+# they sort by creation time and reports saved at the same moment still get
+# distinct ids. Files are sharded by the hour of that time as
+# YYYY/MM/DD/HH/<id>; older ids ("<prefix>_<UTC time to the second>.md")
+# carry the same time prefix, and reports saved before the sharded layout
+# may still sit directly in the reports directory.
+_REPORT_ID_TIME = re.compile(r"^[A-Za-z0-9-]+_(\d{4})-(\d{2})-(\d{2})T(\d{2})-[\w.-]*\.md$")
+_SHARD_GLOB = "[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/[0-9][0-9]"
+
+# Reports stored as blobs are a manifest, <id stem>.json, naming the blob of
+# each section; the other reports are a whole markdown file, <id>
+MANIFEST_SUFFIX = ".json"
+
+# Markdown rendering of reports; the version keys the pre-rendered HTML, so
+# changing the renderer or its extras makes old renderings stale
+MARKDOWN_EXTRAS = ["tables", "fenced-code-blocks", "break-on-newline"]
+RENDERER_VERSION = hashlib.sha256(
+    f"markdown2-{markdown2.__version__}|{','.join(MARKDOWN_EXTRAS)}".encode('utf-8')
+).hexdigest()[:12]
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class ReportSaveError(Exception):
+    """Raised when a report could not be written or indexed."""
 
 class ReportService:
     """Service for managing CV analysis reports."""
     
-    def __init__(self, reports_directory: str, retention_days: int = 30):
+    def __init__(self, reports_directory: str, retention_days: int = 30,
+                 index: Optional[ReportIndex] = None, blobs: Optional[BlobStore] = None,
+                 fsync: str = 'file', io_threads: int = 4):
         """Initialize the report service.
         
         Args:
             reports_directory: Directory where reports are stored
             retention_days: Number of days to retain reports
+            index: Index of report metadata (listing and retention scan the
+                directory without one)
+            blobs: Store for the sections of new reports, which are then saved
+                as a manifest of blobs instead of a whole file (needs an index,
+                which tracks the blobs in use)
+            fsync: fsync policy of report writes (see appopvibe.utils.atomic)
+            io_threads: Threads saving reports for save_report_async
         """
+        if blobs is not None and index is None:
+            raise ValueError("Storing reports as blobs needs a report index")
         self.reports_dir = Path(reports_directory)
+        self.html_dir = self.reports_dir / '.html'  # pre-rendered HTML by content digest
+        self.encoded_dir = self.reports_dir / '.encoded'  # precompressed downloads by content digest
         self.retention_days = retention_days
+        self.index = index
+        self.blobs = blobs
+        self.fsync = fsync
+        self.io_threads = io_threads
         self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._executor_pid = None
         
         # Ensure reports directory exists
         self.reports_dir.mkdir(exist_ok=True)
     
     def generate_report_filename(self, prefix: str = "report") -> str:
-        """Generate a unique report filename with timestamp.
+        """Generate a unique, time-ordered report filename.
         
         Args:
             prefix: Prefix for the filename
             
         Returns:
-            A unique filename for the report
+            A unique filename for the report (also its id)
         """
-        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H-%M-%SZ")
-        return f"{prefix}_{timestamp}.md"
+        now = datetime.datetime.now(datetime.timezone.utc)
+        timestamp = f"{now.strftime('%Y-%m-%dT%H-%M-%S')}-{now.microsecond // 1000:03d}Z"
+        return f"{prefix}_{timestamp}_{secrets.token_hex(5)}.md"
+    
+    @staticmethod
+    def storage_path(filename: str) -> str:
+        """Path of a report relative to the reports directory.
+        
+        Reports with a time-stamped id go to the shard of their hour; any
+        other name is stored directly in the reports directory.
+        """
+        match = _REPORT_ID_TIME.match(filename)
+        if not match:
+            return filename
+        return "/".join((*match.groups(), filename))
     
     def save_report(self, cv_text: str, jd_text: str, analysis_result: str, 
-                   rewritten_cv: Optional[str] = None, language: str = "en") -> str:
+                   rewritten_cv: Optional[str] = None, language: str = "en",
+                   filename: Optional[str] = None,
+                   compaction: Optional[Dict[str, Any]] = None) -> str:
         """Save analysis results as a markdown report.
         
         Args:
@@ -48,66 +139,211 @@ class ReportService:
             analysis_result: Analysis from LLM
             rewritten_cv: Rewritten CV if available
             language: Language of the content
+            filename: Filename reserved earlier with generate_report_filename (generated if None)
+            compaction: Token statistics of the input compaction, if it ran
             
         Returns:
             Filename of the saved report
+            
+        Raises:
+            ReportSaveError: If the report could not be written or indexed
         """
         # Generate filename
-        filename = self.generate_report_filename()
-        file_path = self.reports_dir / filename
+        filename = filename or self.generate_report_filename()
+        path = self.storage_path(filename)
+        file_path = self.reports_dir / path
         
         # Determine language label
-        language_labels = {
-            'en': 'English',
-            'fr': 'Français'
-        }
-        language_label = language_labels.get(language, language)
+        language_label = LANGUAGE_LABELS.get(language, language)
         
         # Create report content
-        report_content = f"""# CV Analysis Report
+        header = f"""# CV Analysis Report
 
 *Generated on: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}*
 *Language: {language_label}*
-
+{self._compaction_note(compaction)}"""
+        sections = {'analysis': analysis_result, 'rewritten_cv': rewritten_cv or '',
+                    'cv': cv_text, 'jd': jd_text}
+        report_content = self.compose_report(header, sections)
+        if self.blobs is not None:
+            path = str(Path(path).with_suffix(MANIFEST_SUFFIX))
+            file_path = self.reports_dir / path
+        
+        # Write to file (atomically: a crash never leaves a truncated report),
+        # then index it; a report that cannot be indexed is removed again so
+        # the index never misses a served report
+        try:
+            if self.blobs is None:
+                write_atomic(file_path, report_content.encode('utf-8'), self.fsync)
+            else:
+                manifest = {'header': header, 'sections': {
+                    name: self.blobs.put(text) for name, text in sections.items() if text
+                }}
+                write_atomic(file_path, json.dumps(manifest).encode('utf-8'), self.fsync)
+            if self.index is not None:
+                try:
+                    self.index.add(self._index_entry(filename, path, report_content, time.time(), language,
+                                                     sections, self._manifest_blobs(manifest)
+                                                     if self.blobs is not None else None))
+                except Exception:
+                    file_path.unlink(missing_ok=True)
+                    raise
+            if self.blobs is not None:
+                # Store the blobs again in case retention deleted one this
+                # report reuses before the index recorded it
+                for text in sections.values():
+                    if text:
+                        self.blobs.put(text)
+            self.logger.info(f"Report saved as {filename}")
+        except Exception as e:
+            self.logger.error(f"Error saving report {filename}: {e}")
+            raise ReportSaveError(f"Report {filename} could not be saved: {e}") from e
+        
+        # Render the HTML once now rather than on every request, and compress
+        # whole-file reports for download (requests backfill them if this
+        # fails; reports stored as blobs are compressed on their first
+        # compressed download, so they keep no whole copy)
+        digest = _digest(report_content)
+        self._store_html(digest, report_content)
+        data = report_content.encode('utf-8')
+        if self.blobs is None and len(data) >= MIN_SIZE:
+            for encoding in ENCODINGS:
+                self._store_encoded(digest, data, encoding)
+        return filename
+    
+    async def save_report_async(self, *args, **kwargs) -> str:
+        """Save a report on the I/O threads, without blocking the event loop.
+        
+        Takes the arguments of save_report; at most ``io_threads`` reports
+        are written at once per process, the others wait their turn.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._io_executor(), functools.partial(self.save_report, *args, **kwargs)
+        )
+    
+    def _io_executor(self) -> ThreadPoolExecutor:
+        """This process's report writer threads (workers forked later get their own)."""
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.io_threads,
+                                                thread_name_prefix="report-io")
+            self._executor_pid = os.getpid()
+        return self._executor
+    
+    @staticmethod
+    def compose_report(header: str, sections: Dict[str, str]) -> str:
+        """Assemble a report's markdown from its header and sections."""
+        parts = [f"""{header}
 ## Analysis Summary
 
-{analysis_result}
+{sections.get('analysis', '')}
 
-"""
+"""]
         
         # Add rewritten CV if available
-        if rewritten_cv:
-            report_content += f"""
+        if sections.get('rewritten_cv'):
+            parts.append(f"""
 ## Rewritten CV Optimized for ATS
 
-{rewritten_cv}
+{sections['rewritten_cv']}
 
-"""
+""")
         
         # Add original content sections
-        report_content += f"""
+        parts.append(f"""
 ## Original CV
 
 ```
-{cv_text}
+{sections.get('cv', '')}
 ```
 
 ## Original Job Description
 
 ```
-{jd_text}
+{sections.get('jd', '')}
 ```
-"""
+""")
+        return "".join(parts)
+    
+    @staticmethod
+    def _manifest_blobs(manifest: Dict[str, Any]) -> List[str]:
+        """Digests of the blobs a manifest uses."""
+        return list(manifest['sections'].values())
+    
+    def _load_manifest(self, file_path: Path) -> Dict[str, Any]:
+        """Read a report manifest and the sections it names.
         
-        # Write to file
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(report_content)
-            self.logger.info(f"Report saved as {filename}")
-            return filename
-        except Exception as e:
-            self.logger.error(f"Error saving report: {e}")
+        Returns:
+            The manifest, with the text of each section under 'texts'
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        texts = {}
+        for name, digest in manifest['sections'].items():
+            text = self.blobs.get(digest) if self.blobs is not None else None
+            if text is None:
+                raise FileNotFoundError(f"blob {digest[:12]} of {file_path.name} is missing")
+            texts[name] = text
+        manifest['texts'] = texts
+        return manifest
+    
+    @staticmethod
+    def _index_entry(filename: str, path: str, content: str, created_at: float,
+                     language: Optional[str], sections: Dict[str, str],
+                     blobs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the index entry of a report."""
+        size = lambda name: len(sections.get(name, '').encode('utf-8'))
+        return {
+            'id': filename,
+            'path': path,
+            'created_at': created_at,
+            'language': language,
+            'size': len(content.encode('utf-8')),
+            'analysis_size': size('analysis'),
+            'rewrite_size': size('rewritten_cv'),
+            'cv_size': size('cv'),
+            'jd_size': size('jd'),
+            'digest': _digest(content),
+            'cv_digest': _digest(sections['cv']) if 'cv' in sections else None,
+            'jd_digest': _digest(sections['jd']) if 'jd' in sections else None,
+            'blobs': blobs,
+        }
+    
+    @staticmethod
+    def parse_report(content: str) -> Dict[str, Any]:
+        """Split a saved report back into its sections.
+        
+        Returns:
+            The 'language' code (None if unknown) and the text of each
+            section found under its SECTION_HEADINGS key
+        """
+        positions = sorted(
+            (content.find(f"\n{heading}\n"), name, heading)
+            for name, heading in SECTION_HEADINGS.items() if f"\n{heading}\n" in content
+        )
+        sections = {}
+        for i, (start, name, heading) in enumerate(positions):
+            end = positions[i + 1][0] if i + 1 < len(positions) else len(content)
+            text = content[start + len(heading) + 2:end].strip()
+            if name in ('cv', 'jd') and text.startswith("```") and text.endswith("```"):
+                text = text[3:-3].strip("\n")
+            sections[name] = text
+        
+        match = _LANGUAGE_LINE.search(content)
+        labels = {label: code for code, label in LANGUAGE_LABELS.items()}
+        label = (match.group(1) or match.group(2)).strip() if match else None
+        language = labels.get(label, label)
+        return {'language': language, 'sections': sections}
+    
+    @staticmethod
+    def _compaction_note(compaction: Optional[Dict[str, Any]]) -> str:
+        """Header line recording the input tokens sent and saved."""
+        if not compaction:
             return ""
+        note = (f"*Input tokens: ~{compaction['tokens_after']} "
+                f"(~{compaction['tokens_saved']} saved by compaction)*\n")
+        if compaction.get('truncated'):
+            note += "*Inputs were shortened to fit the model's token budget.*\n"
+        return note
     
     def get_report(self, filename: str) -> Optional[str]:
         """Get the contents of a report.
@@ -118,13 +354,16 @@ class ReportService:
         Returns:
             The report content or None if not found
         """
-        file_path = self.reports_dir / filename
+        file_path = self._locate(filename)
         
-        if not file_path.exists():
+        if file_path is None:
             self.logger.warning(f"Report not found: {filename}")
             return None
             
         try:
+            if file_path.suffix == MANIFEST_SUFFIX:
+                manifest = self._load_manifest(file_path)
+                return self.compose_report(manifest['header'], manifest['texts'])
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             return content
@@ -135,27 +374,161 @@ class ReportService:
     def get_report_html(self, filename: str) -> Optional[str]:
         """Get report content as HTML.
         
+        The HTML is rendered when the report is saved and stored next to it,
+        keyed by the report's content digest and the renderer version; reports
+        without a rendering (older ones) are rendered on their first view.
+        
         Args:
             filename: Name of the report file
             
         Returns:
             HTML content or None if not found
         """
+        entry = self.get_report_info(filename)
+        if entry is not None:
+            html_content = self._load_html(entry['digest'])
+            if html_content is not None:
+                return html_content
+        
         markdown_content = self.get_report(filename)
         
         if not markdown_content:
             return None
-            
+        
+        digest = _digest(markdown_content)
+        html_content = self._load_html(digest) if entry is None else None
+        if html_content is None:
+            html_content = self._store_html(digest, markdown_content)
+        return html_content
+    
+    @staticmethod
+    def render_html(markdown_content: str) -> str:
+        """Convert report markdown to HTML."""
+        return markdown2.markdown(markdown_content, extras=MARKDOWN_EXTRAS)
+    
+    def _html_path(self, digest: str) -> Path:
+        """Path of the pre-rendered HTML of a report with the given content digest."""
+        return self.html_dir / digest[:2] / f"{digest}.{RENDERER_VERSION}.html"
+    
+    def _load_html(self, digest: str) -> Optional[str]:
+        """Read a pre-rendered report, or return None if there is none yet."""
         try:
-            # Convert markdown to HTML
-            html_content = markdown2.markdown(
-                markdown_content,
-                extras=["tables", "fenced-code-blocks", "break-on-newline"]
-            )
-            return html_content
+            return self._html_path(digest).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Error reading rendered report {digest[:12]}: {e}")
+            return None
+    
+    def _store_html(self, digest: str, markdown_content: str) -> Optional[str]:
+        """Render a report and store the HTML; returns it (None if rendering failed)."""
+        try:
+            html_content = self.render_html(markdown_content)
         except Exception as e:
             self.logger.error(f"Error converting report to HTML: {e}")
             return None
+        
+        try:
+            self._write_artifact(self._html_path(digest), html_content.encode('utf-8'))
+        except Exception as e:
+            self.logger.warning(f"Could not store rendered report {digest[:12]}: {e}")
+        return html_content
+    
+    def report_path(self, filename: str) -> Optional[Path]:
+        """Path of a report stored as a whole markdown file, or None.
+        
+        None also means the report is stored as blobs (see get_report).
+        """
+        path = self._locate(filename)
+        return path if path is not None and path.suffix != MANIFEST_SUFFIX else None
+    
+    def _locate(self, filename: str) -> Optional[Path]:
+        """Path of a report's file or manifest, or None if it does not exist.
+        
+        The indexed path is tried first, then the report's shard and the
+        reports directory itself (reports not yet migrated to shards).
+        """
+        entry = self.get_report_info(filename)
+        path = self.storage_path(filename)
+        candidates = dict.fromkeys([
+            entry['path'] if entry else None, path,
+            str(Path(path).with_suffix(MANIFEST_SUFFIX)) if self.blobs is not None else None,
+            filename
+        ])
+        for candidate in candidates:
+            if candidate is None:
+                continue
+            path = self.reports_dir / candidate
+            if path.is_file():
+                return path
+        return None
+    
+    def _report_files(self) -> Iterator[Path]:
+        """Report files and manifests: in shards, then unmigrated ones at the top level."""
+        yield from self.reports_dir.glob(f"{_SHARD_GLOB}/*.md")
+        yield from self.reports_dir.glob(f"{_SHARD_GLOB}/*{MANIFEST_SUFFIX}")
+        yield from self.reports_dir.glob("*.md")
+        yield from self.reports_dir.glob(f"*{MANIFEST_SUFFIX}")
+    
+    @staticmethod
+    def _report_id(file_path: Path) -> str:
+        """Id of the report stored in a file or manifest."""
+        return file_path.stem + ".md" if file_path.suffix == MANIFEST_SUFFIX else file_path.name
+    
+    def encoded_report_path(self, filename: str, encoding: str) -> Optional[Path]:
+        """Path of a report compressed with ``encoding``, compressing it now if needed.
+        
+        Returns:
+            The path, or None if the report does not exist or is too small
+            to be worth compressing
+        """
+        entry = self.get_report_info(filename)
+        if entry is not None and entry['size'] < MIN_SIZE:
+            return None
+        if entry is not None:
+            path = self._encoded_path(entry['digest'], encoding)
+            if path.is_file():
+                return path
+        
+        source = self.report_path(filename)
+        if source is not None:
+            data = source.read_bytes()
+        else:
+            content = self.get_report(filename)  # stored as blobs
+            if content is None:
+                return None
+            data = content.encode('utf-8')
+        if len(data) < MIN_SIZE:
+            return None
+        return self._store_encoded(hashlib.sha256(data).hexdigest(), data, encoding)
+    
+    def _encoded_path(self, digest: str, encoding: str) -> Path:
+        """Path of the precompressed download of a report with the given content digest."""
+        return self.encoded_dir / digest[:2] / f"{digest}.md{ENCODINGS[encoding]}"
+    
+    def _store_encoded(self, digest: str, data: bytes, encoding: str) -> Optional[Path]:
+        """Compress a report for download; returns the path (None if it failed)."""
+        path = self._encoded_path(digest, encoding)
+        if path.is_file():
+            return path
+        try:
+            self._write_artifact(path, compress(data, encoding, best=True))
+            return path
+        except Exception as e:
+            self.logger.warning(f"Could not store {encoding} report {digest[:12]}: {e}")
+            return None
+    
+    @staticmethod
+    def _write_artifact(path: Path, data: bytes):
+        """Write a derived file atomically (without fsync: it can be recreated)."""
+        write_atomic(path, data, fsync='none')
+    
+    def _remove_artifacts(self, digest: str):
+        """Remove the renderings (of any renderer version) and compressed copies of a report."""
+        for path in (self.html_dir / digest[:2]).glob(f"{digest}.*.html"):
+            path.unlink(missing_ok=True)
+        for path in (self.encoded_dir / digest[:2]).glob(f"{digest}.md.*"):
+            path.unlink(missing_ok=True)
     
     def list_reports(self, limit: int = 100) -> List[Dict[str, Any]]:
         """List available reports.
@@ -166,12 +539,24 @@ class ReportService:
         Returns:
             List of report metadata dictionaries
         """
+        if self.index is not None:
+            try:
+                return [{
+                    'filename': entry['id'],
+                    'created': datetime.datetime.fromtimestamp(entry['created_at']),
+                    'size': entry['size'],
+                    'language': entry['language'],
+                } for entry in self.index.recent(limit)]
+            except Exception as e:
+                self.logger.error(f"Error listing reports: {e}")
+                return []
+        
         reports = []
         
         try:
             # Get all markdown files in the reports directory
             report_files = sorted(
-                self.reports_dir.glob("*.md"),
+                self._report_files(),
                 key=lambda x: x.stat().st_mtime,
                 reverse=True
             )
@@ -184,7 +569,7 @@ class ReportService:
                 
                 # Add to reports list
                 reports.append({
-                    'filename': file_path.name,
+                    'filename': self._report_id(file_path),
                     'created': created_time,
                     'size': stats.st_size
                 })
@@ -200,18 +585,22 @@ class ReportService:
         Returns:
             Number of reports removed
         """
+        if self.index is not None:
+            return self._cleanup_indexed()
+        
         now = datetime.datetime.now()
         retention_cutoff = now - datetime.timedelta(days=self.retention_days)
         removed_count = 0
         
         try:
-            for file_path in self.reports_dir.glob("*.md"):
+            for file_path in self._report_files():
                 # Get file modification time
                 mod_time = datetime.datetime.fromtimestamp(file_path.stat().st_mtime)
                 
                 # Check if older than retention period
                 if mod_time < retention_cutoff:
                     file_path.unlink()
+                    self._prune_dirs([file_path.parent])
                     removed_count += 1
                     
             self.logger.info(f"Removed {removed_count} old reports")
@@ -219,3 +608,146 @@ class ReportService:
         except Exception as e:
             self.logger.error(f"Error during report cleanup: {e}")
             return 0
+    
+    def _cleanup_indexed(self, batch_size: int = 500) -> int:
+        """Remove expired reports found through the index, oldest first."""
+        removed_count = 0
+        
+        try:
+            while True:
+                removed = self.remove_expired(batch_size)['removed']
+                if not removed:
+                    break
+                removed_count += removed
+            
+            self.logger.info(f"Removed {removed_count} old reports")
+            return removed_count
+        except Exception as e:
+            self.logger.error(f"Error during report cleanup: {e}")
+            return removed_count
+    
+    def remove_expired(self, limit: int = 500) -> Dict[str, int]:
+        """Remove up to ``limit`` of the oldest expired reports, through the index.
+        
+        Removing a report also removes its rendering, its compressed copies
+        and the shard directories it leaves empty. Batches may run in several
+        processes at once: a report removed by another one is not counted.
+        
+        Returns:
+            Counts of reports 'removed' and of the 'bytes' they held
+        """
+        if self.index is None:
+            raise RuntimeError("The report service has no index")
+        
+        expired = self.index.older_than(time.time() - self.retention_days * 86400, limit)
+        if not expired:
+            return {'removed': 0, 'bytes': 0}
+        for entry in expired:
+            (self.reports_dir / entry['path']).unlink(missing_ok=True)
+            self._remove_artifacts(entry['digest'])
+        removed = self.index.remove((entry['id'] for entry in expired),
+                                    on_orphan=self.blobs.delete if self.blobs is not None else None)
+        self._prune_dirs({(self.reports_dir / entry['path']).parent for entry in expired})
+        return {'removed': removed, 'bytes': sum(entry['size'] for entry in expired)}
+    
+    def _prune_dirs(self, directories):
+        """Remove shard directories left empty, up to the reports directory."""
+        for directory in sorted(directories, key=lambda path: len(path.parts), reverse=True):
+            while directory != self.reports_dir and self.reports_dir in directory.parents:
+                try:
+                    directory.rmdir()
+                except OSError:
+                    break  # not empty (or already gone)
+                directory = directory.parent
+    
+    def get_report_info(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Get the index entry of a report (None if unknown or without an index)."""
+        if self.index is None:
+            return None
+        return self.index.get(report_id)
+    
+    def rebuild_index(self) -> Dict[str, int]:
+        """Recreate the index entries of all report files.
+        
+        Reports found on disk (whole files and manifests) are (re)indexed
+        with their file modification time as creation time, and entries
+        whose file is gone are dropped.
+        
+        Returns:
+            Counts of 'indexed' reports and 'removed' stale entries
+        """
+        if self.index is None:
+            raise RuntimeError("The report service has no index")
+        
+        found = set()
+        batch = []
+        for file_path in self._report_files():
+            report_id = self._report_id(file_path)
+            if report_id in found:
+                continue  # an unmigrated copy of a report already in its shard
+            blobs = None
+            try:
+                created_at = file_path.stat().st_mtime
+                if file_path.suffix == MANIFEST_SUFFIX:
+                    manifest = self._load_manifest(file_path)
+                    content = self.compose_report(manifest['header'], manifest['texts'])
+                    blobs = self._manifest_blobs(manifest)
+                else:
+                    content = file_path.read_text(encoding='utf-8')
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.warning(f"Skipping unreadable report {file_path.name}: {e}")
+                continue
+            parsed = self.parse_report(content)
+            sections = manifest['texts'] if blobs is not None else parsed['sections']
+            batch.append(self._index_entry(report_id, file_path.relative_to(self.reports_dir).as_posix(),
+                                           content, created_at, parsed['language'], sections, blobs))
+            found.add(report_id)
+            if len(batch) >= REBUILD_BATCH:
+                self.index.add_many(batch)
+                batch = []
+        if batch:
+            self.index.add_many(batch)
+        
+        stale = [report_id for report_id in self.index.ids() if report_id not in found]
+        removed = self.index.remove(
+            stale, on_orphan=self.blobs.delete if self.blobs is not None else None
+        ) if stale else 0
+        self.logger.info(f"Report index rebuilt: {len(found)} reports, {removed} stale entries removed")
+        return {'indexed': len(found), 'removed': removed}
+    
+    def migrate_reports(self) -> Dict[str, int]:
+        """Move reports stored directly in the reports directory to their shards.
+        
+        Report ids do not change, so links and sessions keep working; index
+        entries are updated in batches as files move. Reports whose name
+        carries no time stay where they are.
+        
+        Returns:
+            Counts of 'moved' reports and 'skipped' ones
+        """
+        moved = skipped = 0
+        batch = []
+        with os.scandir(self.reports_dir) as entries:
+            for entry in entries:
+                if not (entry.name.endswith(".md") and entry.is_file()):
+                    continue
+                path = self.storage_path(entry.name)
+                if path == entry.name:
+                    skipped += 1
+                    continue
+                target = self.reports_dir / path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(entry.path, target)
+                batch.append((entry.name, path))
+                moved += 1
+                if len(batch) >= REBUILD_BATCH:
+                    self._update_paths(batch)
+                    batch = []
+        if batch:
+            self._update_paths(batch)
+        self.logger.info(f"Migrated {moved} reports to shards, {skipped} left in place")
+        return {'moved': moved, 'skipped': skipped}
+    
+    def _update_paths(self, moves):
+        if self.index is not None:
+            self.index.set_paths(moves)
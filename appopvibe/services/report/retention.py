@@ -0,0 +1,272 @@
+"""
+Background retention of reports and feedback.
+
+The sweeper deletes expired reports through the report index, oldest first,
+and expired feedback by whole day directories, in bounded batches paced to
+a maximum number of deletions per second so its disk I/O never competes
+with requests. It runs on a daemon thread in each web worker (or in the
+foreground with ``flask sweep-retention``); workers share a lease in SQLite
+so only one of them sweeps at a time and the others skip their turn. Each
+sweep is recorded with what it removed and how long it took.
+"""
+import os
+import re
+import time
+import random
+import socket
+import logging
+import datetime
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from appopvibe.utils.sqlite import SQLiteStore
+
+# Feedback files are stored by UTC day: feedback/YYYY/MM/DD/<file>
+FEEDBACK_SHARD_FORMAT = "%Y/%m/%d"
+
+# Feedback saved before the day shards: feedback_<UTC time>_<email>.md
+_FLAT_FEEDBACK = re.compile(r"^feedback_(\d{4})-(\d{2})-(\d{2})T.*\.md$")
+
+
+class RetentionSweeper(SQLiteStore):
+    """Deletes expired reports and feedback in paced batches, one worker at a time."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS retention_lease (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS retention_sweeps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        owner TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        duration REAL NOT NULL,
+        reports INTEGER NOT NULL,
+        report_bytes INTEGER NOT NULL,
+        feedback INTEGER NOT NULL,
+        complete INTEGER NOT NULL,
+        error TEXT
+    );
+    """
+
+    # Sweeps kept in the history
+    HISTORY = 100
+
+    def __init__(self, path, report_service, feedback_dir, feedback_retention_days: int = 90,
+                 batch_size: int = 200, max_deletes_per_second: float = 50.0,
+                 interval: float = 3600.0, max_sweep_seconds: float = 300.0):
+        """Initialize the sweeper.
+
+        Args:
+            path: Path of the SQLite database file (lease and sweep history)
+            report_service: Report service whose expired reports are removed
+            feedback_dir: Directory of the feedback files
+            feedback_retention_days: Number of days to retain feedback
+            batch_size: Items deleted per batch (and per index transaction)
+            max_deletes_per_second: Pace of deletions
+            interval: Seconds between sweeps
+            max_sweep_seconds: Time after which a sweep stops and leaves the
+                rest to the next one
+        """
+        super().__init__(path)
+        self.report_service = report_service
+        self.feedback_dir = Path(feedback_dir)
+        self.feedback_retention_days = feedback_retention_days
+        self.batch_size = batch_size
+        self.max_deletes_per_second = max_deletes_per_second
+        self.interval = interval
+        self.max_sweep_seconds = max_sweep_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start sweeping on a daemon thread (once per process)."""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Retention sweeper {self.owner} started, every {self.interval:.0f}s")
+
+    def run_forever(self):
+        """Sweep in the foreground until interrupted (for a dedicated process)."""
+        try:
+            while True:
+                self.sweep()
+                if self._stop.wait(self.interval):
+                    break
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self):
+        """Stop sweeping; a sweep in progress ends after its current batch."""
+        self._stop.set()
+
+    def _run(self):
+        # Workers start together: spread their first attempts
+        if self._stop.wait(random.uniform(0, min(self.interval, 60))):
+            return
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                self.logger.error(f"Retention sweep failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def sweep(self) -> Optional[Dict[str, Any]]:
+        """Delete expired reports and feedback.
+
+        Returns:
+            What the sweep removed and how long it took, or None if another
+            process holds the lease
+        """
+        if not self._claim():
+            return None
+
+        started = time.time()
+        deadline = time.monotonic() + self.max_sweep_seconds
+        result = {'reports': 0, 'report_bytes': 0, 'feedback': 0, 'complete': False, 'error': None}
+        try:
+            result['complete'] = (self._sweep_reports(result, deadline)
+                                  and self._sweep_feedback(result, deadline))
+        except Exception as e:
+            result['error'] = str(e)
+            self.logger.error(f"Retention sweep stopped: {e}")
+        finally:
+            result['duration'] = round(time.time() - started, 3)
+            self._record(started, result)
+            self._release()
+
+        self.logger.info(
+            f"Retention sweep removed {result['reports']} reports ({result['report_bytes']} bytes) "
+            f"and {result['feedback']} feedback files in {result['duration']}s"
+            + ("" if result['complete'] else " (more left for the next sweep)")
+        )
+        return result
+
+    def _sweep_reports(self, result: Dict[str, Any], deadline: float) -> bool:
+        """Remove expired reports batch by batch; returns whether none are left."""
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            batch_started = time.monotonic()
+            batch = self.report_service.remove_expired(self.batch_size)
+            if not batch['removed']:
+                return True
+            result['reports'] += batch['removed']
+            result['report_bytes'] += batch['bytes']
+            self._pace(batch['removed'], batch_started)
+        return False
+
+    def _sweep_feedback(self, result: Dict[str, Any], deadline: float) -> bool:
+        """Remove expired feedback, whole days at a time; returns whether none is left."""
+        if not self.feedback_dir.is_dir():
+            return True
+        cutoff = (datetime.datetime.now(datetime.timezone.utc)
+                  - datetime.timedelta(days=self.feedback_retention_days)).date()
+
+        # Feedback saved before the day shards
+        expired = []
+        with os.scandir(self.feedback_dir) as entries:
+            for entry in entries:
+                match = _FLAT_FEEDBACK.match(entry.name)
+                if match and datetime.date(*map(int, match.groups())) < cutoff:
+                    expired.append(Path(entry.path))
+        if not self._delete(expired, result, deadline):
+            return False
+
+        # Day shards, oldest first, up to the first one still retained
+        for day_dir in sorted(self.feedback_dir.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]")):
+            try:
+                day = datetime.datetime.strptime(
+                    day_dir.relative_to(self.feedback_dir).as_posix(), FEEDBACK_SHARD_FORMAT
+                ).date()
+            except ValueError:
+                continue
+            if day >= cutoff:
+                break
+            if not self._delete(list(day_dir.iterdir()), result, deadline):
+                return False
+            for directory in (day_dir, day_dir.parent, day_dir.parent.parent):
+                try:
+                    directory.rmdir()
+                except OSError:
+                    break  # not empty
+        return True
+
+    def _delete(self, paths, result: Dict[str, Any], deadline: float) -> bool:
+        """Delete feedback files in paced batches; returns whether all were deleted."""
+        for start in range(0, len(paths), self.batch_size):
+            if self._stop.is_set() or time.monotonic() >= deadline:
+                return False
+            batch_started = time.monotonic()
+            batch = paths[start:start + self.batch_size]
+            for path in batch:
+                path.unlink(missing_ok=True)
+            result['feedback'] += len(batch)
+            self._pace(len(batch), batch_started)
+        return True
+
+    def _pace(self, deleted: int, batch_started: float):
+        """Wait out the rest of the time a batch may take at the deletion rate."""
+        remaining = deleted / self.max_deletes_per_second - (time.monotonic() - batch_started)
+        if remaining > 0:
+            self._stop.wait(remaining)
+        # Keep the lease while the sweep goes on
+        self._claim()
+
+    def _claim(self) -> bool:
+        """Take (or extend) the sweep lease unless another live process holds it."""
+        now = time.time()
+        expires_at = now + self.max_sweep_seconds + 60
+        with self.transaction(immediate=True) as conn:
+            row = conn.execute("SELECT owner, expires_at FROM retention_lease WHERE id = 1").fetchone()
+            if row and row['owner'] != self.owner and row['expires_at'] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO retention_lease (id, owner, expires_at) VALUES (1, ?, ?)",
+                (self.owner, expires_at)
+            )
+        return True
+
+    def _release(self):
+        with self.transaction(immediate=True) as conn:
+            conn.execute("DELETE FROM retention_lease WHERE id = 1 AND owner = ?", (self.owner,))
+
+    def _record(self, started: float, result: Dict[str, Any]):
+        """Add a sweep to the history, dropping the oldest entries."""
+        with self.transaction(immediate=True) as conn:
+            conn.execute(
+                """INSERT INTO retention_sweeps (owner, started_at, duration, reports, report_bytes,
+                                                 feedback, complete, error)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self.owner, started, result['duration'], result['reports'], result['report_bytes'],
+                 result['feedback'], int(result['complete']), result['error'])
+            )
+            conn.execute(
+                "DELETE FROM retention_sweeps WHERE id <= (SELECT MAX(id) FROM retention_sweeps) - ?",
+                (self.HISTORY,)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the last sweep and the totals removed by the recorded sweeps."""
+        conn = self.connection()
+        last = conn.execute("SELECT * FROM retention_sweeps ORDER BY id DESC LIMIT 1").fetchone()
+        totals = conn.execute(
+            "SELECT COUNT(*) AS sweeps, COALESCE(SUM(reports), 0) AS reports, "
+            "COALESCE(SUM(report_bytes), 0) AS report_bytes, COALESCE(SUM(feedback), 0) AS feedback "
+            "FROM retention_sweeps"
+        ).fetchone()
+        lease = conn.execute("SELECT owner FROM retention_lease WHERE id = 1 AND expires_at > ?",
+                             (time.time(),)).fetchone()
+        return {
+            'last_sweep': dict(last) if last else None,
+            'recent_totals': dict(totals),
+            'sweeping': lease['owner'] if lease else None,
+        }
@@ -0,0 +1,51 @@
+"""
+Atomic file writes.
+
+Data is written to a temporary file next to its destination and renamed
+over it, so readers see either the old file or the complete new one, never
+a partial write. How durable the result is after a crash depends on the
+fsync policy:
+
+- ``'none'``: no fsync; a crash may lose the file (fine for derived data)
+- ``'file'``: fsync the data before the rename, so a file that exists after
+  a crash is complete
+- ``'full'``: also fsync the directory after the rename, so the new file
+  itself survives a crash
+"""
+import os
+import uuid
+from pathlib import Path
+
+FSYNC_POLICIES = ('none', 'file', 'full')
+
+
+def write_atomic(path, data: bytes, fsync: str = 'file'):
+    """Write ``data`` to ``path`` atomically, creating its directory if needed.
+
+    Args:
+        path: Destination file
+        data: Content of the file
+        fsync: One of FSYNC_POLICIES
+    """
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy: {fsync}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if fsync != 'none':
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    if fsync == 'full':
+        fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
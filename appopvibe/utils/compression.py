@@ -0,0 +1,52 @@
+"""
+Content encodings for HTTP responses.
+
+gzip is always available; brotli is preferred when the ``brotli`` package is
+installed. Output is deterministic (no timestamps), so each encoding of a
+body has a stable strong ETag.
+"""
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Supported encodings in order of preference, with their file suffixes
+ENCODINGS = {'br': '.br', 'gzip': '.gz'} if BROTLI_AVAILABLE else {'gzip': '.gz'}
+
+# Bodies smaller than this are not worth compressing
+MIN_SIZE = 1024
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress ``data`` with an encoding from ENCODINGS.
+
+    Args:
+        data: Body to compress
+        encoding: 'br' or 'gzip'
+        best: Favor size over speed (for bodies compressed once and stored)
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    if encoding == 'br' and BROTLI_AVAILABLE:
+        return brotli.compress(data, quality=9 if best else 5)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def negotiate(accept_encodings) -> Optional[str]:
+    """Pick the preferred supported encoding a client accepts.
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header
+            (``request.accept_encodings``)
+
+    Returns:
+        The encoding, or None to send the body as it is
+    """
+    for encoding in ENCODINGS:
+        if accept_encodings[encoding]:
+            return encoding
+    return None
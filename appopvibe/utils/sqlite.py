@@ -0,0 +1,73 @@
+"""
+SQLite helpers for state shared between worker processes.
+
+Each thread (and each forked worker) gets its own connection; the database
+runs in WAL mode so readers never block the single writer.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+class SQLiteStore:
+    """Base class for small SQLite-backed stores shared across workers."""
+
+    # DDL executed once per process when the first connection is opened
+    SCHEMA = ""
+
+    def __init__(self, path, timeout: float = 30.0):
+        """Initialize the store.
+
+        Args:
+            path: Path of the SQLite database file
+            timeout: Seconds to wait for a lock held by another process
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_pid = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it if needed."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(str(self.path), timeout=self.timeout,
+                               isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+
+        if self._schema_pid != os.getpid():
+            with self._schema_lock:
+                if self._schema_pid != os.getpid():
+                    conn.executescript(self.SCHEMA)
+                    self._schema_pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """Run a block in a transaction, committing on success.
+
+        Args:
+            immediate: Take the write lock up front (for read-modify-write blocks)
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
@@ -0,0 +1,14 @@
+"""
+CV Analyzer - ASGI Entry Point
+
+Serves the same application as app.py from an ASGI server's event loop, so
+an analysis waiting on the LLM no longer holds a worker:
+
+    gunicorn -c gunicorn_asgi.conf.py asgi:app
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+from app import app as flask_app
+from appopvibe.asgi import ASGIApp
+
+# Create the ASGI application instance
+app = ASGIApp(flask_app)
@@ -0,0 +1,18 @@
+"""
+Gunicorn settings for the ASGI entry point (asgi.py).
+
+    gunicorn -c gunicorn_asgi.conf.py asgi:app
+
+Each uvicorn worker runs one event loop that keeps hundreds of analyses in
+flight, so a few workers per host are enough.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Analyses no longer block the worker, but keep the WSGI timeout so a stuck
+# event loop is still restarted
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
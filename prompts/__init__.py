@@ -0,0 +1,7 @@
+"""
+Prompt templates for CV Analyzer.
+
+Each ``prompts_<language>`` module defines ``FULL_ANALYSIS_PROMPT_TEMPLATE_<LANGUAGE>``
+and ``CV_REWRITE_PROMPT_TEMPLATE_<LANGUAGE>``; templates use ``{cv}`` and ``{jd}``
+placeholders and are loaded by the analyzer's template registry.
+"""
@@ -2,82 +2,144 @@
 English prompts for CV Analyzer
 """
 
-FULL_ANALYSIS_PROMPT_TEMPLATE_EN = """
-You are a senior technical recruiter. Analyze the following CV against the provided job description.
-
-CV:
-```
-{cv}
-```
-
-Job Description:
-```
-{jd}
-```
-
-**Instructions:**  
-Provide your analysis in clear Markdown using the following structure and section headings. Be concise, direct, and actionable.
+# Instructions and output structure shared by the analysis templates
+_ANALYSIS_INSTRUCTIONS_EN = """**Instructions:**
+1. Your **SOLE TASK** is to perform the analysis and output it in the specified Markdown format.
+2. **ABSOLUTELY NO** conversational text, introductions, or explanations before or after the analysis output.
+3. **ABSOLUTELY NO** JSON, dictionary structures, code blocks, or any other wrapping around the analysis content.
+4. **ABSOLUTELY DO NOT** include the original CV or Job Description in the output.
+5. **ABSOLUTELY DO NOT** generate a rewritten version of the CV.
+6. Produce your analysis strictly using the Markdown structure provided in the "OUTPUT STRUCTURE" section below.
 
 ---
+**OUTPUT STRUCTURE:**
+(Your output MUST begin EXACTLY with the first required Markdown heading: '## 1. Overall Match Score'. There should be NOTHING before it.)
 
 ## 1. Overall Match Score
 - Give a percentage score (0–100%) for how well the CV matches the job requirements.
 - Briefly justify your score in 2–3 sentences.
 
 ## 2. Keyword Analysis
-- **Matched Keywords:** List key skills, technologies, or qualifications from the job description that are present in the CV.
-- **Missing Keywords:** List important keywords or requirements from the job description that are not found in the CV.
+- **DO NOT WRITE THIS SECTION.** It is computed separately (see the "Keyword Analysis" given with the CV and job description) and inserted automatically. Go straight from section 1 to section 3, using the missing keywords as a starting point for the skill gap analysis.
 
 ## 3. Skill Gap Analysis
-- Identify specific skills, experiences, or qualifications required by the job but missing or weak in the CV.
+- Identify specific skills, experiences, or qualifications required by the job but missing or weak in the CV, based on the job description, beyond just individual keywords.
 
 ## 4. Section-by-Section Suggestions
-- **Summary/Profile:** Suggest improvements for the summary/profile section.
-- **Experience:** Recommend ways to rephrase or add experience bullet points to better fit the job.
-- **Skills:** Advise on additions or changes to the skills section.
-- **Education/Other:** Suggest any relevant improvements for education or other sections.
+- Provide specific, actionable suggestions for improving *each* of the following CV sections to better match the job. Suggest how content could be rephrased or what type of relevant information should be added based on the job description requirements:
+    - **Summary/Profile:** Suggestions for this section.
+    - **Experience:** Recommendations for improving bullet points.
+    - **Skills:** Advice on additions or changes.
+    - **Education/Other:** Suggest any relevant improvements for education or other sections.
 
 ## 5. Strengths
-- Summarize the main strengths of the candidate for this role.
+- Summarize the main strengths of the candidate *specifically* for this role, based on the job description.
 
 ## 6. Weaknesses & Improvement Areas
-- Summarize the main weaknesses or areas for improvement, beyond just missing keywords.
+- Summarize the main weaknesses or areas for improvement, based on the job description, going beyond just missing keywords.
 
 ---
+**Formatting Guidelines within Sections:**
+- Use Markdown bullet points (`-`) where appropriate.
+- Keep language direct and professional.
+- Adhere strictly to the section headings and numbering provided above.
+"""
+
+FULL_ANALYSIS_PROMPT_TEMPLATE_EN = """
+You are a senior technical recruiter. Analyze the following CV against the provided job description.
+
+CV:
+{cv}
+
+Job Description:
+{jd}
+
+Keyword Analysis (already computed):
+{keywords}
 
-**Formatting:**  
-- Use bullet points where appropriate.
-- Keep each section focused and actionable.
+""" + _ANALYSIS_INSTRUCTIONS_EN
+
+# Two-stage analysis: requirements are extracted from the job description once
+# (the result is cached per job description), then matched against each CV
+JD_REQUIREMENTS_PROMPT_TEMPLATE_EN = """
+You are a senior technical recruiter. Extract the requirements of the following job description.
+
+Job Description:
+{jd}
+
+**Instructions:**
+1. Output **ONLY** a JSON object, with no text, Markdown or code block around it.
+2. Use exactly these keys:
+    - "title": the job title.
+    - "seniority": one of "intern", "junior", "mid", "senior", "lead", "executive" or "unspecified".
+    - "must_have": list of required skills, experience and qualifications.
+    - "nice_to_have": list of preferred or bonus qualifications.
+    - "responsibilities": list of the main duties of the role.
+    - "keywords": list of skills, technologies and qualifications *verbatim* from the job description.
+3. Keep each list item short (under 15 words) and do not invent anything the job description does not state.
+4. Write the values in English.
 """
 
+CV_MATCH_PROMPT_TEMPLATE_EN = """
+You are a senior technical recruiter. Analyze the following CV against the requirements extracted from a job description.
+
+CV:
+{cv}
+
+Job Requirements:
+{requirements}
+
+Keyword Analysis (already computed):
+{keywords}
+
+""" + _ANALYSIS_INSTRUCTIONS_EN
+
 CV_REWRITE_PROMPT_TEMPLATE_EN = """
 You are a senior technical recruiter and expert in resume optimization. Rewrite the following CV to maximize its match with the provided job description and improve its chances of passing Applicant Tracking Systems (ATS).
 
 CV:
-```
 {cv}
-```
 
 Job Description:
-```
 {jd}
-```
-
-**Instructions:**  
-Rewrite the CV in clear, professional Markdown format using the following guidelines:
 
-1. Incorporate relevant keywords and skills from the job description throughout the CV.
-2. Emphasize transferable skills and directly relevant experiences.
-3. Use quantifiable achievements and specific examples where possible.
-4. Organize the CV with clear section headings: Summary/Profile, Experience, Skills, Education, and Other (if applicable).
-5. Preserve all important information from the original CV, but rephrase and reorganize as needed for clarity and impact.
-6. Ensure the CV is truthful, concise, and tailored to the job description.
-7. Format the CV for ATS compatibility (avoid tables, images, or unusual formatting).
+**Output Instructions:**
+1. Your *entire* output *must* be the rewritten CV in clear, professional Markdown format.
+2. **ABSOLUTELY DO NOT** include any introductory text, explanations, conversational filler, or surrounding formatting like JSON, code blocks, or dictionary structures.
+3. **ABSOLUTELY DO NOT** generate an analysis of the CV or job description. Your *sole task* is rewriting.
+4. Incorporate relevant keywords and skills from the job description throughout the CV where appropriate and truthful.
+5. Emphasize transferable skills and directly relevant experiences for the target role.
+6. Use quantifiable achievements and specific examples from the original CV or implied by experience where possible.
+7. Preserve all important and truthful information from the original CV, but rephrase and reorganize as needed for clarity, impact, and relevance to the job description.
+8. Structure the rewritten CV *strictly* using the following section headings *in this order*. Only include a section if there is relevant content from the original CV to place under it:
+    - Summary/Profile
+    - Experience
+    - Projects (if applicable, based on original CV)
+    - Skills
+    - Education
+    - Other (if applicable, based on original CV)
+9. Format the CV for ATS compatibility using standard Markdown: use clear headings (`##`), bullet points (`-`), and plain text. Avoid tables, images, or unusual formatting.
+10. Keep language direct and professional.
 
 ---
 
-**Output Format:**  
-- Use Markdown with clear section headings.
-- Use bullet points for lists and achievements.
-- Keep language direct and professional.
+**Output Format Example (Your output should begin directly with the first section heading):**
+
+## Summary/Profile
+[Optimized summary here]
+
+## Experience
+[Optimized experience bullet points here]
+
+## Projects
+[Optimized project details here, if applicable and separate from experience]
+
+## Skills
+[Optimized skills list here]
+
+## Education
+[Optimized education details here]
+
+## Other
+[Any other relevant optimized information here, if applicable]
 """
@@ -2,81 +2,144 @@
 French prompts for CV Analyzer
 """
 
+# Instructions and output structure shared by the analysis templates
+_ANALYSIS_INSTRUCTIONS_FR = """**Instructions:**
+1. Votre **SEULE TÂCHE** est d'effectuer l'analyse et de la produire au format Markdown spécifié.
+2. **ABSOLUMENT AUCUN** texte conversationnel, introduction ou explication avant ou après la sortie de l'analyse.
+3. **ABSOLUTEMENT AUCUNE** structure JSON, dictionnaire, blocs de code, ou tout autre enveloppement autour du contenu de l'analyse.
+4. **NE PAS ABSOLUMENT** inclure le CV original ou la description de poste dans la sortie.
+5. **NE PAS ABSOLUMENT** générer une version réécrite du CV.
+6. Produisez votre analyse en utilisant strictement la structure Markdown fournie dans la section "STRUCTURE DE SORTIE" ci-dessous.
+
+---
+**STRUCTURE DE SORTIE:**
+(Votre sortie DOIT commencer EXACTEMENT par le premier titre Markdown requis : '## 1. Score de correspondance global'. Il ne doit y avoir RIEN avant.)
+
+## 1. Score de correspondance global
+- Donnez un score en pourcentage (0–100%) pour l'adéquation du CV avec les exigences du poste.
+- Justifiez brièvement votre score en 2 à 3 phrases.
+
+## 2. Analyse des mots-clés
+- **NE RÉDIGEZ PAS CETTE SECTION.** Elle est calculée séparément (voir l'« ANALYSE DES MOTS-CLÉS » fournie avec le CV et la description de poste) et insérée automatiquement. Passez directement de la section 1 à la section 3, en partant des mots-clés manquants pour l'analyse des écarts de compétences.
+
+## 3. Analyse des écarts de compétences
+- Identifiez les compétences, expériences ou qualifications spécifiques requises par le poste mais manquantes ou faibles dans le CV, sur la base de la description de poste, au-delà des simples mots-clés individuels.
+
+## 4. Suggestions section par section
+- Fournissez des suggestions spécifiques et exploitables pour améliorer *chacune* des sections suivantes du CV afin de mieux correspondre au poste. Suggérez comment le contenu pourrait être reformulé ou quel type d'informations pertinentes devrait être ajouté en fonction des exigences de la description de poste :
+    - **Résumé/Profil :** Suggestions pour cette section.
+    - **Expérience :** Recommandations pour améliorer les points de liste d'expérience.
+    - **Compétences :** Conseils sur les ajouts ou les modifications.
+    - **Formation/Autre :** Suggérez toute amélioration pertinente pour la formation ou d'autres sections.
+
+## 5. Points forts
+- Résumez les principaux points forts du candidat *spécifiquement* pour ce rôle, sur la base de la description de poste.
+
+## 6. Faiblesses et domaines d'amélioration
+- Résumez les principales faiblesses ou domaines d'amélioration, sur la base de la description de poste, allant au-delà des simples mots-clés manquants.
+
+---
+**Directives de formatage dans les sections :**
+- Utilisez des points de liste Markdown (`-`) le cas échéant.
+- Gardez un langage direct et professionnel.
+- Adhérez strictement aux titres de section et à la numérotation fournis ci-dessus.
+"""
+
 FULL_ANALYSIS_PROMPT_TEMPLATE_FR = """
 Vous êtes un recruteur technique senior. Analysez le CV suivant par rapport à la description de poste fournie.
 
-CV :
-```
+CV:
 {cv}
-```
 
-Description du poste :
-```
+DESCRIPTION DU POSTE:
 {jd}
-```
 
-**Instructions :**
-Fournissez votre analyse en Markdown clair en utilisant la structure et les titres de section suivants. Soyez direct, concis et fournissez des conseils exploitables.
+ANALYSE DES MOTS-CLÉS (déjà calculée):
+{keywords}
 
----
+""" + _ANALYSIS_INSTRUCTIONS_FR
 
-## 1. Score de Correspondance Global
-- Donnez un score en pourcentage (0–100 %) indiquant dans quelle mesure le CV correspond aux exigences du poste, avec une justification brève (2–3 phrases).
+# Two-stage analysis: requirements are extracted from the job description once
+# (the result is cached per job description), then matched against each CV
+JD_REQUIREMENTS_PROMPT_TEMPLATE_FR = """
+Vous êtes un recruteur technique senior. Extrayez les exigences de la description de poste suivante.
 
-## 2. Analyse des Mots-clés
-- **Mots-clés Correspondants :** Listez les compétences, technologies ou qualifications de la description de poste présentes dans le CV.
-- **Mots-clés Manquants :** Listez les mots-clés ou exigences importants de la description de poste absents du CV.
+DESCRIPTION DU POSTE:
+{jd}
 
-## 3. Analyse des Écarts de Compétences
-- Identifiez les compétences, expériences ou qualifications requises par le poste mais absentes ou faibles dans le CV.
+**Instructions:**
+1. Produisez **UNIQUEMENT** un objet JSON, sans texte, Markdown ni bloc de code autour.
+2. Utilisez exactement ces clés :
+    - "title" : l'intitulé du poste.
+    - "seniority" : une valeur parmi "intern", "junior", "mid", "senior", "lead", "executive" ou "unspecified".
+    - "must_have" : liste des compétences, expériences et qualifications requises.
+    - "nice_to_have" : liste des qualifications appréciées ou en bonus.
+    - "responsibilities" : liste des principales missions du poste.
+    - "keywords" : liste des compétences, technologies et qualifications *telles qu'elles apparaissent textuellement* dans la description de poste.
+3. Gardez chaque élément de liste court (moins de 15 mots) et n'inventez rien que la description de poste n'indique pas.
+4. Rédigez les valeurs en français.
+"""
 
-## 4. Suggestions par Section
-- **Résumé/Profil :** Suggérez des améliorations pour la section résumé/profil.
-- **Expérience :** Recommandez des reformulations ou ajouts pour mieux correspondre au poste.
-- **Compétences :** Conseillez sur les ajouts ou modifications à la section compétences.
-- **Formation/Autre :** Suggérez toute amélioration pertinente pour la formation ou d'autres sections.
+CV_MATCH_PROMPT_TEMPLATE_FR = """
+Vous êtes un recruteur technique senior. Analysez le CV suivant par rapport aux exigences extraites d'une description de poste.
 
-## 5. Points Forts
-- Résumez les principaux atouts du candidat pour ce poste.
+CV:
+{cv}
 
-## 6. Points Faibles et Axes d'Amélioration
-- Résumez les principales faiblesses ou axes d'amélioration, au-delà des mots-clés manquants.
+EXIGENCES DU POSTE:
+{requirements}
 
----
+ANALYSE DES MOTS-CLÉS (déjà calculée):
+{keywords}
 
-**Formatage :**
-- Utilisez des listes à puces si nécessaire.
-- Gardez chaque section concise et orientée action.
-"""
+""" + _ANALYSIS_INSTRUCTIONS_FR
 
 CV_REWRITE_PROMPT_TEMPLATE_FR = """
-Vous êtes un recruteur technique senior et expert en optimisation de CV. Réécrivez le CV suivant pour maximiser sa correspondance avec la description de poste et améliorer ses chances de passer les systèmes de suivi des candidatures (ATS).
+Vous êtes un recruteur technique senior et un expert en optimisation de CV. Réécrivez le CV suivant pour maximiser sa correspondance avec la description de poste fournie et améliorer ses chances de passer les systèmes de suivi des candidatures (ATS).
 
-CV :
-```
+CV:
 {cv}
-```
 
-Description du poste :
-```
+DESCRIPTION DU POSTE:
 {jd}
-```
-
-**Instructions :**
-Réécrivez le CV en Markdown professionnel en suivant ces consignes :
 
-1. Intégrez les mots-clés et compétences pertinents de la description de poste dans tout le CV.
-2. Mettez en avant les compétences transférables et les expériences directement pertinentes.
-3. Utilisez des réalisations quantifiables et des exemples précis si possible.
-4. Organisez le CV avec des titres de section clairs : Résumé/Profil, Expérience, Compétences, Formation, Autre (si applicable).
-5. Préservez toutes les informations importantes du CV original, mais reformulez et réorganisez pour plus de clarté et d'impact.
-6. Assurez-vous que le CV est honnête, concis et adapté à la description de poste.
-7. Formatez le CV pour la compatibilité ATS (évitez les tableaux, images ou formatages inhabituels).
+**Instructions de sortie :**
+1. Votre *sortie entière* DOIT être le CV réécrit au format Markdown clair et professionnel.
+2. **ABSOLUMENT AUCUN** texte d'introduction, explication, remplissage conversationnel, ou formatage environnant comme JSON, blocs de code, ou structures de dictionnaire.
+3. **NE PAS ABSOLUMENT** générer une analyse du CV ou de la description de poste. Votre *seule tâche* est la réécriture.
+4. Intégrez les mots-clés et compétences pertinents de la description de poste tout au long du CV là où c'est approprié et véridique.
+5. Mettez l'accent sur les compétences transférables et les expériences directement pertinentes pour le rôle ciblé.
+6. Utilisez des réalisations quantifiables et des exemples spécifiques du CV original ou implicites par l'expérience si possible.
+7. Conservez toutes les informations importantes et véridiques du CV original, mais reformulez et réorganisez-les si nécessaire pour plus de clarté, d'impact et de pertinence par rapport à la description de poste.
+8. Structurez le CV réécrit *strictement* en utilisant les titres de section suivants *dans cet ordre*. N'incluez une section que si le CV original contient du contenu pertinent à y placer :
+    - Résumé/Profil
+    - Expérience
+    - Projets (si applicable, basé sur le CV original)
+    - Compétences
+    - Formation
+    - Autre (si applicable, basé sur le CV original)
+9. Formatez le CV pour la compatibilité ATS en utilisant Markdown standard : utilisez des titres clairs (`##`), des points de liste (`-`), et du texte brut. Évitez les tableaux, les images ou les formats inhabituels.
+10. Gardez un langage direct et professionnel.
 
 ---
 
-**Format de sortie :**
-- Utilisez le Markdown avec des titres de section clairs.
-- Utilisez des listes à puces pour les réalisations et compétences.
-- Gardez un ton direct et professionnel.
+**Exemple de format de sortie (Votre sortie doit commencer directement par le premier titre de section) :**
+
+## Résumé/Profil
+[Résumé optimisé ici]
+
+## Expérience
+[Points de liste d'expérience optimisés ici]
+
+## Projets
+[Détails de projets optimisés ici, si applicable et séparé de l'expérience]
+
+## Compétences
+[Liste de compétences optimisée ici]
+
+## Formation
+[Détails de formation optimisés ici]
+
+## Autre
+[Toute autre information pertinente optimisée ici, si applicable]
 """
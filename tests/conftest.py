@@ -0,0 +1,68 @@
+"""
+Shared fixtures for the route tests
+"""
+import pytest
+from appopvibe import create_app, limiter
+from appopvibe.config import TestingConfig
+
+class FakeAnalyzer:
+    """Stand-in for the analyzer service that records what the routes ask of it"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def process_submission(self, cv_text, jd_text, language='en', rewrite=False,
+                                 task_timeout=None, model=None):
+        self.calls.append({'cv': cv_text, 'jd': jd_text, 'rewrite': rewrite, 'model': model})
+        result = {'analysis': f"Analysis of {cv_text} against {jd_text}"}
+        if rewrite:
+            result['rewritten_cv'] = f"Rewrite of {cv_text}"
+        return result
+
+    async def stream_submission(self, cv_text, jd_text, language='en', rewrite=False, model=None):
+        result = await self.process_submission(cv_text, jd_text, language, rewrite, model=model)
+        for part, text in result.items():
+            yield {'part': part, 'delta': text}
+            yield {'part': part, 'text': text}
+
+    async def analyze_batch(self, cv_texts, jd_texts, language='en', rewrite=False,
+                            concurrency=8, patience=600.0, model=None):
+        for jd_index, jd_text in enumerate(jd_texts):
+            for cv_index, cv_text in enumerate(cv_texts):
+                result = await self.process_submission(cv_text, jd_text, language, rewrite, model=model)
+                yield {'cv_index': cv_index, 'jd_index': jd_index, **result}
+
+@pytest.fixture
+def app(tmp_path):
+    """Create the app with its stores in a temporary directory"""
+    class Config(TestingConfig):
+        REPORTS_FOLDER = str(tmp_path / "reports")
+        FEEDBACK_FOLDER = str(tmp_path / "feedback")
+        REPORT_INDEX_PATH = str(tmp_path / "reports.sqlite3")
+        RETENTION_PATH = str(tmp_path / "retention.sqlite3")
+        LLM_BREAKER_PATH = str(tmp_path / "breakers.sqlite3")
+        LLM_THROTTLE_PATH = str(tmp_path / "throttle.sqlite3")
+        LLM_CACHE_PATH = str(tmp_path / "cache.sqlite3")
+        PENDING_SUBMISSIONS_PATH = str(tmp_path / "pending.sqlite3")
+        JOBS_PATH = str(tmp_path / "jobs.sqlite3")
+        ADMISSION_PATH = str(tmp_path / "admission.sqlite3")
+        LLM_CACHE_ENABLED = False
+        LLM_POOL_WARMUP = False
+        RATELIMIT_STORAGE_URI = 'memory://'
+        API_TOKENS = ['token-1', 'token-2']
+
+    app = create_app(Config)
+    limiter.reset()
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    """Serve every route from a FakeAnalyzer"""
+    fake = FakeAnalyzer()
+    for module in ('main', 'batch', 'api'):
+        monkeypatch.setattr(f"appopvibe.routes.{module}.get_analyzer_service", lambda: fake)
+    return fake
@@ -0,0 +1,117 @@
+"""
+Test admission control of interactive analyses
+"""
+import asyncio
+import pytest
+from appopvibe.services.llm.admission import AdmissionController, OverloadedError
+
+@pytest.fixture
+def admission(tmp_path):
+    """Create a controller with 2 slots per host, 1 queue place and a faster degraded model"""
+    return AdmissionController(
+        tmp_path / "admission.sqlite3", max_in_flight=2, worker_max_in_flight=2,
+        queue_size=1, queue_timeout=0.3, degrade_at=0.5, degraded_model="small",
+        retry_after=15, poll_interval=0.01
+    )
+
+def test_degrades_near_the_cap_then_sheds(admission):
+    """Test that requests are degraded past the threshold and shed past cap and queue"""
+    first = admission.acquire()
+    second = admission.acquire()
+
+    assert (first.degraded, first.model) == (False, None)
+    assert (second.degraded, second.model) == (True, "small")
+
+    # The queue place is taken for the wait, then the request times out
+    with pytest.raises(OverloadedError) as excinfo:
+        admission.acquire()
+    assert excinfo.value.retry_after == 15
+
+    stats = admission.stats()
+    assert (stats['in_flight'], stats['queued'], stats['shed']) == (2, 0, 1)
+
+    first.release()
+    first.release()  # releasing twice is harmless
+    assert admission.acquire().degraded is True
+    assert admission.stats()['admitted'] == 3
+
+def test_full_queue_sheds_immediately_and_queued_request_gets_freed_slot(admission):
+    """Test the bounded queue: one request waits for a slot, the next is turned away"""
+    held = [admission.acquire(), admission.acquire()]
+
+    async def scenario():
+        waiter = asyncio.create_task(admission.admit())
+        await asyncio.sleep(0.05)
+        assert admission.stats()['queued'] == 1
+        with pytest.raises(OverloadedError):
+            await admission.admit()  # queue full: no wait at all
+        held[0].release()
+        return await waiter
+
+    ticket = asyncio.run(scenario())
+
+    assert ticket.degraded is True  # queued requests are always degraded
+    stats = admission.stats()
+    assert (stats['in_flight'], stats['queued'], stats['queued_total'], stats['shed']) == (2, 0, 1, 1)
+
+def test_handover_moves_the_slot_to_the_follow_up_request(admission, tmp_path):
+    """Test that a stream's slot follows it from the form POST to the event stream"""
+    ticket = admission.acquire()
+    lease_id = ticket.handover()
+    assert admission.stats()['worker_in_flight'] == 0
+    assert admission.stats()['in_flight'] == 1
+
+    # Another worker picks up the event stream
+    other = AdmissionController(tmp_path / "admission.sqlite3", max_in_flight=2)
+    with other.resume(lease_id):
+        assert other.stats()['worker_in_flight'] == 1
+        assert other.stats()['in_flight'] == 1
+    assert other.stats()['in_flight'] == 0
+
+def test_unclaimed_handover_frees_the_slot_quickly(tmp_path):
+    """Test that a handed over lease expires soon unless the follow-up request resumes it"""
+    admission = AdmissionController(tmp_path / "admission.sqlite3", max_in_flight=1, queue_size=0,
+                                    handover_seconds=0)
+    admission.acquire().handover()
+
+    # The event stream never connected: the slot is free again
+    admission.acquire()
+    assert admission.stats()['in_flight'] == 1
+
+def test_admit_keeps_lease_updates_off_the_event_loop(admission, monkeypatch):
+    """Test that the async admission path runs its SQLite work on worker threads"""
+    import threading
+    threads = set()
+    attempt, leave_queue = admission._attempt, admission._leave_queue
+
+    def record(func):
+        def wrapper(*args):
+            threads.add(threading.get_ident())
+            return func(*args)
+        return wrapper
+    monkeypatch.setattr(admission, '_attempt', record(attempt))
+    monkeypatch.setattr(admission, '_leave_queue', record(leave_queue))
+
+    async def scenario():
+        held = [await admission.admit(), await admission.admit()]
+        with pytest.raises(OverloadedError):
+            await admission.admit()  # queued, then timed out
+        for ticket in held:
+            await ticket.release_async()
+    asyncio.run(scenario())
+
+    assert threads and threading.get_ident() not in threads
+    assert admission.stats()['in_flight'] == 0
+
+def test_renew_keeps_long_running_work_counted(tmp_path):
+    """Test that renewing restores a lease that outlived its expiry"""
+    admission = AdmissionController(tmp_path / "admission.sqlite3", max_in_flight=1,
+                                    queue_size=0, lease_seconds=0)
+    ticket = admission.acquire()
+    assert admission.stats()['in_flight'] == 0  # expired while still running
+
+    admission.lease_seconds = 60
+    ticket.renew()
+    assert admission.stats()['in_flight'] == 1
+    ticket.release()
+    assert admission.stats()['in_flight'] == 0
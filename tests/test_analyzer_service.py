@@ -1,6 +1,7 @@
 """
 Test analyzer service functionality
 """
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch
 from appopvibe.services.analyzer.analyzer_service import AnalyzerService
@@ -87,3 +88,155 @@ async def test_process_submission_with_rewrite(analyzer_service):
     }
     analyzer_service.analyze_cv_jd.assert_called_once()
     analyzer_service.rewrite_cv.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_process_submission_runs_parts_concurrently(analyzer_service):
+    """Test that analysis and rewrite overlap instead of running back to back"""
+    running = []
+    overlap = []
+
+    async def slow_part(result):
+        running.append(result)
+        await asyncio.sleep(0.05)
+        overlap.append(len(running))
+        return result
+
+    analyzer_service.analyze_cv_jd = lambda *args: slow_part("Analysis result")
+    analyzer_service.rewrite_cv = lambda *args: slow_part("Rewritten CV")
+
+    result = await analyzer_service.process_submission("My CV", "Job description", "en", rewrite=True)
+
+    assert result == {'analysis': 'Analysis result', 'rewritten_cv': 'Rewritten CV'}
+    assert overlap == [2, 2]
+
+@pytest.mark.asyncio
+async def test_process_submission_keeps_analysis_when_rewrite_fails(analyzer_service):
+    """Test that a failed or timed out rewrite is reported separately"""
+
+    async def hang(*args):
+        await asyncio.sleep(10)
+
+    analyzer_service.analyze_cv_jd = AsyncMock(return_value="Analysis result")
+    analyzer_service.rewrite_cv = hang
+    analyzer_service.task_timeout = 0.05
+
+    result = await analyzer_service.process_submission("My CV", "Job description", "en", rewrite=True)
+
+    assert result['analysis'] == "Analysis result"
+    assert 'rewritten_cv' not in result
+    assert result['errors'] == {'rewritten_cv': 'timed out'}
+
+@pytest.mark.asyncio
+async def test_process_submission_reports_llm_error_texts_as_failures(analyzer_service, mock_llm_service):
+    """Test that an error text returned by the LLM service marks its part failed"""
+    mock_llm_service.cached_generate.return_value = "Analysis result"
+    mock_llm_service.generate.return_value = "Error: The LLM service is busy. Please try again."
+
+    result = await analyzer_service.process_submission("My CV", "Job description", "en", rewrite=True)
+
+    assert result['analysis'].startswith("Analysis result")
+    assert 'rewritten_cv' not in result
+    assert result['errors'] == {'rewritten_cv': 'failed'}
+
+    mock_llm_service.cached_generate.return_value = "Error: The LLM service is busy. Please try again."
+    result = await analyzer_service.process_submission("My CV", "Job description", "en")
+
+    assert result['analysis'] == "Error: The LLM service is busy. Please try again."
+    assert result['errors'] == {'analysis': 'failed'}
+
+@pytest.mark.asyncio
+async def test_process_submission_reports_compaction(analyzer_service, mock_llm_service):
+    """Test that compacted inputs are sent and token savings returned"""
+    from appopvibe.services.analyzer.input_compactor import InputCompactor
+    analyzer_service.compactor = InputCompactor()
+
+    result = await analyzer_service.process_submission("•   My   CV", "Sample JD", 'en')
+
+    prompt = mock_llm_service.cached_generate.call_args[1]['prompt']
+    assert "- My CV" in prompt
+    assert result['compaction']['tokens_saved'] >= 0
+    assert set(result['compaction']) == {'tokens_before', 'tokens_after', 'tokens_saved', 'truncated'}
+
+@pytest.mark.asyncio
+async def test_keyword_section_is_matched_locally(mock_llm_service):
+    """Test that templates taking keywords get them and the section is merged in"""
+    analyzer_service = AnalyzerService(mock_llm_service, {
+        'en': {'analysis': 'CV: {cv}\nJD: {jd}\nKeywords:\n{keywords}'}
+    })
+    mock_llm_service.cached_generate.return_value = "## 1. Score\n80%\n\n## 3. Gaps\n- none"
+
+    result = await analyzer_service.analyze_cv_jd("Python developer", "Python and Docker", 'en')
+
+    prompt = mock_llm_service.cached_generate.call_args[1]['prompt']
+    assert "Missing Keywords: Docker" in prompt
+    assert result.index("## 1.") < result.index("## 2. Keyword Analysis") < result.index("## 3.")
+    assert "**Matched Keywords:** Python" in result
+
+@pytest.fixture
+def two_stage_service(mock_llm_service):
+    """Create an analyzer running the two-stage pipeline"""
+    return AnalyzerService(mock_llm_service, {
+        'en': {
+            'analysis': 'Analyze CV: {cv} against JD: {jd}',
+            'requirements': 'Extract requirements of JD: {jd}',
+            'match': 'Match CV: {cv} against requirements: {requirements}',
+        }
+    }, two_stage=True)
+
+@pytest.mark.asyncio
+async def test_two_stage_matches_cv_against_extracted_requirements(two_stage_service, mock_llm_service):
+    """Test that the JD is only sent to the (cacheable) extraction stage"""
+    async def generate(prompt, **kwargs):
+        if prompt.startswith("Extract"):
+            return '{"seniority": "senior", "must_have": ["Ten years of Python"]}'
+        return "Match result"
+    mock_llm_service.cached_generate.side_effect = generate
+
+    result = await two_stage_service.analyze_cv_jd("My CV", "A very long job description", 'en')
+
+    extraction, match = [call[1] for call in mock_llm_service.cached_generate.call_args_list]
+    assert extraction['prompt'] == "Extract requirements of JD: A very long job description"
+    assert extraction['temperature'] == 0.0
+    assert "Ten years of Python" in match['prompt'] and "A very long job description" not in match['prompt']
+    assert result == "Match result"
+
+@pytest.mark.asyncio
+async def test_two_stage_falls_back_to_full_jd(two_stage_service, mock_llm_service):
+    """Test that a failed extraction falls back to the single-stage analysis"""
+    mock_llm_service.cached_generate.side_effect = [
+        "Error: The LLM service is temporarily unavailable. Please try again shortly.",
+        "Analysis result",
+    ]
+
+    result = await two_stage_service.analyze_cv_jd("My CV", "Sample JD", 'en')
+
+    assert mock_llm_service.cached_generate.call_args[1]['prompt'] == "Analyze CV: My CV against JD: Sample JD"
+    assert result == "Analysis result"
+
+@pytest.mark.asyncio
+async def test_analyze_batch_covers_every_pair_with_bounded_concurrency(analyzer_service, mock_llm_service):
+    """Test that a batch yields one result per CV/JD pair, never over the concurrency"""
+    from appopvibe.services.llm.throttle import queue_patience
+    running = 0
+    peak = 0
+    patience = set()
+    
+    async def generate(prompt, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        patience.add(queue_patience.get())
+        await asyncio.sleep(0.01)
+        running -= 1
+        return f"Analysis of {prompt}"
+    mock_llm_service.cached_generate.side_effect = generate
+
+    results = [result async for result in analyzer_service.analyze_batch(
+        ["CV A", "CV B", "CV C"], ["JD 1", "JD 2"], 'en', concurrency=2, patience=120)]
+
+    assert sorted((r['cv_index'], r['jd_index']) for r in results) == [
+        (cv, jd) for cv in range(3) for jd in range(2)]
+    assert all(f"CV {'ABC'[r['cv_index']]} against JD: JD {r['jd_index'] + 1}" in r['analysis']
+               for r in results)
+    assert peak == 2
+    assert patience == {120}
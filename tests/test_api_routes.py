@@ -0,0 +1,44 @@
+"""
+Test the JSON API routes
+"""
+PAYLOAD = {'cv': "My CV text", 'jd': "The job description"}
+TOKEN = {'Authorization': "Bearer token-1"}
+
+def test_api_rejects_missing_and_unknown_tokens(client, analyzer):
+    """Test the 401 with WWW-Authenticate for callers without a valid token"""
+    for headers in ({}, {'Authorization': "Bearer wrong"}, {'Authorization': "Basic token-1"}):
+        response = client.post('/api/v1/analyze', json=PAYLOAD, headers=headers)
+        assert response.status_code == 401
+        assert response.headers['WWW-Authenticate'] == 'Bearer'
+        assert 'error' in response.get_json()
+    assert analyzer.calls == []
+
+def test_api_returns_the_analysis_and_report(client, analyzer):
+    """Test the response of an authenticated analysis"""
+    response = client.post('/api/v1/analyze', json={**PAYLOAD, 'rewrite': True}, headers=TOKEN)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['analysis'] == "Analysis of My CV text against The job description"
+    assert data['rewritten_cv'] == "Rewrite of My CV text"
+    assert data['report_id'] and data['errors'] == {}
+    assert data['meta']['degraded'] is False
+
+def test_api_validates_the_payload(client, analyzer):
+    """Test the 400 for missing texts and unsupported languages"""
+    assert client.post('/api/v1/analyze', json={'cv': "", 'jd': "x"}, headers=TOKEN).status_code == 400
+    response = client.post('/api/v1/analyze', json={**PAYLOAD, 'language': 'xx'}, headers=TOKEN)
+    assert response.status_code == 400
+    assert analyzer.calls == []
+
+def test_api_rate_limit_is_per_token(app, client, analyzer):
+    """Test the JSON 429 once a token's limit is used up, leaving other tokens alone"""
+    app.config['API_RATE_LIMIT'] = '2 per minute'
+
+    for _ in range(2):
+        assert client.post('/api/v1/analyze', json=PAYLOAD, headers=TOKEN).status_code == 200
+    response = client.post('/api/v1/analyze', json=PAYLOAD, headers=TOKEN)
+    assert response.status_code == 429
+    assert response.get_json()['error'].startswith("Rate limit exceeded")
+    assert client.post('/api/v1/analyze', json=PAYLOAD,
+                       headers={'Authorization': "Bearer token-2"}).status_code == 200
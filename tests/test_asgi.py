@@ -0,0 +1,122 @@
+"""
+Test the native ASGI serving mode
+"""
+import time
+import asyncio
+from functools import wraps
+from flask import Flask, Response, current_app, request, jsonify
+from appopvibe.asgi import ASGIApp
+
+def make_app():
+    """Create an app with an async view behind a sync decorator, like the rate limiter's"""
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 1024
+    app.config['BATCH_MAX_CONTENT_KB'] = 1
+    loops = []
+
+    def sync_decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        return wrapper
+
+    @app.route('/slow', methods=['POST'])
+    @sync_decorator
+    async def slow():
+        loops.append(asyncio.get_running_loop())
+        await asyncio.sleep(0.2)
+        return jsonify({'echo': request.get_json()['n']})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f"{i}\n" for i in range(3)), mimetype='text/plain')
+
+    app.loops = loops
+    return app
+
+async def send_request(asgi_app, method, path, body=b'', headers=None):
+    """Send one request to the ASGI app and collect its status, headers and body"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)  # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+        # No content length by default, as if chunked
+        'headers': headers or [(b'content-type', b'application/json')],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    await asgi_app(scope, receive, send)
+    response_headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+    return sent[0]['status'], response_headers, b''.join(m.get('body', b'') for m in sent[1:])
+
+async def call(asgi_app, method, path, body=b''):
+    """Send one request to the ASGI app and collect its status and body"""
+    status, _, body = await send_request(asgi_app, method, path, body)
+    return status, body
+
+def test_async_views_run_concurrently_on_the_server_loop():
+    """Test that hundreds of awaiting analyses are in flight in one worker at once"""
+    app = make_app()
+    asgi_app = ASGIApp(app, threads=4)
+
+    async def load():
+        started = time.monotonic()
+        results = await asyncio.gather(*[
+            call(asgi_app, 'POST', '/slow', b'{"n": %d}' % i) for i in range(200)
+        ])
+        return results, time.monotonic() - started, asyncio.get_running_loop()
+
+    results, elapsed, loop = asyncio.run(load())
+
+    assert [status for status, _ in results] == [200] * 200
+    assert results[7][1] == b'{"echo":7}\n'
+    assert asgi_app.stats() == {'in_flight': 0, 'peak_in_flight': 200}
+    assert elapsed < 2  # 200 x 0.2s serialized would take 40s
+    assert set(app.loops) == {loop}
+
+def test_sync_views_and_limits():
+    """Test that sync views stream from the thread pool and oversized bodies are refused"""
+    asgi_app = ASGIApp(make_app(), threads=2)
+
+    async def requests():
+        return (await call(asgi_app, 'GET', '/stream'),
+                await call(asgi_app, 'POST', '/slow', b'x' * 2048),
+                await call(asgi_app, 'GET', '/missing'))
+
+    streamed, too_large, missing = asyncio.run(requests())
+
+    assert streamed == (200, b"0\n1\n2\n")
+    assert too_large[0] == 413
+    assert missing[0] == 404
+
+def test_real_app_analysis_and_report_through_asgi(app, analyzer):
+    """Test the form analysis (async view) and its report page (sync view) of create_app()"""
+    asgi_app = ASGIApp(app, threads=2)
+    form = b"cv=My+CV+text&jd=The+job+description&language=en"
+
+    async def submit_then_view():
+        status, headers, _ = await send_request(
+            asgi_app, 'POST', '/analyze', form,
+            [(b'content-type', b'application/x-www-form-urlencoded')])
+        assert status == 302
+        cookie = headers['set-cookie'].split(';', 1)[0].encode()
+        report = await send_request(asgi_app, 'GET', headers['location'],
+                                    headers=[(b'cookie', cookie)])
+        return headers['location'], report
+
+    location, (status, headers, body) = asyncio.run(submit_then_view())
+
+    assert location.startswith('/report/')
+    assert status == 200
+    assert headers['content-type'].startswith('text/html')
+    assert b"Analysis of My CV text against The job description" in body
+    assert analyzer.calls[0]['rewrite'] is False
+    assert asgi_app.stats()['in_flight'] == 0
@@ -0,0 +1,59 @@
+"""
+Test the batch analysis route
+"""
+import json
+from appopvibe.services.container import get_admission
+
+PAYLOAD = {'cvs': ["CV A", "CV B"], 'jds': ["JD 1", "JD 2"]}
+TOKEN = {'Authorization': "Bearer token-1"}
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_batch_requires_an_api_token(client, analyzer):
+    """Test that batches without a valid bearer token are refused"""
+    for headers in ({}, {'Authorization': "Bearer wrong"}):
+        response = client.post('/batch/analyze', json=PAYLOAD, headers=headers)
+        assert response.status_code == 401
+        assert response.headers['WWW-Authenticate'] == 'Bearer'
+    assert analyzer.calls == []
+
+def test_batch_streams_one_line_per_pair(app, client, analyzer):
+    """Test the NDJSON shape: header, one line per pair with its report, then a summary"""
+    response = client.post('/batch/analyze', json=PAYLOAD, headers=TOKEN)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = ndjson(response)
+    assert lines[0]['pairs'] == 4 and lines[0]['degraded'] is False
+    pairs = lines[1:-1]
+    assert sorted((line['cv_index'], line['jd_index']) for line in pairs) == [
+        (0, 0), (0, 1), (1, 0), (1, 1)]
+    assert all(line['report_id'] and line['analysis'].startswith("Analysis of") for line in pairs)
+    assert lines[-1] == {'done': True, 'completed': 4}
+    with app.app_context():
+        assert get_admission().stats()['in_flight'] == 0  # the batch gave its slot back
+
+def test_batch_rate_limit_is_per_token(app, client, analyzer):
+    """Test that one client exhausting its batch limit does not block another"""
+    app.config['BATCH_RATE_LIMIT'] = '1 per minute'
+
+    assert client.post('/batch/analyze', json=PAYLOAD, headers=TOKEN).status_code == 200
+    response = client.post('/batch/analyze', json=PAYLOAD, headers=TOKEN)
+    assert response.status_code == 429
+    assert 'error' in response.get_json()
+    assert client.post('/batch/analyze', json=PAYLOAD,
+                       headers={'Authorization': "Bearer token-2"}).status_code == 200
+
+def test_batch_counts_against_admission(app, client, analyzer):
+    """Test that a saturated service turns batches away with Retry-After"""
+    app.config.update(ADMISSION_MAX_IN_FLIGHT=1, ADMISSION_QUEUE_SIZE=0)
+    with app.app_context():
+        ticket = get_admission().acquire()
+
+    response = client.post('/batch/analyze', json=PAYLOAD, headers=TOKEN)
+
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+    assert analyzer.calls == []
+    ticket.release()
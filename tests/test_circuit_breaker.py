@@ -0,0 +1,64 @@
+"""
+Test the shared provider circuit breakers
+"""
+import time
+import pytest
+from appopvibe.services.llm.circuit_breaker import (
+    CircuitBreaker, ProviderUnavailableError, CLOSED, OPEN, HALF_OPEN
+)
+
+@pytest.fixture
+def breaker(tmp_path):
+    """Create breakers in a temporary database"""
+    return CircuitBreaker(tmp_path / "breakers.sqlite3", failure_threshold=2, reset_timeout=60)
+
+def test_opens_after_consecutive_failures(breaker):
+    """Test that the breaker opens at the threshold and rejects calls"""
+    breaker.allow("groq")
+    breaker.record_failure("groq", "timeout")
+    assert breaker.states()["groq"]["state"] == CLOSED
+
+    breaker.record_failure("groq", "timeout")
+    assert breaker.states()["groq"]["state"] == OPEN
+    with pytest.raises(ProviderUnavailableError):
+        breaker.allow("groq")
+
+    breaker.allow("openrouter")  # other providers are unaffected
+    assert breaker.states()["groq"]["total_rejected"] == 1
+
+def test_success_resets_failure_count(breaker):
+    """Test that only consecutive failures count"""
+    breaker.record_failure("groq")
+    breaker.record_success("groq")
+    breaker.record_failure("groq")
+
+    assert breaker.states()["groq"]["state"] == CLOSED
+
+def test_half_open_admits_a_single_probe(breaker):
+    """Test the open -> half-open -> closed cycle"""
+    breaker.record_failure("groq")
+    breaker.record_failure("groq")
+    breaker.reset_timeout = 0
+    time.sleep(0.01)
+
+    breaker.allow("groq")  # the probe
+    assert breaker.states()["groq"]["state"] == HALF_OPEN
+    with pytest.raises(ProviderUnavailableError):
+        breaker.allow("groq")
+
+    breaker.record_success("groq")
+    assert breaker.states()["groq"]["state"] == CLOSED
+    assert [t["to_state"] for t in breaker.transitions()] == [CLOSED, HALF_OPEN, OPEN]
+
+def test_failed_probe_reopens(breaker):
+    """Test that a failing probe opens the breaker again"""
+    breaker.record_failure("groq")
+    breaker.record_failure("groq")
+    breaker.reset_timeout = 0
+    time.sleep(0.01)
+    breaker.allow("groq")
+
+    breaker.reset_timeout = 60
+    breaker.record_failure("groq")
+
+    assert breaker.states()["groq"]["state"] == OPEN
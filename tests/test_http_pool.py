@@ -0,0 +1,77 @@
+"""
+Test the shared LLM HTTP connection pool
+"""
+import asyncio
+import httpx
+import pytest
+from appopvibe.services.llm.http_pool import HTTPPool
+
+@pytest.fixture
+def pool():
+    """Create a pool whose client answers from a mock transport"""
+    seen_loops = []
+
+    def handler(request):
+        seen_loops.append(asyncio.get_running_loop())
+        if request.url.path == "/stream":
+            return httpx.Response(200, content=b"data: a\n\ndata: b\n")
+        return httpx.Response(200, json={"ok": True})
+
+    pool = HTTPPool()
+    pool._create_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pool.seen_loops = seen_loops
+    yield pool
+    pool.close()
+
+def test_client_survives_per_request_event_loops(pool):
+    """Test that requests from separate event loops share one client and loop"""
+    # Each asyncio.run mimics one Flask async view with its own event loop
+    first = asyncio.run(pool.post("https://example.test/v1"))
+    client = pool._client
+    second = asyncio.run(pool.post("https://example.test/v1"))
+
+    assert first.json() == {"ok": True}
+    assert second.status_code == 200
+    assert pool._client is client
+    assert pool.seen_loops == [pool.loop, pool.loop]
+
+def test_close_stops_pool_loop(pool):
+    """Test that closing the pool stops its loop thread"""
+    asyncio.run(pool.post("https://example.test/v1"))
+    thread = pool._thread
+
+    pool.close()
+
+    assert not thread.is_alive()
+    assert pool._client is None
+
+def test_stream_lines_from_another_loop(pool):
+    """Test that streamed lines are relayed from the pool loop to the caller"""
+    async def collect():
+        return [line async for line in pool.stream_lines("GET", "https://example.test/stream")]
+
+    lines = asyncio.run(collect())
+
+    assert [line for line in lines if line] == ["data: a", "data: b"]
+    assert pool.seen_loops == [pool.loop]
+
+def test_iterate_drives_async_iterator_from_sync_code(pool):
+    """Test that a sync caller can consume an async generator on the pool loop"""
+    async def numbers():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield i, asyncio.get_running_loop()
+
+    items = list(pool.iterate(numbers()))
+
+    assert [i for i, _ in items] == [0, 1, 2]
+    assert all(loop is pool.loop for _, loop in items)
+
+def test_iterate_propagates_errors(pool):
+    """Test that an exception in the async iterator reaches the sync caller"""
+    async def failing():
+        yield 1
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        list(pool.iterate(failing()))
@@ -0,0 +1,72 @@
+"""
+Test input compaction before LLM calls
+"""
+from appopvibe.services.analyzer.input_compactor import InputCompactor, TRUNCATION_MARKER
+from appopvibe.services.llm.tokens import estimate_tokens
+
+JD = """Senior Python Engineer
+
+•  5+ years of   Python
+●\tFlask and SQL experience
+
+Benefits
+
+Health insurance and a generous pension plan.
+Free snacks.
+
+Requirements:
+- Docker and Kubernetes
+
+We are an equal opportunity employer and consider applicants without regard to race or gender."""
+
+def test_token_estimate_depends_on_model_vocabulary():
+    """Test that smaller vocabularies are estimated to need more tokens"""
+    text = "Experienced infrastructure engineer, containerization specialist."
+
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(text, "mistralai/mistral-7b-instruct") > estimate_tokens(text, "llama-3.3-70b-versatile")
+
+def test_normalizes_bullets_and_whitespace():
+    """Test glyph and whitespace normalization"""
+    text = InputCompactor.normalize("•  Led the   team\r\n\n\n\n▪\tShipped it​ ")
+
+    assert text == "- Led the team\n\n- Shipped it"
+
+def test_strips_jd_boilerplate_and_duplicates():
+    """Test that EEO and benefits sections and repeated lines are dropped"""
+    cv = "Led a team of five engineers on payments\nLed a team of five engineers on payments\nPython"
+    result = InputCompactor().compact(cv, JD, "llama-3.3-70b-versatile")
+
+    assert "pension" not in result.jd and "snacks" not in result.jd
+    assert "equal opportunity" not in result.jd
+    assert "- Docker and Kubernetes" in result.jd and "- Flask and SQL experience" in result.jd
+    assert result.cv == "Led a team of five engineers on payments\nPython"
+    assert result.tokens_saved > 0 and not result.truncated
+
+def test_trims_to_model_budget():
+    """Test that oversized inputs are cut to the per-model budget"""
+    cv = "\n".join(f"Project {i}: built a data pipeline in Python" for i in range(200))
+    compactor = InputCompactor({'llama-3.3-70b-versatile': 300, 'default': 10_000})
+
+    result = compactor.compact(cv, "Python developer wanted", "llama-3.3-70b-versatile")
+
+    assert result.truncated
+    assert result.tokens_after <= 300
+    assert result.cv.startswith("Project 0:") and result.cv.endswith(TRUNCATION_MARKER)
+    assert result.jd == "Python developer wanted"
+    assert not compactor.compact(cv, "Python developer wanted", "other-model").truncated
+
+def test_trims_inside_an_oversized_single_line():
+    """Test that a one-paragraph input over budget is cut at a sentence, not dropped"""
+    jd = " ".join(f"Requirement {i}: experience with Python services." for i in range(400))
+    cv = " ".join(f"Built service {i} in Python and SQL." for i in range(400))
+    compactor = InputCompactor({'default': 1000})
+
+    result = compactor.compact(cv, jd, "any-model")
+
+    assert result.truncated and result.tokens_after <= 1000
+    for text in (result.cv, result.jd):
+        assert '\n' in text and text.endswith(TRUNCATION_MARKER)
+        assert text.split('\n')[0].endswith(".")
+    assert result.jd.startswith("Requirement 0: experience with Python services.")
+    assert len(result.jd) > 1000
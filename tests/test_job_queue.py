@@ -0,0 +1,76 @@
+"""
+Test the durable analysis job queue
+"""
+import pytest
+from appopvibe.services.jobs.job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+
+@pytest.fixture
+def job_queue(tmp_path):
+    """Create a job queue in a temporary database"""
+    return JobQueue(tmp_path / "jobs.sqlite3", max_attempts=2)
+
+def test_enqueue_claim_complete(job_queue):
+    """Test the normal lifecycle of a job"""
+    job_id = job_queue.enqueue({'cv': 'CV', 'jd': 'JD'})
+    assert job_queue.get(job_id)['status'] == QUEUED
+
+    job = job_queue.claim("worker-1", lease_seconds=60)
+    assert job['id'] == job_id
+    assert job['status'] == RUNNING
+    assert job['payload'] == {'cv': 'CV', 'jd': 'JD'}
+    assert job_queue.claim("worker-2", lease_seconds=60) is None
+
+    job_queue.complete(job_id, "worker-1", "report.md")
+    done = job_queue.get(job_id)
+    assert done['status'] == DONE
+    assert done['report_id'] == "report.md"
+    assert done['payload'] is None
+
+def test_jobs_are_claimed_oldest_first(job_queue):
+    """Test FIFO ordering"""
+    first = job_queue.enqueue({'n': 1})
+    second = job_queue.enqueue({'n': 2})
+
+    assert job_queue.claim("w", 60)['id'] == first
+    assert job_queue.claim("w", 60)['id'] == second
+
+def test_expired_lease_is_reclaimed_then_abandoned(job_queue):
+    """Test that a job whose executor died is retried up to max_attempts"""
+    job_id = job_queue.enqueue({'n': 1})
+
+    assert job_queue.claim("dead-1", lease_seconds=-1)['attempts'] == 1
+    assert job_queue.claim("dead-2", lease_seconds=-1)['attempts'] == 2
+    assert job_queue.claim("w", lease_seconds=60) is None
+
+    job = job_queue.get(job_id)
+    assert job['status'] == FAILED
+    assert job_queue.depth() == {FAILED: 1}
+
+def test_failed_run_is_retried_then_failed(job_queue):
+    """Test that fail() queues the job again while it has attempts left"""
+    job_id = job_queue.enqueue({'n': 1})
+
+    job_queue.claim("w", 60)
+    assert job_queue.fail(job_id, "w", "analysis failed") is True
+    job = job_queue.get(job_id)
+    assert (job['status'], job['payload'], job['error']) == (QUEUED, {'n': 1}, "analysis failed")
+
+    job_queue.claim("w", 60)
+    assert job_queue.fail(job_id, "w", "analysis failed again") is True
+    job = job_queue.get(job_id)
+    assert (job['status'], job['payload']) == (FAILED, None)
+
+def test_only_the_lease_owner_finishes_a_job(job_queue):
+    """Test that an executor whose lease was taken over cannot finish the job"""
+    job_id = job_queue.enqueue({'n': 1})
+    job_queue.claim("slow", lease_seconds=-1)
+    job_queue.claim("fast", lease_seconds=60)
+
+    assert job_queue.renew(job_id, "slow", 60) is False
+    assert job_queue.complete(job_id, "slow", "late.md") is False
+    assert job_queue.fail(job_id, "slow", "late") is False
+    assert job_queue.get(job_id)['status'] == RUNNING
+
+    assert job_queue.renew(job_id, "fast", 60) is True
+    assert job_queue.complete(job_id, "fast", "report.md") is True
+    assert job_queue.get(job_id)['report_id'] == "report.md"
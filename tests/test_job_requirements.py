@@ -0,0 +1,31 @@
+"""
+Test parsing of extracted job requirements
+"""
+from appopvibe.services.analyzer.requirements import JobRequirements, jd_digest
+
+def test_parse_tolerates_wrapping_and_bad_values():
+    """Test that fenced JSON parses and unknown values are normalized"""
+    text = """```json
+{"title": "Backend Engineer", "seniority": "Principal", "must_have": ["Python", " ", 3],
+ "nice_to_have": "Go", "keywords": ["Python", "AWS"]}
+```"""
+    requirements = JobRequirements.parse(text, jd_digest("jd"))
+
+    assert requirements.title == "Backend Engineer"
+    assert requirements.seniority == 'unspecified'
+    assert requirements.must_have == ["Python", "3"]
+    assert requirements.nice_to_have == []
+    assert requirements.digest == jd_digest("jd")
+
+def test_parse_rejects_errors_and_empty_extractions():
+    """Test that unusable output yields None"""
+    assert JobRequirements.parse("Error: The LLM service is busy right now.", "d") is None
+    assert JobRequirements.parse('{"title": "Engineer"}', "d") is None
+    assert JobRequirements.parse('{"must_have": [', "d") is None
+
+def test_to_prompt_lists_requirements():
+    """Test the requirements block of the matching prompt"""
+    requirements = JobRequirements("d", title="Engineer", seniority="senior",
+                                   must_have=["Python"], keywords=["Python", "AWS"])
+
+    assert requirements.to_prompt('fr') == "Intitulé: Engineer\nSéniorité: senior\nRequis:\n- Python\nMots-clés: Python, AWS"
@@ -0,0 +1,60 @@
+"""
+Test the background executor of analysis jobs
+"""
+import asyncio
+import pytest
+from appopvibe.services.jobs.job_queue import JobQueue, QUEUED, DONE
+from appopvibe.services.jobs.job_runner import JobRunner
+
+PAYLOAD = {'cv': "My CV text", 'jd': "The job description", 'language': 'en', 'rewrite': False}
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3", max_attempts=3)
+
+def run_job(app, job_queue, lease_seconds=60):
+    runner = JobRunner(app, job_queue, lease_seconds=lease_seconds)
+    job = job_queue.claim(runner.owner, lease_seconds)
+    return asyncio.run(runner.execute(job)), job['id']
+
+def test_failed_analysis_is_retried_not_reported(app, job_queue, analyzer, monkeypatch):
+    """Test that an analysis returned as an error text fails the attempt"""
+    async def failing(*args, **kwargs):
+        return {'analysis': "Error: The LLM service is busy.", 'errors': {'analysis': "failed"}}
+    monkeypatch.setattr(analyzer, 'process_submission', failing)
+    monkeypatch.setattr("appopvibe.services.container.get_analyzer_service", lambda: analyzer)
+    job_queue.enqueue(PAYLOAD)
+
+    report_id, job_id = run_job(app, job_queue)
+
+    assert report_id is None
+    job = job_queue.get(job_id)
+    assert job['status'] == QUEUED and job['report_id'] is None
+
+def test_long_job_keeps_its_lease(app, job_queue, analyzer, monkeypatch):
+    """Test that a job running past its lease renews it and is not handed out again"""
+    process_submission = analyzer.process_submission
+
+    async def slow(*args, **kwargs):
+        await asyncio.sleep(0.3)
+        assert job_queue.claim("other", 60) is None
+        return await process_submission(*args, **kwargs)
+    monkeypatch.setattr(analyzer, 'process_submission', slow)
+    monkeypatch.setattr("appopvibe.services.container.get_analyzer_service", lambda: analyzer)
+    job_queue.enqueue(PAYLOAD)
+
+    report_id, job_id = run_job(app, job_queue, lease_seconds=0.15)
+
+    assert report_id is not None
+    assert job_queue.get(job_id)['status'] == DONE
+
+def test_cli_commands_do_not_start_the_in_app_runner(app):
+    """Test that only serving processes run jobs in the app"""
+    import click
+    from appopvibe import create_app
+    settings = dict(app.config, ANALYZE_ASYNC=True, JOB_EXECUTORS=1)
+
+    for command in ('run-jobs', 'migrate-reports'):
+        with click.Context(click.Command(command)):
+            built = create_app(type('Config', (), settings))
+        assert 'appopvibe.job_runner' not in built.extensions
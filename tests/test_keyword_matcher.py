@@ -0,0 +1,53 @@
+"""
+Test local keyword matching
+"""
+from appopvibe.services.analyzer.keyword_matcher import KeywordMatcher, merge_keyword_section
+
+JD = """SENIOR BACKEND ENGINEER
+
+You will build REST APIs in Python and Node.js on AWS.
+Requirements:
+- Kubernetes, Docker and CI/CD pipelines
+- PostgreSQL databases, Machine Learning is a plus
+- Terraform, SQL, GraphQL"""
+
+def test_extracts_terms_in_jd_order_as_written():
+    """Test vocabulary and acronym extraction, skipping all-caps headings"""
+    terms = [display for _, display in KeywordMatcher().extract(JD)]
+
+    assert terms[:4] == ["REST APIs", "Python", "Node.js", "AWS"]
+    assert "CI/CD" in terms and "Machine Learning" in terms and "GraphQL" in terms
+    assert "SENIOR" not in terms and "CI" not in terms
+
+def test_skips_currencies_countries_and_degrees():
+    """Test that salary, location and degree tokens are not reported as skills"""
+    jd = "Salary 80k EUR (or USD equivalent), located in the US. Bac+5 or MSc required, 5+ years of C++."
+    terms = [display for _, display in KeywordMatcher().extract(jd)]
+
+    assert terms == ["C++"]
+
+def test_matches_case_accent_plural_and_alias_variants():
+    """Test that different spellings of a skill match"""
+    cv = "Développeur PYTHON, k8s, postgres, nodejs, intégration continue, REST API, ML, amazon web services"
+    result = KeywordMatcher().match(cv, JD)
+
+    assert result.matched == ["REST APIs", "Python", "Node.js", "AWS", "Kubernetes",
+                              "CI/CD", "PostgreSQL", "Machine Learning"]
+    assert result.missing == ["Docker", "Terraform", "SQL", "GraphQL"]
+
+def test_matches_whole_tokens_only():
+    """Test that a skill inside another word is not a match"""
+    result = KeywordMatcher().match("Javanese cooking, Scalable systems", "Java and Scala")
+
+    assert result.matched == [] and result.missing == ["Java", "Scala"]
+
+def test_merge_replaces_or_inserts_section_two():
+    """Test that the computed section lands between sections 1 and 3"""
+    section = KeywordMatcher().match("Python", "Python, Docker").to_markdown('en')
+    expected = "## 1. Score\n80%\n\n" + section + "\n## 3. Gaps\n- none\n"
+
+    assert merge_keyword_section("## 1. Score\n80%\n\n## 3. Gaps\n- none\n", section) == expected
+    assert merge_keyword_section(
+        "## 1. Score\n80%\n\n## 2. Keyword Analysis\n- guessed\n\n## 3. Gaps\n- none\n", section
+    ) == expected
+    assert "**Missing Keywords:** Docker" in section
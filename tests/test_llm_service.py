@@ -0,0 +1,223 @@
+"""
+Test LLM service request strategies
+"""
+import asyncio
+import httpx
+import pytest
+from appopvibe.services.llm.llm_service import LLMService, LLMCompletion
+from appopvibe.services.llm.retry import RetryPolicy
+from appopvibe.services.llm.circuit_breaker import CircuitBreaker, OPEN
+from appopvibe.services.llm.latency import LatencyTracker
+from appopvibe.services.llm.single_flight import SingleFlight
+
+def make_service(provider="groq", **kwargs):
+    """Create a service with private coalescing and latency state"""
+    service = LLMService(api_key="key", provider=provider, coalescer=SingleFlight(), **kwargs)
+    service.latency = LatencyTracker(min_samples=1)
+    return service
+
+def responder(service, text, delay=0.0, error=None):
+    """Replace the provider call of a service with a canned response"""
+    calls = []
+
+    async def complete(prompt, temperature, model, max_tokens, system=None):
+        calls.append(model)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return LLMCompletion(text, service.provider.value, model, delay)
+
+    service._complete = complete
+    return calls
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    """Test that no backup request is sent while the primary is fast"""
+    backup = make_service("openrouter")
+    backup_calls = responder(backup, "backup")
+    service = make_service(hedge=backup, hedge_delay=0.5, hedge_min_delay=0)
+    responder(service, "primary", delay=0.01)
+
+    assert await service.generate("prompt") == "primary"
+    assert backup_calls == []
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    """Test that a slow primary is raced against the backup and the loser cancelled"""
+    backup = make_service("openrouter", default_model="backup-model")
+    responder(backup, "backup", delay=0.01)
+    service = make_service(hedge=backup, hedge_delay=0.05, hedge_min_delay=0)
+    cancelled = []
+
+    async def slow(prompt, temperature, model, max_tokens, system=None):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+
+    service._complete = slow
+
+    assert await service.generate("prompt") == "backup"
+    assert cancelled == [service.default_model]
+
+@pytest.mark.asyncio
+async def test_failed_primary_falls_back_to_hedge():
+    """Test that a primary failure before the hedge delay uses the backup"""
+    backup = make_service("openrouter")
+    responder(backup, "backup")
+    service = make_service(hedge=backup, hedge_delay=10)
+    responder(service, "", error=RuntimeError("boom"))
+
+    assert await service.generate("prompt") == "backup"
+
+@pytest.mark.asyncio
+async def test_hedge_delay_follows_observed_latency_percentile():
+    """Test that the hedge delay is the configured percentile of recent latencies"""
+    service = make_service(hedge=make_service("openrouter"), hedge_delay=30, hedge_min_delay=0.5)
+    key = f"groq:{service.default_model}"
+    for seconds in [1, 2, 3, 4, 10]:
+        service.latency.record(key, seconds)
+
+    assert service._hedge_delay(service.default_model) == 10
+    service.hedge_percentile = 50
+    assert service._hedge_delay(service.default_model) == 3
+
+@pytest.mark.asyncio
+async def test_generate_with_fallback_switches_model_on_failure():
+    """Test that the fallback fires even though generate swallows errors"""
+    service = make_service()
+
+    async def complete(prompt, temperature, model, max_tokens, system=None):
+        if model == "primary":
+            raise RuntimeError("boom")
+        return LLMCompletion("from " + model, "groq", model, 0.1)
+
+    service._complete = complete
+
+    assert await service.generate_with_fallback("prompt", "primary", "backup") == "from backup"
+
+def http_error(status, headers=None):
+    """Build the error httpx raises for an error response"""
+    request = httpx.Request("POST", "https://llm.example/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"status {status}", request=request, response=response)
+
+def test_retry_policy_honors_retry_after():
+    """Test backoff bounds, Retry-After and non-retryable errors"""
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=2, max_retry_after=10)
+
+    assert 0 <= policy.delay(1, http_error(503)) <= 1
+    assert 0 <= policy.delay(2, httpx.ReadTimeout("slow")) <= 2
+    assert policy.delay(1, http_error(429, {"Retry-After": "7"})) == 7
+    assert policy.delay(1, http_error(429, {"Retry-After": "60"})) is None
+    assert policy.delay(1, http_error(400)) is None
+    assert policy.delay(3, http_error(503)) is None
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    """Test that a 503 followed by a success returns the success"""
+    service = make_service(retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+    outcomes = [http_error(503), LLMCompletion("ok", "groq", service.default_model, 0.1)]
+
+    async def complete(prompt, temperature, model, max_tokens, system=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    service._complete = complete
+
+    assert await service.generate("prompt") == "ok"
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_and_reroutes(tmp_path):
+    """Test that an open circuit skips the provider and goes to the hedge"""
+    breaker = CircuitBreaker(tmp_path / "breakers.sqlite3", failure_threshold=1, reset_timeout=60)
+    backup = make_service("openrouter", breaker=breaker)
+    responder(backup, "backup")
+    service = make_service(breaker=breaker, retry=RetryPolicy(max_attempts=1))
+    calls = responder(service, "", error=http_error(502))
+
+    assert (await service.generate("prompt")).startswith("Error:")
+    assert breaker.states()["groq"]["state"] == OPEN
+    assert (await service.generate("other")).startswith("Error: The LLM service is temporarily unavailable")
+    assert len(calls) == 1
+
+    service.hedge = backup
+    service.hedge_delay = 10
+    assert await service.generate("third") == "backup"
+
+@pytest.mark.asyncio
+async def test_rate_limited_call_fails_before_reaching_provider(tmp_path):
+    """Test that a call which would queue past its deadline is rejected early"""
+    from appopvibe.services.llm.throttle import Throttle
+    throttle = Throttle(tmp_path / "throttle.sqlite3", {'groq': {'tpm': 60}}, burst_seconds=1)
+    service = make_service(throttle=throttle)
+    calls = responder(service, "ok")
+
+    result = await service.generate("prompt", max_tokens=1000)
+
+    assert result.startswith("Error: The LLM service is busy")
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_background_calls_wait_for_quota_without_reserving_ahead(tmp_path):
+    """Test that calls with queue patience wait out the horizon and then go through"""
+    from appopvibe.services.llm.throttle import Throttle, queue_patience
+    throttle = Throttle(tmp_path / "throttle.sqlite3", {'groq': {'rpm': 600}}, burst_seconds=0.1,
+                        background_horizon=0)
+    service = make_service(throttle=throttle)
+    calls = responder(service, "ok")
+    queue_patience.set(5)
+
+    results = await asyncio.gather(*(service.generate(f"prompt {i}") for i in range(3)))
+
+    assert results == ["ok"] * 3
+    assert len(calls) == 3
+    stats = throttle.stats()["groq:" + calls[0]]
+    assert stats["rejected"] == 0 and stats["waits"] == 0  # nothing was reserved ahead
+
+@pytest.mark.asyncio
+async def test_system_message_and_usage_are_passed_through():
+    """Test that the system message leads the payload and usage is recorded per template"""
+    from appopvibe.services.llm.usage import UsageTracker
+    service = make_service()
+    service.usage = UsageTracker()
+    sent = {}
+
+    class Pool:
+        async def post(self, url, json, **kwargs):
+            sent.update(json)
+            return httpx.Response(200, request=httpx.Request("POST", url), json={
+                "choices": [{"message": {"content": "ok"}}],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": 10, "total_tokens": 1010,
+                          "prompt_tokens_details": {"cached_tokens": 900}},
+            })
+
+    service.pool = Pool()
+
+    assert await service.generate("inputs", system="instructions", template_version="v1") == "ok"
+    assert [m["content"] for m in sent["messages"]] == ["instructions", "inputs"]
+    usage = service.usage.snapshot()["v1"]
+    assert usage["calls"] == 1
+    assert usage["cached_tokens"] == 900
+    assert usage["cached_prompt_ratio"] == 0.9
+
+@pytest.mark.asyncio
+async def test_collect_usage_sees_calls_of_started_tasks():
+    """Test per-request usage collection across concurrent tasks"""
+    from appopvibe.services.llm.usage import UsageTracker, collect_usage, usage_totals
+    tracker = UsageTracker()
+
+    async def call(tokens):
+        tracker.record("v1", 0.5, {"prompt_tokens": tokens, "total_tokens": tokens})
+
+    tracker.record("v1", 1.0, {"prompt_tokens": 1})  # outside the block
+    with collect_usage() as calls:
+        await asyncio.gather(asyncio.create_task(call(10)), asyncio.create_task(call(20)))
+
+    totals = usage_totals(calls)
+    assert totals["llm_calls"] == 2 and totals["llm_latency"] == 1.0
+    assert totals["prompt_tokens"] == 30
+    assert tracker.snapshot()["v1"]["calls"] == 3
@@ -0,0 +1,49 @@
+"""
+Test the form analysis routes under admission control
+"""
+from appopvibe.services.container import get_admission
+
+FORM = {'cv': "My CV text", 'jd': "The job description", 'language': 'en', 'rewrite_cv': 'y'}
+
+def test_saturated_service_shows_the_form_again(app, client, analyzer):
+    """Test the 503 with Retry-After that keeps the user's input"""
+    app.config.update(ADMISSION_MAX_IN_FLIGHT=1, ADMISSION_QUEUE_SIZE=0)
+    with app.app_context():
+        ticket = get_admission().acquire()
+
+    response = client.post('/analyze', data=FORM)
+
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+    page = response.get_data(as_text=True)
+    assert "My CV text" in page and "The job description" in page
+    assert analyzer.calls == []
+    ticket.release()
+
+def test_degraded_request_skips_the_rewrite(app, client, analyzer):
+    """Test that a request admitted near saturation only gets the analysis"""
+    app.config['ADMISSION_DEGRADE_AT'] = 0
+
+    response = client.post('/analyze', data=FORM)
+
+    assert response.status_code == 302
+    assert '/report/' in response.headers['Location']
+    assert analyzer.calls == [{'cv': "My CV text", 'jd': "The job description",
+                               'rewrite': False, 'model': None}]
+    with app.app_context():
+        assert get_admission().stats()['in_flight'] == 0
+
+def test_stream_slot_is_handed_over_to_the_event_stream(app, client, analyzer):
+    """Test that the form POST's slot is held until its event stream finishes"""
+    response = client.post('/analyze/stream', data=FORM)
+    assert response.status_code == 200
+    with client.session_transaction() as session:
+        stream_id = session['stream_id']
+    with app.app_context():
+        assert get_admission().stats()['in_flight'] == 1
+
+    events = client.get(f'/analyze/stream/{stream_id}').get_data(as_text=True)
+
+    assert "event: done" in events
+    with app.app_context():
+        assert get_admission().stats()['in_flight'] == 0
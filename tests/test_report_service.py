@@ -0,0 +1,216 @@
+"""
+Test the report service and its index
+"""
+import os
+import gzip
+import asyncio
+import hashlib
+import time
+import threading
+import pytest
+from appopvibe.services.report.blob_store import BlobStore
+from appopvibe.services.report.report_index import ReportIndex
+from appopvibe.services.report.report_service import ReportService, ReportSaveError
+
+@pytest.fixture
+def report_service(tmp_path):
+    """Create a report service with its index"""
+    return ReportService(tmp_path / "reports", retention_days=30,
+                         index=ReportIndex(tmp_path / "reports.sqlite3"))
+
+@pytest.fixture
+def blob_report_service(tmp_path):
+    """Create a report service storing reports as blobs"""
+    reports_dir = tmp_path / "blob_reports"
+    return ReportService(reports_dir, retention_days=30,
+                         index=ReportIndex(tmp_path / "blob_reports.sqlite3"),
+                         blobs=BlobStore(reports_dir / ".blobs"))
+
+def test_save_report_indexes_it(report_service):
+    """Test that saving a report records its metadata"""
+    report_id = report_service.save_report("My CV", "The JD", "Good match", "Better CV", "fr",
+                                           filename="report_a.md")
+
+    entry = report_service.get_report_info(report_id)
+    assert entry['path'] == "report_a.md"
+    assert entry['language'] == "fr"
+    assert entry['size'] == os.path.getsize(report_service.reports_dir / report_id)
+    assert (entry['cv_size'], entry['jd_size'], entry['rewrite_size']) == (5, 6, 9)
+    assert entry['cv_digest'] != entry['jd_digest']
+    assert report_service.get_report_info("missing.md") is None
+
+def test_listing_and_retention_use_the_index(report_service):
+    """Test newest-first listing and removal of expired reports through the index"""
+    for name in ("old.md", "mid.md", "new.md"):
+        report_service.save_report("CV", "JD", "Analysis", filename=name)
+    # Age the first two reports past retention (the index, not the files, decides)
+    now = time.time()
+    with report_service.index.transaction() as conn:
+        conn.execute("UPDATE reports SET created_at = ? WHERE id = 'old.md'", (now - 40 * 86400,))
+        conn.execute("UPDATE reports SET created_at = ? WHERE id = 'mid.md'", (now - 31 * 86400,))
+
+    assert [r['filename'] for r in report_service.list_reports(limit=2)] == ["new.md", "mid.md"]
+    assert report_service.cleanup_old_reports() == 2
+    assert [r['filename'] for r in report_service.list_reports()] == ["new.md"]
+    assert not (report_service.reports_dir / "old.md").exists()
+
+def test_rebuild_recovers_index_from_files(report_service):
+    """Test that a rebuild indexes unindexed files and drops entries without a file"""
+    report_service.save_report("My CV", "The JD", "Good match", None, "fr", filename="kept.md")
+    report_service.save_report("CV", "JD", "Analysis", filename="deleted.md")
+    original = report_service.get_report_info("kept.md")
+    (report_service.reports_dir / "deleted.md").unlink()
+    report_service.index.remove(["kept.md"])
+
+    assert report_service.rebuild_index() == {'indexed': 1, 'removed': 1}
+
+    rebuilt = report_service.get_report_info("kept.md")
+    for field in ('language', 'size', 'analysis_size', 'cv_size', 'jd_size', 'digest', 'cv_digest'):
+        assert rebuilt[field] == original[field]
+    assert report_service.get_report_info("deleted.md") is None
+
+def test_html_is_rendered_once_at_save_time(report_service, monkeypatch):
+    """Test that views serve the HTML rendered when the report was saved"""
+    report_id = report_service.save_report("My CV", "The JD", "**Good** match")
+
+    def no_rendering(markdown_content):
+        raise AssertionError("rendered on view")
+    monkeypatch.setattr(report_service, 'render_html', no_rendering)
+
+    html = report_service.get_report_html(report_id)
+    assert "<strong>Good</strong> match" in html
+    assert report_service.get_report_html(report_id) == html
+
+def test_older_reports_are_rendered_on_first_view(report_service):
+    """Test the lazy backfill of reports saved without a rendering"""
+    report_service.reports_dir.mkdir(exist_ok=True)
+    (report_service.reports_dir / "legacy.md").write_text("# Old report\n\n*Language: English*\n")
+    rendered = []
+    render_html = report_service.render_html
+    report_service.render_html = lambda content: rendered.append(content) or render_html(content)
+
+    first = report_service.get_report_html("legacy.md")
+    second = report_service.get_report_html("legacy.md")
+
+    assert "<h1>Old report</h1>" in first
+    assert second == first
+    assert len(rendered) == 1
+    assert report_service.get_report_html("missing.md") is None
+
+def test_downloads_use_the_copy_compressed_at_save_time(report_service):
+    """Test the precompressed copy of a report and its lazy creation for older reports"""
+    report_id = report_service.save_report("My CV", "The JD", "Good match. " * 200)
+    encoded = report_service.encoded_report_path(report_id, 'gzip')
+    assert encoded is not None and encoded.exists()
+    assert gzip.decompress(encoded.read_bytes()) == report_service.report_path(report_id).read_bytes()
+
+    encoded.unlink()
+    assert report_service.encoded_report_path(report_id, 'gzip') == encoded
+    assert encoded.exists()
+    assert report_service.report_path("missing.md") is None
+    assert report_service.encoded_report_path("missing.md", 'gzip') is None
+
+def test_report_ids_are_unique_and_time_sharded(report_service):
+    """Test that reports saved at once get distinct ids stored in their hour's shard"""
+    ids = [report_service.save_report("CV", "JD", f"Analysis {i}") for i in range(50)]
+
+    assert len(set(ids)) == 50
+    times = [report_id.rsplit("_", 1)[0] for report_id in ids]
+    assert times == sorted(times)
+    entry = report_service.get_report_info(ids[0])
+    year, month, day, hour, name = entry['path'].split("/")
+    assert name == ids[0] and ids[0].startswith(f"report_{year}-{month}-{day}T{hour}-")
+    assert report_service.get_report(ids[-1]).endswith("```\n")
+
+def test_flat_reports_stay_readable_and_migrate_to_shards(report_service):
+    """Test the fallback for reports saved before sharding and their migration"""
+    report_service.reports_dir.mkdir(exist_ok=True)
+    (report_service.reports_dir / "report_2024-05-01T09-30-00Z.md").write_text("# Old\n")
+    (report_service.reports_dir / "notes.md").write_text("# Notes\n")
+    report_service.rebuild_index()
+    assert report_service.get_report("report_2024-05-01T09-30-00Z.md") == "# Old\n"
+
+    assert report_service.migrate_reports() == {'moved': 1, 'skipped': 1}
+
+    moved = report_service.reports_dir / "2024/05/01/09/report_2024-05-01T09-30-00Z.md"
+    assert moved.exists()
+    assert report_service.get_report_info("report_2024-05-01T09-30-00Z.md")['path'] == \
+        "2024/05/01/09/report_2024-05-01T09-30-00Z.md"
+    assert report_service.get_report("report_2024-05-01T09-30-00Z.md") == "# Old\n"
+    assert report_service.get_report("notes.md") == "# Notes\n"
+    assert report_service.rebuild_index() == {'indexed': 2, 'removed': 0}
+
+    # Expiring the report removes its emptied shard directories too
+    with report_service.index.transaction() as conn:
+        conn.execute("UPDATE reports SET created_at = 0")
+    assert report_service.cleanup_old_reports() == 2
+    assert not (report_service.reports_dir / "2024").exists()
+
+def blob_files(service):
+    return sorted(path.name for path in service.blobs.directory.rglob("*.gz"))
+
+def test_blob_reports_share_sections_and_read_back_whole(report_service, blob_report_service):
+    """Test that reports stored as blobs keep each section once and read like whole files"""
+    file_id = report_service.save_report("My CV", "The JD", "**Good** match", "Better CV", "fr")
+    first = blob_report_service.save_report("My CV", "The JD", "**Good** match", "Better CV", "fr")
+    second = blob_report_service.save_report("My CV", "The JD", "Another analysis")
+
+    # CV, JD, two analyses and one rewrite
+    assert len(blob_files(blob_report_service)) == 5
+    entry = blob_report_service.get_report_info(first)
+    assert entry['path'].endswith(first[:-3] + ".json")
+    assert blob_report_service.report_path(first) is None
+    content = blob_report_service.get_report(first)
+    assert content == report_service.get_report(file_id)
+    assert entry['digest'] == hashlib.sha256(content.encode('utf-8')).hexdigest()
+    assert "<strong>Good</strong> match" in blob_report_service.get_report_html(first)
+    assert "Better CV" not in blob_report_service.get_report(second)
+
+    # A rebuild indexes the manifests with the blobs they use
+    blob_report_service.index.remove([first])
+    assert blob_report_service.rebuild_index() == {'indexed': 2, 'removed': 0}
+    assert blob_report_service.get_report_info(first)['digest'] == entry['digest']
+
+def test_retention_deletes_blobs_no_report_uses(blob_report_service):
+    """Test that expired reports release their blobs, keeping those still shared"""
+    old = blob_report_service.save_report("My CV", "The JD", "Old analysis")
+    new = blob_report_service.save_report("My CV", "Another JD", "New analysis")
+    with blob_report_service.index.transaction() as conn:
+        conn.execute("UPDATE reports SET created_at = 0 WHERE id = ?", (old,))
+
+    assert blob_report_service.remove_expired()['removed'] == 1
+
+    # The CV is still used by the newer report
+    assert len(blob_files(blob_report_service)) == 3
+    assert blob_report_service.get_report(old) is None
+    assert "My CV" in blob_report_service.get_report(new)
+
+def test_failed_write_raises_and_keeps_the_previous_report(report_service, monkeypatch):
+    """Test that a write failing before its rename leaves no partial file behind"""
+    report_id = report_service.save_report("CV", "JD", "First analysis", filename="report_a.md")
+
+    def crash(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(ReportSaveError):
+        report_service.save_report("CV", "JD", "Second analysis", filename=report_id)
+    monkeypatch.undo()
+
+    assert "First analysis" in report_service.get_report(report_id)
+    assert not list(report_service.reports_dir.glob("*.tmp"))
+
+def test_async_save_runs_on_the_io_threads(report_service):
+    """Test that save_report_async writes the report off the event loop's thread"""
+    threads = []
+    save_report = report_service.save_report
+    report_service.save_report = lambda *args, **kwargs: (
+        threads.append(threading.current_thread().name) or save_report(*args, **kwargs))
+
+    async def save():
+        return await asyncio.gather(*(report_service.save_report_async("CV", "JD", f"Analysis {i}")
+                                      for i in range(3)))
+
+    ids = asyncio.run(save())
+
+    assert all(report_service.get_report(report_id) for report_id in ids)
+    assert all(name.startswith("report-io") for name in threads)
@@ -0,0 +1,130 @@
+"""
+Test the shared LLM response cache
+"""
+import time
+import pytest
+from unittest.mock import AsyncMock
+from appopvibe.services.cache.response_cache import LLMResponseCache
+from appopvibe.services.llm.llm_service import LLMService, LLMCompletion
+
+@pytest.fixture
+def response_cache(tmp_path):
+    """Create a response cache in a temporary database"""
+    return LLMResponseCache(tmp_path / "cache.sqlite3", ttl=60, max_bytes=100)
+
+def test_make_key_depends_on_every_component():
+    """Test that any change in the request yields a different key"""
+    base = ("groq", "llama", 0.2, 2048, "v1", "prompt")
+    key = LLMResponseCache.make_key(*base)
+
+    assert key == LLMResponseCache.make_key(*base)
+    for i, other in enumerate(["openrouter", "mistral", 0.4, 1024, "v2", "prompt!"]):
+        variant = list(base)
+        variant[i] = other
+        assert LLMResponseCache.make_key(*variant) != key
+
+def test_get_set_and_counters(response_cache):
+    """Test hits, misses and their counters"""
+    assert response_cache.get("k") is None
+    response_cache.set("k", "value", provider="groq", model="llama")
+
+    assert response_cache.get("k") == "value"
+    stats = response_cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+def test_expired_entries_are_misses(response_cache):
+    """Test that entries past their TTL are not served"""
+    response_cache.set("k", "value", provider="groq", model="llama", ttl=-1)
+
+    assert response_cache.get("k") is None
+
+def test_lru_eviction_when_over_size(response_cache):
+    """Test that least recently used entries are evicted first"""
+    response_cache.set("a", "x" * 40, provider="groq", model="llama")
+    time.sleep(0.01)
+    response_cache.set("b", "y" * 40, provider="groq", model="llama")
+    time.sleep(0.01)
+    assert response_cache.get("a") is not None  # "a" is now more recent than "b"
+    time.sleep(0.01)
+    response_cache.set("c", "z" * 40, provider="groq", model="llama")
+
+    assert response_cache.get("b") is None
+    assert response_cache.get("a") is not None
+    assert response_cache.get("c") is not None
+
+@pytest.mark.asyncio
+async def test_cached_generate_calls_provider_once(response_cache):
+    """Test that a repeated request is served from the cache"""
+    response_cache.max_bytes = 10_000
+    service = LLMService(api_key="key", provider="groq", cache=response_cache)
+    service._complete = AsyncMock(return_value=LLMCompletion("analysis", "groq", service.default_model, 0.1))
+
+    first = await service.cached_generate("prompt", temperature=0.2, template_version="v1")
+    second = await service.cached_generate("prompt", temperature=0.2, template_version="v1")
+
+    assert first == second == "analysis"
+    service._complete.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_cached_generate_does_not_cache_errors(response_cache):
+    """Test that failed completions are not stored"""
+    service = LLMService(api_key="key", provider="groq", cache=response_cache)
+    service._complete = AsyncMock(side_effect=RuntimeError("boom"))
+
+    result = await service.cached_generate("prompt")
+
+    assert result.startswith("Error:")
+    assert response_cache.stats()['entries'] == 0
+
+def test_fill_lease_is_exclusive_until_released(response_cache):
+    """Test that only one worker at a time may fill a missing entry"""
+    assert response_cache.acquire_fill("k", "worker-1", ttl=60)
+    assert not response_cache.acquire_fill("k", "worker-2", ttl=60)
+    assert response_cache.fill_pending("k")
+
+    response_cache.release_fill("k", "worker-1")
+
+    assert not response_cache.fill_pending("k")
+    assert response_cache.acquire_fill("k", "worker-2", ttl=60)
+
+def test_expired_fill_lease_can_be_taken_over(response_cache):
+    """Test that a lease left by a dead worker does not block others"""
+    assert response_cache.acquire_fill("k", "dead-worker", ttl=-1)
+
+    assert response_cache.acquire_fill("k", "worker-2", ttl=60)
+
+def test_running_size_tracks_replacements_and_evictions(response_cache):
+    """Test that the total size kept in the meta row matches the stored responses"""
+    response_cache.set("a", "x" * 30, provider="groq", model="llama")
+    response_cache.set("a", "x" * 20, provider="groq", model="llama")  # replaced, not added
+    response_cache.set("b", "y" * 40, provider="groq", model="llama", ttl=-1)
+    response_cache.set("c", "z" * 90, provider="groq", model="llama")
+
+    # "b" expired and "a" was evicted to make room for "c"
+    assert response_cache.stats()['size_bytes'] == 90
+    assert response_cache.peek("a") is None
+    response_cache.clear()
+    assert response_cache.stats()['size_bytes'] == 0
+
+def test_lookups_do_not_write_until_a_batch_is_due(tmp_path, monkeypatch):
+    """Test that hits and misses are counted in memory and written in batches"""
+    cache = LLMResponseCache(tmp_path / "cache.sqlite3", flush_every=3, flush_interval=60)
+    other_worker = LLMResponseCache(tmp_path / "cache.sqlite3")
+    cache.set("k", "value", provider="groq", model="llama")
+
+    writes = []
+    transaction = cache.transaction
+    monkeypatch.setattr(cache, 'transaction', lambda **kwargs: writes.append(1) or transaction(**kwargs))
+    assert cache.get("k") == "value"
+    assert cache.get("missing") is None
+    assert writes == []
+    assert other_worker.stats()['hits'] == 0
+
+    cache.get("k")  # the third lookup writes the batch
+    assert len(writes) == 1
+    stats = other_worker.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    row = other_worker.connection().execute("SELECT hits FROM llm_responses WHERE key = 'k'").fetchone()
+    assert row["hits"] == 2
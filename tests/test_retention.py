@@ -0,0 +1,109 @@
+"""
+Test the background retention sweeper
+"""
+import time
+import datetime
+import pytest
+from appopvibe.services.report.report_index import ReportIndex
+from appopvibe.services.report.report_service import ReportService
+from appopvibe.services.report.retention import RetentionSweeper
+
+@pytest.fixture
+def report_service(tmp_path):
+    """Create a report service with its index"""
+    return ReportService(tmp_path / "reports", retention_days=30,
+                         index=ReportIndex(tmp_path / "reports.sqlite3"))
+
+def make_sweeper(tmp_path, report_service, **kwargs):
+    """Create a sweeper sharing the lease database in tmp_path"""
+    settings = dict(feedback_retention_days=90, batch_size=2, max_deletes_per_second=1000)
+    settings.update(kwargs)
+    return RetentionSweeper(tmp_path / "retention.sqlite3", report_service,
+                            tmp_path / "feedback", **settings)
+
+def write_feedback(feedback_dir, relative_path):
+    path = feedback_dir / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("# User Feedback\n")
+    return path
+
+def test_sweep_removes_expired_reports_and_feedback(tmp_path, report_service):
+    """Test that a sweep removes only expired items, in batches, and records itself"""
+    ids = [report_service.save_report("CV", "JD", f"Analysis {i}") for i in range(5)]
+    with report_service.index.transaction() as conn:
+        conn.executemany("UPDATE reports SET created_at = ? WHERE id = ?",
+                         [(time.time() - 40 * 86400, report_id) for report_id in ids[:3]])
+    feedback_dir = tmp_path / "feedback"
+    today = datetime.datetime.now(datetime.timezone.utc)
+    old_day = (today - datetime.timedelta(days=100)).strftime("%Y/%m/%d")
+    expired = [write_feedback(feedback_dir, f"{old_day}/feedback_{i}.md") for i in range(3)]
+    expired.append(write_feedback(feedback_dir, "feedback_2020-01-01T10-00-00Z_anonymous.md"))
+    kept = write_feedback(feedback_dir, f"{today.strftime('%Y/%m/%d')}/feedback_new.md")
+
+    result = make_sweeper(tmp_path, report_service).sweep()
+
+    assert (result['reports'], result['feedback'], result['complete']) == (3, 4, True)
+    assert [r['filename'] for r in report_service.list_reports()] == [ids[4], ids[3]]
+    assert not any(path.exists() for path in expired)
+    assert not (feedback_dir / old_day).exists()
+    assert kept.exists()
+    stats = make_sweeper(tmp_path, report_service).stats()
+    assert stats['last_sweep']['reports'] == 3
+    assert stats['sweeping'] is None
+
+def test_sweep_is_paced_and_bounded(tmp_path, report_service):
+    """Test the deletion rate limit and the time limit of a sweep"""
+    ids = [report_service.save_report("CV", "JD", f"Analysis {i}") for i in range(6)]
+    with report_service.index.transaction() as conn:
+        conn.execute("UPDATE reports SET created_at = 0")
+
+    sweeper = make_sweeper(tmp_path, report_service, max_deletes_per_second=20,
+                           max_sweep_seconds=0.15)
+    started = time.monotonic()
+    result = sweeper.sweep()
+
+    # 2 reports per batch at 20 per second: 0.1s per batch, so the time limit
+    # stops the sweep after two batches
+    assert time.monotonic() - started >= 0.2
+    assert (result['reports'], result['complete']) == (4, False)
+    assert sweeper.sweep()['reports'] == 2
+    assert report_service.list_reports() == []
+
+def test_only_one_process_sweeps_at_a_time(tmp_path, report_service):
+    """Test that a sweeper skips its turn while another holds the lease"""
+    first = make_sweeper(tmp_path, report_service)
+    other = make_sweeper(tmp_path, report_service)
+    other.owner = "other-host:1"
+
+    assert first._claim()
+    assert other.sweep() is None
+    first._release()
+    assert other.sweep() is not None
+
+def test_app_starts_the_sweeper_only_when_serving(app, tmp_path):
+    """Test that CLI commands create the app without a sweeper thread"""
+    import click
+    from appopvibe import create_app
+
+    settings = dict(app.config, RETENTION_SWEEP_ENABLED=True, RETENTION_SWEEP_INTERVAL=3600)
+
+    def build(command):
+        with click.Context(click.Command(command)):
+            built = create_app(type('Config', (), settings))
+        return built.extensions.get('appopvibe.services', {}).get('retention')
+
+    assert build('sweep-retention') is None
+    assert build('shell') is None
+    sweeper = build('run')
+    assert sweeper is not None and sweeper._thread.is_alive()
+    sweeper.stop()
+
+def test_health_does_not_build_a_disabled_sweeper(app, client):
+    """Test that health probes leave the sweeper database alone when sweeping is off"""
+    import os
+
+    response = client.get('/health/detailed')
+
+    assert response.get_json()['retention'] == {'enabled': False}
+    assert 'retention' not in app.extensions.get('appopvibe.services', {})
+    assert not os.path.exists(app.config['RETENTION_PATH'])
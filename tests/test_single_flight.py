@@ -0,0 +1,80 @@
+"""
+Test coalescing of identical concurrent LLM calls
+"""
+import asyncio
+import threading
+import pytest
+from appopvibe.services.llm.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    """Test that callers with the same key wait for the first call"""
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("k", call) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+    assert flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_errors_are_shared():
+    """Test that the leader's exception is raised to every waiter"""
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("k", call) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_when_leader_is_cancelled():
+    """Test that cancelling the first caller does not fail the others"""
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    leader = asyncio.create_task(flight.do("k", call))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(flight.do("k", call))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await waiter == "result"
+    assert len(calls) == 2
+
+def test_calls_are_shared_across_event_loops():
+    """Test coalescing between callers running on different event loops"""
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    async def call():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0.1)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(asyncio.run(flight.do("k", call))))
+    leader.start()
+    started.wait()
+    results.append(asyncio.run(flight.do("k", call)))
+    leader.join()
+
+    assert results == ["result", "result"]
+    assert len(calls) == 1
@@ -0,0 +1,56 @@
+"""
+Test the prompt template registry
+"""
+import pytest
+from appopvibe.services.analyzer.template_registry import PromptTemplate, TemplateRegistry
+
+def test_render_matches_str_format():
+    """Test that precompiled rendering gives the same prompt as str.format"""
+    source = "Intro {{literal}}\nCV:\n{cv}\nJD:\n{jd}\nInstructions {cv}"
+    template = PromptTemplate.compile('en', 'analysis', source)
+
+    assert template.render(cv="my cv", jd="the jd") == source.format(cv="my cv", jd="the jd")
+
+def test_version_changes_only_with_content():
+    """Test that the version identifies the template content"""
+    a = PromptTemplate.compile('en', 'analysis', "Analyze {cv} for {jd}")
+    b = PromptTemplate.compile('fr', 'rewrite', "Analyze {cv} for {jd}")
+    c = PromptTemplate.compile('en', 'analysis', "Analyze {cv} for {jd}!")
+
+    assert a.version == b.version
+    assert a.version != c.version
+
+def test_unsupported_placeholders_are_rejected():
+    """Test that templates fail at load time rather than at render time"""
+    with pytest.raises(ValueError):
+        PromptTemplate.compile('en', 'analysis', "Score: {score:.2f}")
+
+def test_load_prompts_package():
+    """Test that every language of the prompts package is loaded"""
+    registry = TemplateRegistry.load()
+
+    assert set(registry.versions()) == {f"{language}/{kind}" for language in ('en', 'fr')
+                                        for kind in ('analysis', 'rewrite', 'requirements', 'match')}
+    prompt = registry.get('fr', 'analysis').render(cv="MON CV", jd="MON POSTE", keywords="PYTHON")
+    assert "MON CV" in prompt and "MON POSTE" in prompt and "PYTHON" in prompt
+
+def test_missing_language_falls_back_to_default():
+    """Test the fallback to English templates"""
+    registry = TemplateRegistry.from_dict({'en': {'analysis': "{cv} {jd}"}})
+
+    assert registry.get('de', 'analysis').language == 'en'
+
+def test_system_prefix_layout_moves_instructions_ahead_of_inputs():
+    """Test that static instructions become the system message"""
+    source = "You are a recruiter.\n\nCV:\n{cv}\n\nJD:\n{jd}\n\n**Instructions:** use {{markdown}}\n"
+    template = PromptTemplate.compile('en', 'analysis', source)
+
+    inline = template.layout('inline', cv="my cv", jd="the jd")
+    prefixed = template.layout('system_prefix', cv="my cv", jd="the jd")
+
+    assert inline.system is None and inline.prompt == source.format(cv="my cv", jd="the jd")
+    assert prefixed.system == "You are a recruiter.\n\n**Instructions:** use {markdown}"
+    assert prefixed.prompt == "CV:\nmy cv\n\nJD:\nthe jd"
+    assert prefixed.template_version != inline.template_version
+    # The system message does not depend on the inputs
+    assert template.layout('system_prefix', cv="x", jd="y").system == prefixed.system
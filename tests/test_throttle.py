@@ -0,0 +1,68 @@
+"""
+Test the shared provider rate limiter
+"""
+import pytest
+from appopvibe.services.llm.throttle import Throttle, RateLimitedError
+
+@pytest.fixture
+def throttle(tmp_path):
+    """Create a throttle allowing 60 requests and 6000 tokens per minute"""
+    limits = {'groq': {'rpm': 60, 'tpm': 6000}, 'groq:small': {'rpm': 600}}
+    return Throttle(tmp_path / "throttle.sqlite3", limits, burst_seconds=2, max_wait=5)
+
+def test_burst_passes_then_callers_queue(throttle):
+    """Test that calls within the burst go straight through and later ones wait"""
+    assert throttle.reserve("groq", "llama", tokens=10) == 0
+    assert throttle.reserve("groq", "llama", tokens=10) == 0
+
+    wait = throttle.reserve("groq", "llama", tokens=10)
+    assert 0.9 < wait <= 1.0
+    assert throttle.reserve("groq", "llama", tokens=10) > wait  # queued behind the previous caller
+
+def test_tokens_are_metered(throttle):
+    """Test that a large token estimate waits for the token bucket"""
+    wait = throttle.reserve("groq", "llama", tokens=400)
+
+    assert 1.9 < wait <= 2.0  # 200 tokens short at 100 tokens/s
+
+def test_wait_past_deadline_is_rejected_without_reserving(throttle):
+    """Test early rejection when the queue is longer than the caller can wait"""
+    with pytest.raises(RateLimitedError) as excinfo:
+        throttle.reserve("groq", "llama", tokens=2000)
+    assert excinfo.value.retry_in > 5
+
+    with pytest.raises(RateLimitedError):
+        throttle.reserve("groq", "llama", tokens=300, max_wait=0.5)
+    assert throttle.reserve("groq", "llama", tokens=100) == 0
+    assert throttle.stats()["groq:llama"]["rejected"] == 2
+
+def test_model_limits_and_unlisted_providers(throttle):
+    """Test per-model overrides and that unknown providers are not throttled"""
+    for _ in range(20):
+        assert throttle.reserve("groq", "small", tokens=10**6) == 0
+        assert throttle.reserve("openrouter", "any", tokens=10**6) == 0
+
+def test_refund_returns_unused_tokens(throttle):
+    """Test that unused completion tokens are given back"""
+    throttle.reserve("groq", "llama", tokens=200)
+    throttle.refund("groq", "llama", 150)
+
+    assert throttle.stats()["groq:llama"]["tokens_available"] == pytest.approx(150, abs=1)
+
+def test_background_calls_never_reserve_past_the_horizon(tmp_path):
+    """Test that a queued batch leaves interactive calls within their wait limit"""
+    throttle = Throttle(tmp_path / "throttle.sqlite3", {'groq': {'rpm': 30, 'tpm': 6000}},
+                        max_wait=20, background_horizon=5)
+    reserved = 0
+    for _ in range(50):
+        try:
+            throttle.reserve("groq", "llama", tokens=1000, max_wait=600, background=True)
+            reserved += 1
+        except RateLimitedError as e:
+            assert 0 < e.retry_in <= 10  # how long until the call fits in the horizon
+            break
+    assert reserved < 50
+    assert throttle.stats()["groq:llama"]["rejected"] == 0
+
+    wait = throttle.reserve("groq", "llama", tokens=1000, max_wait=20)
+    assert wait <= 15